@@ -0,0 +1,31 @@
+"""add pecha title trgm index
+
+Revision ID: e4b7d2a9c136
+Revises: c8f4a1d6e953
+Create Date: 2026-10-19 20:02:31.518244
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e4b7d2a9c136"
+down_revision = "c8f4a1d6e953"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        "ix_pecha_title_trgm",
+        "pecha",
+        ["title"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"title": "gin_trgm_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_pecha_title_trgm", table_name="pecha")
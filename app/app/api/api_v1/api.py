@@ -1,9 +1,28 @@
 from fastapi import APIRouter
 
-from app.api.api_v1.endpoints import login, pechas, pedurma, users
+from app.api.api_v1.endpoints import (
+    annotations,
+    jobs,
+    login,
+    pechas,
+    pedurma,
+    profiles,
+    search,
+    users,
+    warmup,
+    webhooks,
+)
 
 api_router = APIRouter()
 api_router.include_router(login.router, tags=["Authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["Users"])
 api_router.include_router(pechas.router, prefix="/pechas", tags=["Pechas"])
 api_router.include_router(pedurma.router, prefix="/pedurma", tags=["Pedurma"])
+api_router.include_router(search.router, prefix="/search", tags=["Search"])
+api_router.include_router(
+    annotations.router, prefix="/annotations", tags=["Annotations"]
+)
+api_router.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+api_router.include_router(profiles.router, prefix="/profiles", tags=["Profiles"])
+api_router.include_router(warmup.router, prefix="/warmup", tags=["Warmup"])
+api_router.include_router(webhooks.router, prefix="/webhooks", tags=["Webhooks"])
@@ -0,0 +1,61 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.api import deps
+from app.schemas.annotation import AnnotationResults
+
+router = APIRouter()
+
+
+@router.get("", response_model=AnnotationResults)
+def read_annotations(
+    annotation_type: Optional[str] = None,
+    pecha_id: Optional[List[str]] = Query(None),
+    base_name: Optional[str] = None,
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    db: Session = Depends(deps.get_db),
+):
+    """
+    Annotations across pechas, filtered by type, pechas and base.
+    """
+    total, annotations = crud.annotation.get_multi_by_filters(
+        db,
+        annotation_type=annotation_type,
+        pecha_ids=pecha_id,
+        base_name=base_name,
+        skip=skip,
+        limit=limit,
+    )
+    return {
+        "total": total,
+        "annotations": [
+            {
+                "pecha_id": annotation.pecha_id,
+                "base_name": annotation.base_name,
+                "annotation_type": annotation.annotation_type,
+                "id": annotation.id,
+                "span": {"start": annotation.start, "end": annotation.end},
+                "payload": annotation.payload,
+            }
+            for annotation in annotations
+        ],
+    }
+
+
+@router.get("/pechas", response_model=List[str])
+def read_annotated_pechas(
+    annotation_type: str,
+    skip: int = 0,
+    limit: int = Query(100, le=1000),
+    db: Session = Depends(deps.get_db),
+):
+    """
+    Ids of the pechas having a layer of `annotation_type`.
+    """
+    return crud.annotation.get_pecha_ids(
+        db, annotation_type=annotation_type, skip=skip, limit=limit
+    )
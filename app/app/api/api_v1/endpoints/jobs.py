@@ -0,0 +1,94 @@
+import time
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app import crud, schemas
+from app.api import deps
+from app.core.config import settings
+from app.core.pubsub import PubSub
+from app.schemas.job import Job, JobEvent
+from app.services.jobs import get_job_owner_id, stream_job_events
+
+router = APIRouter()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def get_job_result(job_id: str, current_user: schemas.user.User):
+    """
+    Celery result of a job of the current user, superusers see every job.
+    """
+    from app.core.celery_app import celery_app
+
+    if get_job_owner_id(job_id) != current_user.id and not crud.user.is_superuser(
+        current_user
+    ):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return celery_app.AsyncResult(job_id)
+
+
+@router.get("/events")
+def read_jobs_events(
+    current_user: schemas.user.User = Depends(deps.get_current_user),
+    pubsub: PubSub = Depends(deps.get_pubsub),
+):
+    """
+    Stream progress events of every job of the current user.
+    """
+
+    def match(event: JobEvent) -> bool:
+        return event.user_id == current_user.id
+
+    return StreamingResponse(
+        stream_job_events(pubsub, match, heartbeat=settings.JOB_EVENTS_HEARTBEAT),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/{job_id}/events")
+def read_job_events(
+    job_id: str,
+    current_user: schemas.user.User = Depends(deps.get_current_user),
+    pubsub: PubSub = Depends(deps.get_pubsub),
+):
+    """
+    Stream progress events of a job, until it is finished.
+    """
+    is_superuser = crud.user.is_superuser(current_user)
+
+    def match(event: JobEvent) -> bool:
+        return event.job_id == job_id and (
+            is_superuser or event.user_id == current_user.id
+        )
+
+    result = get_job_result(job_id, current_user)
+    initial_event = JobEvent(job_id=job_id, state=result.state, timestamp=time.time())
+    return StreamingResponse(
+        stream_job_events(
+            pubsub,
+            match,
+            heartbeat=settings.JOB_EVENTS_HEARTBEAT,
+            initial_event=initial_event,
+            until_final=True,
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.get("/{job_id}", response_model=Job)
+def read_job(
+    job_id: str,
+    current_user: schemas.user.User = Depends(deps.get_current_user),
+):
+    """
+    State of a job, with its result once it succeeded.
+    """
+    result = get_job_result(job_id, current_user)
+    return {
+        "job_id": job_id,
+        "state": result.state,
+        "result": result.result if result.state == "SUCCESS" else None,
+    }
@@ -1,48 +1,96 @@
+import logging
 from logging import currentframe
 from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
 from openpecha.core.layer import Layer, LayersEnum
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app import crud, schemas
+from app import crud, schemas, worker
 from app.api import deps
+from app.api.conditional import not_modified, set_cache_headers
+from app.api.negotiation import MsgpackRoute, get_representation_etag, negotiate
+from app.core.config import settings
+from app.core.timing import span
+from app.schemas.batch import BatchRequest, BatchResults
+from app.schemas.job import Job
+from app.schemas.revision import LayerChanges
+from app.services import annotations, search
+from app.services.background import run_index_task
+from app.services.batch import read_items
+from app.services.catalog import get_components, get_components_etag, update_catalog
+from app.services.jobs import new_job_id
 from app.services.pechas import (
     create_editor_content_from_pecha,
-    create_export,
     create_opf_pecha,
+    get_base_etag,
+    get_editor_etag,
+    get_layer_etag,
     get_pecha,
+    invalidate_pecha_cache,
+    load_base,
+    load_components,
+    load_layer,
+    pecha_lock,
     update_base_layer,
     update_pecha_with_editor_content,
 )
+from app.services.revisions import RevisionGone, get_changes, save_layer
+from app.services.thumbnails import (
+    backfill_thumbnails,
+    create_thumbnails,
+    get_img_url,
+    get_thumbnail_media_type,
+    get_thumbnail_path,
+)
+
+logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=MsgpackRoute)
 
 
 @router.get("", response_model=List[schemas.pecha.Pecha])
 async def read_pecha(
     db: Session = Depends(deps.get_db),
+    q: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    sort: schemas.pecha.PechaSort = schemas.pecha.PechaSort.title,
     skip: int = 0,
     limit: int = 100,
     current_user: schemas.user.User = Depends(deps.get_current_user),
 ):
     """
-    Retrieve pechas.
+    Retrieve pechas, `q` filters on titles containing it.
+
+    `owner_id` is only taken into account for superusers, other users always
+    get their own pechas.
     """
-    if crud.user.is_superuser(current_user):
-        pechas = crud.item.get_multi(db, skip=skip, limit=limit)
-    else:
-        pechas = crud.pecha.get_multi_by_owner(
-            db=db, owner_id=current_user.id, skip=skip, limit=limit
+    if not crud.user.is_superuser(current_user):
+        owner_id = current_user.id
+    with span("db"):
+        pechas = crud.pecha.search(
+            db, q=q, owner_id=owner_id, sort=sort, skip=skip, limit=limit
         )
     return pechas
 
 
-@router.post("")
+@router.post("", dependencies=[Depends(deps.admit("import"))])
 async def create_pecha(
     title: str,
     author: str,
     sku: str,
+    background_tasks: BackgroundTasks,
     subtitle: Optional[str] = "",
     collection: Optional[str] = "",
     publisher: Optional[str] = "",
@@ -66,27 +114,101 @@ async def create_pecha(
         front_cover_image,
         publication_data_image,
     )
-    pecha_obj = {
-        "id": pecha_id,
-        "title": title,
-        "img": f"https://github.com/OpenPecha/{pecha_id}/raw/master/{pecha_id}.opf/assets/image/{front_cover_image_fn.name}",
-    }
+    try:
+        # resizing and encoding is CPU-bound, keep it off the event loop
+        names = await run_in_threadpool(
+            create_thumbnails, pecha_id, front_cover_image_fn
+        )
+        img = get_img_url(pecha_id, names)
+    except Exception as e:
+        # backfill_thumbnails creates them from the clone later
+        logger.warning(f"Could not create the thumbnails of {pecha_id}: {e}")
+        img = f"https://github.com/OpenPecha/{pecha_id}/raw/master/{pecha_id}.opf/assets/image/{front_cover_image_fn.name}"
+    pecha_obj = {"id": pecha_id, "title": title, "img": img}
     pecha = crud.pecha.create_with_owner(
         db=db, obj_in=pecha_obj, owner_id=current_user.id
     )
+    background_tasks.add_task(run_index_task, update_catalog, db, pecha_id)
     return {"pecha_id": pecha_id}
 
 
+@router.post("/batch", response_model=BatchResults)
+def read_batch(
+    batch: BatchRequest,
+    user: schemas.user.User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_db),
+):
+    """
+    Read bases, layers, components and editor contents of one or more pechas
+    in a single request, results are in the order of the items.
+    """
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.BATCH_MAX_ITEMS} items per batch",
+        )
+    return {"results": read_items(db, batch.items)}
+
+
+@router.post("/thumbnails/backfill", status_code=202)
+def backfill_pecha_thumbnails(
+    background_tasks: BackgroundTasks,
+    user: schemas.user.User = Depends(deps.get_current_active_superuser),
+    db: Session = Depends(deps.get_db),
+):
+    """
+    Create the thumbnails of the pechas still using GitHub cover images.
+    """
+    background_tasks.add_task(backfill_thumbnails, db)
+    return {"backfill": True}
+
+
+@router.get("/{pecha_id}/thumbnails/{name}", response_class=Response)
+def read_thumbnail(pecha_id: str, name: str):
+    """
+    Cover image thumbnail, its url changes with the cover so it is cached
+    for good.
+    """
+    thumbnail_fn = get_thumbnail_path(pecha_id, name)
+    if thumbnail_fn is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    # a few KB, read at once rather than streamed
+    return Response(
+        thumbnail_fn.read_bytes(),
+        media_type=get_thumbnail_media_type(name),
+        headers={
+            "Cache-Control": f"public, max-age={settings.THUMBNAIL_MAX_AGE}, immutable"
+        },
+    )
+
+
 @router.get("/{pecha_id}/components", response_model=Dict[str, List[LayersEnum]])
-def read_components(pecha_id: str):
-    pecha = get_pecha(pecha_id)
-    return pecha.components
+def read_components(
+    pecha_id: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_db),
+):
+    components = get_components(db, pecha_id)
+    etag = get_components_etag(components)
+    not_modified_response = not_modified(request, etag)
+    if not_modified_response:
+        return not_modified_response
+    set_cache_headers(response, etag)
+    return components
 
 
 @router.get("/{pecha_id}/base/{base_name}", response_model=str)
-def read_base(pecha_id: str, base_name):
+def read_base(pecha_id: str, base_name, request: Request, response: Response):
+    etag = get_base_etag(pecha_id, base_name)
+    not_modified_response = not_modified(request, etag)
+    if not_modified_response:
+        return not_modified_response
     pecha = get_pecha(pecha_id)
-    return pecha.get_base(base_name)
+    # without a local clone there is no ETag until the pecha is downloaded
+    etag = etag or get_base_etag(pecha_id, base_name)
+    set_cache_headers(response, etag)
+    return load_base(pecha, base_name)
 
 
 @router.post("/{pecha_id}/base/{base_name}", status_code=status.HTTP_201_CREATED)
@@ -94,32 +216,59 @@ def create_base(
     pecha_id: str,
     base_name: str,
     base: schemas.pecha.BaseLayer,
+    background_tasks: BackgroundTasks,
     user: schemas.user.User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_db),
 ):
     """
     Create new base layer.
     """
     pecha = get_pecha(pecha_id)
     pecha.base[base_name] = base.content
-    pecha.save_base()
+    with span("save"), pecha_lock(pecha_id, base_name):
+        pecha.save_base()
+    invalidate_pecha_cache(pecha_id)
+    crud.pecha.mark_edited(db, id=pecha_id)
+    background_tasks.add_task(run_index_task, update_catalog, db, pecha_id)
+    background_tasks.add_task(
+        run_index_task, search.index_base, db, pecha_id, base_name
+    )
     return {"success": True}
 
 
-@router.put("/{pecha_id}/base/{base_name}")
+@router.put("/{pecha_id}/base/{base_name}", dependencies=[Depends(deps.admit("write"))])
 def update_base(
     pecha_id: str,
     base_name: str,
     updated_base: schemas.pecha.BaseLayer,
     layers: List[Layer],
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     user: schemas.user.User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_db),
 ):
     """
     Update base and corresponding layers also updated.
     """
     updated_layers = update_base_layer(
-        pecha_id, base_name, updated_base.content, list(map(lambda x: x.dict(), layers))
+        db,
+        pecha_id,
+        base_name,
+        updated_base.content,
+        layers,
+    )
+    crud.pecha.mark_edited(db, id=pecha_id)
+    background_tasks.add_task(run_index_task, update_catalog, db, pecha_id)
+    background_tasks.add_task(
+        run_index_task, search.index_base, db, pecha_id, base_name
+    )
+    background_tasks.add_task(
+        run_index_task, annotations.index_base_layers, db, pecha_id, base_name
+    )
+    return negotiate(
+        request, response, {"base": updated_base.content, "layers": updated_layers}
     )
-    return {"base": updated_base.content, "layers": updated_layers}
 
 
 @router.delete("/{pecha_id}/base/{base_name}", response_model=str)
@@ -132,14 +281,40 @@ def delete_base(
 
 
 @router.get("/{pecha_id}/layers/{base_name}", response_model=List[Layer])
-def read_layers(pecha_id: str, base_name: str):
-    raise HTTPException(status_code=501, detail="Endpoint not functional yet")
+def read_layers(pecha_id: str, base_name: str, request: Request, response: Response):
+    """
+    All the layers of a base.
+    """
+    pecha = get_pecha(pecha_id)
+    components = load_components(pecha)
+    if base_name not in components:
+        raise HTTPException(status_code=404, detail="Base not found")
+    layers = [
+        load_layer(pecha, base_name, layer_name) for layer_name in components[base_name]
+    ]
+    return negotiate(request, response, layers)
 
 
 @router.get("/{pecha_id}/layers/{base_name}/{layer_name}", response_model=Layer)
-def read_layer(pecha_id: str, base_name, layer_name: str):
+def read_layer(
+    pecha_id: str, base_name, layer_name: str, request: Request, response: Response
+):
+    response.headers["Vary"] = "Accept"
+    etag = get_representation_etag(
+        request, get_layer_etag(pecha_id, base_name, layer_name)
+    )
+    not_modified_response = not_modified(request, etag)
+    if not_modified_response:
+        not_modified_response.headers["Vary"] = "Accept"
+        return not_modified_response
     pecha = get_pecha(pecha_id)
-    return pecha.get_layer(base_name, LayersEnum(layer_name))
+    layer = load_layer(pecha, base_name, LayersEnum(layer_name))
+    if etag is None:
+        etag = get_representation_etag(
+            request, get_layer_etag(pecha_id, base_name, layer_name)
+        )
+    set_cache_headers(response, etag)
+    return negotiate(request, response, layer)
 
 
 @router.post("/{pecha_id}/layers/{base_name}/{layer_name}", response_model=Layer)
@@ -148,12 +323,27 @@ def create_layer(
     base_name: str,
     layer_name: str,
     layer: Layer,
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
     user: schemas.user.User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_db),
 ):
     pecha = get_pecha(pecha_id)
-    pecha.layers[base_name][LayersEnum(layer_name)] = layer
-    pecha.save_layers()
-    return {"success": True}
+    with span("save"):
+        layer = save_layer(db, pecha, base_name, LayersEnum(layer_name), layer)
+    invalidate_pecha_cache(pecha_id)
+    crud.pecha.mark_edited(db, id=pecha_id)
+    background_tasks.add_task(run_index_task, update_catalog, db, pecha_id)
+    background_tasks.add_task(
+        run_index_task,
+        annotations.index_pecha_layer,
+        db,
+        pecha_id,
+        base_name,
+        LayersEnum(layer_name),
+    )
+    return negotiate(request, response, layer)
 
 
 @router.put("/{pecha_id}/layers/{base_name}/{layer_name}")
@@ -162,11 +352,51 @@ def update_layer(
     base_name,
     layer_name: str,
     layer: Layer,
+    background_tasks: BackgroundTasks,
     user: schemas.user.User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_db),
 ):
     pecha = get_pecha(pecha_id)
-    pecha.save_layer(base_name, layer_name, layer)
-    return {"success": True}
+    with span("save"):
+        layer = save_layer(db, pecha, base_name, LayersEnum(layer_name), layer)
+    invalidate_pecha_cache(pecha_id)
+    crud.pecha.mark_edited(db, id=pecha_id)
+    background_tasks.add_task(run_index_task, update_catalog, db, pecha_id)
+    background_tasks.add_task(
+        run_index_task,
+        annotations.index_pecha_layer,
+        db,
+        pecha_id,
+        base_name,
+        LayersEnum(layer_name),
+    )
+    return {"success": True, "revision": layer.revision}
+
+
+@router.get(
+    "/{pecha_id}/layers/{base_name}/{layer_name}/changes", response_model=LayerChanges
+)
+def read_layer_changes(
+    pecha_id: str,
+    base_name: str,
+    layer_name: str,
+    since: int,
+    db: Session = Depends(deps.get_db),
+):
+    """
+    Annotations upserted and removed since the `since` revision of the layer.
+
+    Responds 410 when the changes are not known, the layer is then read
+    again in full.
+    """
+    pecha = get_pecha(pecha_id)
+    try:
+        return get_changes(db, pecha, base_name, LayersEnum(layer_name), since)
+    except RevisionGone:
+        raise HTTPException(
+            status_code=410,
+            detail=f"Changes since revision {since} are gone, read the layer",
+        )
 
 
 @router.delete("/{pecha_id}/layers/{base_name}/{layer_name}", response_model=Layer)
@@ -179,34 +409,61 @@ def delete_layer(
     raise HTTPException(status_code=501, detail="Endpoint not functional yet")
 
 
-@router.get("/{pecha_id}/export/{branch}")
+@router.get("/{pecha_id}/export/{branch}", status_code=202, response_model=Job)
 def export_pecha(
     pecha_id: str,
     branch: str = "master",
     user: schemas.user.User = Depends(deps.get_current_user),
 ):
-    download_link = create_export(pecha_id, branch)
-    return {"download_link": download_link}
+    """
+    Queue the export, its download link is the result of the job.
+    """
+    result = worker.export_pecha.apply_async(
+        kwargs={"pecha_id": pecha_id, "branch": branch, "user_id": user.id},
+        task_id=new_job_id(user.id),
+    )
+    return {"job_id": result.id, "state": "PENDING"}
 
 
 @router.get("/{pecha_id}/{base_name}/editor")
 def get_editor_content(
     pecha_id: str,
     base_name: str,
+    request: Request,
+    response: Response,
     user: schemas.user.User = Depends(deps.get_current_user),
 ):
-    return {"content": create_editor_content_from_pecha(pecha_id, base_name)}
-
-
-@router.put("/{pecha_id}/{base_name}/editor")
+    etag = get_editor_etag(pecha_id, base_name)
+    not_modified_response = not_modified(request, etag, private=True)
+    if not_modified_response:
+        return not_modified_response
+    content = create_editor_content_from_pecha(pecha_id, base_name)
+    etag = etag or get_editor_etag(pecha_id, base_name)
+    set_cache_headers(response, etag, private=True)
+    return {"content": content}
+
+
+@router.put(
+    "/{pecha_id}/{base_name}/editor", dependencies=[Depends(deps.admit("write"))]
+)
 def update_pecha(
     pecha_id: str,
     base_name: str,
     editor_content: schemas.pecha.EditorContent,
+    background_tasks: BackgroundTasks,
     user: schemas.user.User = Depends(deps.get_current_user),
+    db: Session = Depends(deps.get_db),
 ):
     # try:
-    update_pecha_with_editor_content(pecha_id, base_name, editor_content.content)
+    update_pecha_with_editor_content(db, pecha_id, base_name, editor_content.content)
+    crud.pecha.mark_edited(db, id=pecha_id)
+    background_tasks.add_task(run_index_task, update_catalog, db, pecha_id)
+    background_tasks.add_task(
+        run_index_task, search.index_base, db, pecha_id, base_name
+    )
+    background_tasks.add_task(
+        run_index_task, annotations.index_base_layers, db, pecha_id, base_name
+    )
     # except Exception as e:
     #     print(e)
     #     return {"success": False}
@@ -1,17 +1,17 @@
 from pathlib import Path
 from typing import List, Optional
 
-from fastapi import APIRouter, status
-from pedurma import (
-    get_pedurma_text_edit_notes,
-    get_preview_page,
-    update_text_pagination,
-)
-from pedurma.texts import get_derge_google_text_obj, get_text_obj
+from fastapi import APIRouter, Depends, status
 
-from app import schemas
+from app import schemas, worker
+from app.api import deps
+from app.api.profiling import ProfiledRoute
+from app.core.timing import span
+from app.schemas.job import Job
+from app.services import pedurma
+from app.services.jobs import new_job_id
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 
 @router.get("/{pecha_id}/texts/{text_id}", response_model=schemas.Text)
@@ -19,10 +19,8 @@ def read_text(pecha_id: str, text_id: str, page_no: Optional[int] = None):
     """
     Retrieve text from pecha
     """
-    if pecha_id in ["P000791", "P000793"]:
-        text = get_derge_google_text_obj(text_id)
-    else:
-        text = get_text_obj(pecha_id, text_id)
+    with span("pedurma"):
+        text = pedurma.get_text(pecha_id, text_id)
     return text
 
 
@@ -38,21 +36,44 @@ def pedurma_page_preview(
     namsel_page: schemas.Page,
     namsel_page_note: schemas.NotesPage,
 ):
-    preview_page = get_preview_page(
-        google_page, namsel_page, google_page_note, namsel_page_note
-    )
+    from pedurma import get_preview_page
+
+    with span("pedurma"):
+        preview_page = get_preview_page(
+            google_page, namsel_page, google_page_note, namsel_page_note
+        )
     return {"content": preview_page}
 
 
 @router.get("/{text_id}/notes", response_model=List[schemas.pecha.PedurmaNoteEdit])
 def get_text_notes(text_id: str):
-    notes = get_pedurma_text_edit_notes(text_id)
+    with span("pedurma"):
+        notes = pedurma.get_text_notes(text_id)
     return notes
 
 
-@router.post("/{text_id}/notes")
-def update_text_notes(text_id: str, notes: List[schemas.pecha.PedurmaNoteEdit]):
-    update_text_pagination(text_id, notes)
+@router.post("/{text_id}/notes", status_code=202, response_model=Job)
+def update_text_notes(
+    text_id: str,
+    notes: List[schemas.pecha.PedurmaNoteEdit],
+    current_user: schemas.user.User = Depends(deps.get_current_user),
+):
+    """
+    Queue the pagination update with changed note edits, keyed by
+    (vol, image_no).
+
+    Only the volumes of the changed note edits are reprocessed, the result
+    of the job is the pages whose note ref changed per volume.
+    """
+    result = worker.pedurma_update_text_pagination.apply_async(
+        kwargs={
+            "text_id": text_id,
+            "notes": [note.dict() for note in notes],
+            "user_id": current_user.id,
+        },
+        task_id=new_job_id(current_user.id),
+    )
+    return {"job_id": result.id, "state": "PENDING"}
 
 
 @router.post("/{task_name}/completed", status_code=status.HTTP_201_CREATED)
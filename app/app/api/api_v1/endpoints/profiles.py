@@ -0,0 +1,38 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app import schemas
+from app.api import deps
+from app.core.profiling import PROFILE_SUFFIX, get_profile_fn, list_profiles
+
+router = APIRouter()
+
+
+@router.get("", response_model=List[str])
+def read_profiles(
+    current_user: schemas.user.User = Depends(deps.get_current_active_superuser),
+):
+    """
+    Ids of the saved request profiles, latest first.
+    """
+    return [profile_fn.name[: -len(PROFILE_SUFFIX)] for profile_fn in list_profiles()]
+
+
+@router.get("/{profile_id}")
+def read_profile(
+    profile_id: str,
+    current_user: schemas.user.User = Depends(deps.get_current_active_superuser),
+):
+    """
+    Download a request profile, in the collapsed stacks format of speedscope
+    and flamegraph.pl.
+    """
+    profile_fn = get_profile_fn(profile_id)
+    if "/" in profile_id or not profile_fn.is_file():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return PlainTextResponse(
+        profile_fn.read_text(encoding="utf-8"),
+        headers={"Content-Disposition": f'attachment; filename="{profile_fn.name}"'},
+    )
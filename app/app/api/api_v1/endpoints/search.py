@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.schemas.search import SearchResults
+from app.services import search
+
+router = APIRouter()
+
+
+@router.get("", response_model=SearchResults)
+def search_bases(
+    q: str = Query(..., min_length=1),
+    skip: int = 0,
+    limit: int = Query(20, le=100),
+    db: Session = Depends(deps.get_db),
+):
+    """
+    Search a phrase in the base texts of all the pechas, the bases with the
+    most occurrences first.
+    """
+    return search.search(db, q, skip=skip, limit=limit)
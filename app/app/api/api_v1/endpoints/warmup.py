@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+
+from app.schemas.warmup import WarmupStatus
+from app.services import warmup
+
+router = APIRouter()
+
+
+@router.get("", response_model=WarmupStatus)
+def read_warmup_status():
+    """
+    Progress of the startup cache warmup of the worker serving the request.
+    """
+    return warmup.status
@@ -0,0 +1,76 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from app.api import deps
+from app.core import metrics
+from app.core.config import settings
+from app.core.security import verify_github_signature
+from app.schemas.webhook import GithubPush
+from app.services import annotations, catalog, search
+from app.services.background import run_index_task
+from app.services.pechas import refresh_pecha
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+BRANCH_REF_PREFIX = "refs/heads/"
+# the branch served by the pecha endpoints, and indexed
+INDEXED_BRANCH = "review"
+
+
+def refresh_pushed_pecha(db: Session, pecha_id: str, branch: str) -> None:
+    try:
+        refreshed = refresh_pecha(pecha_id, branch)
+    except Exception as e:
+        # diverged local branch or GitHub unreachable, the clone stays as is
+        metrics.PECHA_REFRESHES.labels("failed").inc()
+        logger.warning(f"Could not refresh {pecha_id} ({branch}): {e}")
+        return
+    metrics.PECHA_REFRESHES.labels("updated" if refreshed else "not_local").inc()
+    if refreshed:
+        logger.info(f"Refreshed {pecha_id} ({branch})")
+    if refreshed and branch == INDEXED_BRANCH:
+        run_index_task(search.index_pecha, db, pecha_id)
+        run_index_task(annotations.index_pecha, db, pecha_id)
+        run_index_task(catalog.update_catalog, db, pecha_id)
+
+
+@router.post("/github", status_code=202)
+async def github_webhook(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    x_github_event: Optional[str] = Header(None),
+    x_hub_signature_256: Optional[str] = Header(None),
+    db: Session = Depends(deps.get_db),
+):
+    """
+    GitHub push webhook, refreshes the local clone of the pushed pecha.
+
+    Set it up on the organization with `application/json` content and the
+    `GITHUB_WEBHOOK_SECRET` secret.
+    """
+    if not settings.GITHUB_WEBHOOK_SECRET:
+        raise HTTPException(status_code=404, detail="Webhook not configured")
+    body = await request.body()
+    if not verify_github_signature(body, x_hub_signature_256):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    if x_github_event != "push":
+        return {"refresh": False}
+
+    try:
+        push = GithubPush.parse_raw(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid push payload: {e}")
+    if not push.ref.startswith(BRANCH_REF_PREFIX) or push.deleted:
+        return {"refresh": False}
+
+    pecha_id = push.repository.name
+    branch = push.ref[len(BRANCH_REF_PREFIX) :]
+    background_tasks.add_task(refresh_pushed_pecha, db, pecha_id, branch)
+    return {"refresh": True, "pecha_id": pecha_id, "branch": branch}
@@ -0,0 +1,50 @@
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+
+
+def get_cache_headers(etag: str, private: bool = False) -> Dict[str, str]:
+    scope = "private" if private else "public"
+    return {
+        "ETag": etag,
+        "Cache-Control": (
+            f"{scope}, max-age={settings.CONTENT_CACHE_MAX_AGE}, must-revalidate"
+        ),
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of `If-None-Match`, as specified for GET requests.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (
+        candidate[2:] if candidate.startswith("W/") else candidate
+        for candidate in candidates
+    )
+
+
+def not_modified(
+    request: Request, etag: Optional[str], private: bool = False
+) -> Optional[Response]:
+    """
+    304 response if the client already has the `etag` version, None
+    otherwise.
+    """
+    if etag is None or not etag_matches(request.headers.get("if-none-match"), etag):
+        return None
+    return Response(status_code=304, headers=get_cache_headers(etag, private))
+
+
+def set_cache_headers(
+    response: Response, etag: Optional[str], private: bool = False
+) -> None:
+    if etag is not None:
+        response.headers.update(get_cache_headers(etag, private))
@@ -1,10 +1,15 @@
-from typing import Generator
+from typing import AsyncGenerator, Callable, Generator
 
 from fastapi import Depends, Header, HTTPException, status
-from github import Github, GithubException
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
+from app.core import metrics
+from app.core.admission import Rejected, get_limiter
+from app.core.config import settings
+from app.core.pubsub import PubSub
+from app.core.pubsub import get_pubsub as get_default_pubsub
+from app.core.timing import span
 from app.db.session import SessionLocal
 
 
@@ -19,19 +24,27 @@ def get_db() -> Generator:
 def get_current_user(
     db: Session = Depends(get_db), token: str = Header(...)
 ) -> models.User:
+    # PyGithub is slow to import, only load it on the first request
+    from github import Github, GithubException
+
     try:
-        gh_user = Github(token).get_user()
+        metrics.GITHUB_API_CALLS.labels("get_user").inc()
+        with span("auth"):
+            gh_user = Github(token).get_user()
+            gh_user_id = gh_user.id
     except GithubException:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    user = crud.user.get(db, id=gh_user.id)
+    with span("db"):
+        user = crud.user.get(db, id=gh_user_id)
     if not user:
         user = schemas.UserCreate(
-            id=gh_user.id, username=gh_user.login, email=gh_user.email
+            id=gh_user_id, username=gh_user.login, email=gh_user.email
         )
-        crud.user.create(db, obj_in=user)
+        with span("db"):
+            user = crud.user.create(db, obj_in=user)
     return user
 
 
@@ -43,3 +56,37 @@ def get_current_active_superuser(
             status_code=400, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+def get_pubsub() -> PubSub:
+    return get_default_pubsub()
+
+
+def admit(endpoint_class: str) -> Callable[[], AsyncGenerator]:
+    """
+    Limit the concurrent requests of `endpoint_class`, answering 429 once its
+    queue is full and 503 after waiting too long in it.
+
+    Declare it in the path operation `dependencies` so it runs before auth.
+    """
+
+    async def admission() -> AsyncGenerator:
+        limiter = get_limiter(endpoint_class)
+        try:
+            await limiter.acquire()
+        except Rejected as e:
+            raise HTTPException(
+                status_code=(
+                    status.HTTP_429_TOO_MANY_REQUESTS
+                    if e.reason == "queue_full"
+                    else status.HTTP_503_SERVICE_UNAVAILABLE
+                ),
+                detail=f"Too many {endpoint_class} requests, retry later",
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+            )
+        try:
+            yield
+        finally:
+            limiter.release()
+
+    return admission
@@ -0,0 +1,100 @@
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Callable, Optional
+
+import msgpack
+from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.api.profiling import ProfiledRoute
+from app.core.timing import TimedRenderMixin
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def is_msgpack(media_type: Optional[str]) -> bool:
+    if not media_type:
+        return False
+    return media_type.split(";")[0].strip().lower() in MSGPACK_MEDIA_TYPES
+
+
+def wants_msgpack(request: Request) -> bool:
+    """
+    Whether msgpack is in `Accept` and not refused with q=0, JSON is the
+    default.
+    """
+    for media_range in request.headers.get("accept", "").split(","):
+        media_type, *params = media_range.split(";")
+        if not is_msgpack(media_type):
+            continue
+        return not any(param.replace(" ", "") in ("q=0", "q=0.0") for param in params)
+    return False
+
+
+def get_representation_etag(request: Request, etag: Optional[str]) -> Optional[str]:
+    """
+    ETag of the representation, the encodings of the same content must not
+    share a strong ETag.
+    """
+    if etag is None or not wants_msgpack(request):
+        return etag
+    return f'{etag[:-1]}-msgpack"'
+
+
+def encode_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} to msgpack")
+
+
+class MsgpackRenderer(Response):
+    media_type = MSGPACK_MEDIA_TYPES[0]
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=encode_default, use_bin_type=True)
+
+
+class MsgpackResponse(TimedRenderMixin, MsgpackRenderer):
+    """
+    msgpack response, timing the `encode` phase.
+    """
+
+
+def negotiate(request: Request, response: Response, content: Any) -> Any:
+    """
+    `content` as msgpack if the client accepts it, else left to the JSON
+    response of the route, varying on `Accept` either way.
+    """
+    response.headers["Vary"] = "Accept"
+    if not wants_msgpack(request):
+        return content
+    return MsgpackResponse(content, headers=dict(response.headers))
+
+
+class MsgpackRequest(Request):
+    async def json(self) -> Any:
+        if not is_msgpack(self.headers.get("content-type")):
+            return await super().json()
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body(), raw=False)
+        return self._json
+
+
+class MsgpackRoute(ProfiledRoute):
+    """
+    Profiled route also reading msgpack request bodies, sent with the
+    `application/msgpack` content type.
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def msgpack_route_handler(request: Request) -> Response:
+            return await route_handler(MsgpackRequest(request.scope, request.receive))
+
+        return msgpack_route_handler
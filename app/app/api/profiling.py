@@ -0,0 +1,74 @@
+import logging
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.api import deps
+from app.core.config import settings
+from app.core.profiling import profile, profiled_endpoint, save_profile
+from app.core.timing import TimedRoute
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+
+def is_superuser(request: Request) -> bool:
+    token = request.headers.get("token")
+    if not token:
+        return False
+    get_db = request.app.dependency_overrides.get(deps.get_db, deps.get_db)
+    db_gen = get_db()
+    db = next(db_gen)
+    try:
+        user = deps.get_current_user(db=db, token=token)
+        deps.get_current_active_superuser(current_user=user)
+    except HTTPException:
+        return False
+    finally:
+        db_gen.close()
+    return True
+
+
+async def should_profile(request: Request) -> bool:
+    if not settings.PROFILING_SAMPLE_RATE or not request.headers.get(PROFILE_HEADER):
+        return False
+    return await run_in_threadpool(is_superuser, request)
+
+
+class ProfiledRoute(TimedRoute):
+    """
+    Timed route, also profiling the endpoint of superuser requests having
+    the `X-Profile` header.
+
+    The profile is saved in the collapsed stacks format and its id is
+    returned in the `X-Profile-Id` header.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, profiled_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def profiled_route_handler(request: Request) -> Response:
+            if not await should_profile(request):
+                return await route_handler(request)
+
+            with profile(1 / settings.PROFILING_SAMPLE_RATE) as profiler:
+                response = await route_handler(request)
+            profile_id = await run_in_threadpool(
+                save_profile, profiler, self.name, settings.PROFILING_MAX_PROFILES
+            )
+            logger.info(
+                f"Profile {profile_id} of {request.method} {request.url.path}: "
+                f"{profiler.samples} samples"
+            )
+            response.headers[PROFILE_ID_HEADER] = profile_id
+            return response
+
+        return profiled_route_handler
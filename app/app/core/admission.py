@@ -0,0 +1,87 @@
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """
+    Admits `limit` concurrent requests of an endpoint class per worker,
+    queuing up to `queue_size` more for at most `queue_timeout` seconds.
+
+    Runs in the event loop, it is not thread safe.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        """
+        Raises `Rejected` with `queue_full` or `queue_timeout`.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            metrics.ADMISSION_ACTIVE.labels(self.name).inc()
+            metrics.ADMISSION_WAIT.labels(self.name).observe(0)
+            return
+        if len(self._waiters) >= self.queue_size:
+            metrics.ADMISSION_REJECTED.labels(self.name, "queue_full").inc()
+            raise Rejected("queue_full")
+
+        waiter = asyncio.get_event_loop().create_future()
+        self._waiters.append(waiter)
+        metrics.ADMISSION_QUEUED.labels(self.name).inc()
+        start = time.perf_counter()
+        try:
+            # the slot is handed over by `release`, `active` is unchanged
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            metrics.ADMISSION_REJECTED.labels(self.name, "queue_timeout").inc()
+            raise Rejected("queue_timeout")
+        except asyncio.CancelledError:
+            # client gone, pass on a slot handed over meanwhile
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            metrics.ADMISSION_QUEUED.labels(self.name).dec()
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        metrics.ADMISSION_WAIT.labels(self.name).observe(time.perf_counter() - start)
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+        metrics.ADMISSION_ACTIVE.labels(self.name).dec()
+
+
+_limiters: Dict[str, ConcurrencyLimiter] = {}
+
+
+def get_limiter(name: str) -> ConcurrencyLimiter:
+    if name not in _limiters:
+        _limiters[name] = ConcurrencyLimiter(
+            name,
+            settings.ADMISSION_LIMITS[name],
+            settings.ADMISSION_QUEUE_SIZES[name],
+            settings.ADMISSION_QUEUE_TIMEOUT,
+        )
+    return _limiters[name]
@@ -0,0 +1,235 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# seconds the access time of a disk cache entry may lag, so that most hits
+# only read
+TOUCH_INTERVAL = 60
+
+
+class LRUCache:
+    """
+    Thread safe LRU cache, evicting the least recently used entry past
+    `maxsize` entries.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def invalidate(self, match: Callable[[Hashable], bool]) -> int:
+        """
+        Remove the entries whose key matches, returns how many were removed.
+        """
+        with self._lock:
+            keys = [key for key in self._data if match(key)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def get_or_set(
+        self,
+        key: Hashable,
+        load: Callable[[], Any],
+        version: Optional[Hashable] = None,
+    ) -> Any:
+        """
+        Cached value of `key`, loaded again when its `version` has changed.
+        """
+        cached = self.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = load()
+        self.set(key, (version, value))
+        return value
+
+
+class DiskCache:
+    """
+    Size bounded LRU cache in a SQLite file, shared by the worker processes
+    of a host and kept across restarts.
+
+    Values are pickled and written in a transaction, so readers never see a
+    partial entry. Entries are tagged, to be invalidated together. SQLite
+    errors are logged and read as misses, the cache never fails a request.
+
+    Access times are only written once per `touch_interval`, eviction is
+    least recently used at that resolution.
+    """
+
+    def __init__(
+        self, path: Path, max_bytes: int, touch_interval: float = TOUCH_INTERVAL
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        # connections are per thread and must not cross a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, tag TEXT, version TEXT, accessed REAL, "
+            "size INTEGER, value BLOB)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_tag ON entries (tag)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(
+        self, key: Hashable, version: Optional[Hashable] = None
+    ) -> Tuple[bool, Any]:
+        """
+        (found, value) of `key` stored at `version`.
+        """
+        if not self.enabled:
+            return False, None
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT version, accessed, value FROM entries WHERE key = ?",
+                (repr(key),),
+            ).fetchone()
+            if row is None or row[0] != repr(version):
+                return False, None
+            now = time.time()
+            if now - row[1] >= self.touch_interval:
+                conn.execute(
+                    "UPDATE entries SET accessed = ? WHERE key = ?", (now, repr(key))
+                )
+            return True, pickle.loads(row[2])
+        except (sqlite3.Error, pickle.UnpicklingError) as e:
+            logger.warning(f"Disk cache read of {key} failed: {e}")
+            return False, None
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        version: Optional[Hashable] = None,
+        tag: Optional[str] = None,
+    ) -> None:
+        if not self.enabled:
+            return
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (repr(key), tag, repr(version), time.time(), len(blob), blob),
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write of {key} failed: {e}")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_bytes:
+            return
+        # evict down to 90% so that every write doesn't evict
+        excess = total - self.max_bytes * 0.9
+        evicted = []
+        for key, size in conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed"
+        ).fetchall():
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def invalidate(self, tag: str) -> int:
+        """
+        Remove the entries tagged `tag`, returns how many were removed.
+        """
+        if not self.enabled:
+            return 0
+        try:
+            return (
+                self._connect()
+                .execute("DELETE FROM entries WHERE tag = ?", (tag,))
+                .rowcount
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache invalidation of {tag} failed: {e}")
+            return 0
+
+    def clear(self) -> None:
+        if self.enabled:
+            self._connect().execute("DELETE FROM entries")
+
+    def get_or_set(
+        self,
+        key: Hashable,
+        load: Callable[[], Any],
+        version: Optional[Hashable] = None,
+        tag: Optional[str] = None,
+    ) -> Any:
+        found, value = self.get(key, version)
+        if found:
+            return value
+        value = load()
+        self.set(key, value, version, tag)
+        return value
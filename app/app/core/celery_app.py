@@ -1,5 +1,63 @@
 from celery import Celery
+from kombu import Exchange, Queue
 
-celery_app = Celery("worker", broker="amqp://guest@queue//")
+from app.core.config import settings
 
-celery_app.conf.task_routes = {"app.worker.test_celery": "main-queue"}
+MAIN_QUEUE = "main-queue"
+EXPORT_QUEUE = "export-queue"
+GIT_QUEUE = "git-queue"
+PEDURMA_QUEUE = "pedurma-queue"
+IMPORT_QUEUE = "import-queue"
+
+# RabbitMQ priorities, higher is served first
+TASK_MAX_PRIORITY = 10
+PRIORITY_HIGH = 8
+PRIORITY_DEFAULT = 5
+PRIORITY_LOW = 2
+
+
+def priority_queue(name: str) -> Queue:
+    return Queue(
+        name,
+        Exchange(name),
+        routing_key=name,
+        queue_arguments={"x-max-priority": TASK_MAX_PRIORITY},
+    )
+
+
+celery_app = Celery(
+    "worker", broker=settings.CELERY_BROKER_URL, backend=settings.CELERY_RESULT_BACKEND
+)
+
+celery_app.conf.task_queues = [
+    # main-queue is already declared without priority on running brokers,
+    # redeclaring it with `x-max-priority` would fail.
+    Queue(MAIN_QUEUE, Exchange(MAIN_QUEUE), routing_key=MAIN_QUEUE),
+    priority_queue(EXPORT_QUEUE),
+    priority_queue(GIT_QUEUE),
+    priority_queue(PEDURMA_QUEUE),
+    priority_queue(IMPORT_QUEUE),
+]
+celery_app.conf.task_default_queue = MAIN_QUEUE
+
+celery_app.conf.task_routes = {
+    "app.worker.test_celery": {"queue": MAIN_QUEUE},
+    "app.worker.export_*": {"queue": EXPORT_QUEUE},
+    "app.worker.sync_*": {"queue": GIT_QUEUE},
+    "app.worker.push_*": {"queue": GIT_QUEUE},
+    "app.worker.pedurma_*": {"queue": PEDURMA_QUEUE},
+    "app.worker.import_*": {"queue": IMPORT_QUEUE},
+}
+
+celery_app.conf.update(
+    task_queue_max_priority=TASK_MAX_PRIORITY,
+    task_default_priority=PRIORITY_DEFAULT,
+    # Heavy tasks run for minutes: only ack once done, re-queue the task if
+    # the worker dies and never hold back more than one task per process.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_track_started=True,
+    result_expires=settings.CELERY_RESULT_EXPIRES,
+    result_extended=True,
+)
@@ -1,7 +1,7 @@
 import logging
 import os
 import secrets
-from functools import lru_cache
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
 from pydantic import AnyHttpUrl, BaseSettings, EmailStr, HttpUrl, PostgresDsn, validator
@@ -28,6 +28,33 @@ class Settings(BaseSettings):
         raise ValueError(v)
 
     PROJECT_NAME: str
+    REQUEST_TIMING_ENABLED: bool = True
+    METRICS_ENABLED: bool = True
+    PECHA_CACHE_SIZE: int = 512  # cached bases, layers and editor contents
+    DISK_CACHE_PATH: Path = Path.home() / ".openpecha" / "cache.sqlite3"
+    DISK_CACHE_SIZE_MB: int = 1024  # shared by the workers, 0 disables
+    # concurrent requests per worker and endpoint class, and queued ones
+    ADMISSION_LIMITS: Dict[str, int] = {"import": 2, "write": 4}
+    ADMISSION_QUEUE_SIZES: Dict[str, int] = {"import": 4, "write": 16}
+    ADMISSION_QUEUE_TIMEOUT: float = 30  # seconds, then 503
+    ADMISSION_RETRY_AFTER: int = 10  # seconds, sent on 429 and 503
+    COALESCE_MAX_WAITERS: int = 64  # per load, more callers load on their own
+    COALESCE_TIMEOUT: float = 60  # seconds waited for a concurrent load
+    CONTENT_CACHE_MAX_AGE: int = 0  # seconds pecha content is reused unchecked
+    BATCH_MAX_ITEMS: int = 100  # resources per batch request
+    SEARCH_MAX_BASES: int = 1000  # matching bases ranked per search
+    THUMBNAILS_PATH: Path = Path.home() / ".openpecha" / "thumbnails"
+    THUMBNAIL_WIDTHS: List[int] = [160, 320, 640]  # pixels, the second is `img`
+    THUMBNAIL_MAX_AGE: int = 365 * 24 * 3600  # seconds, thumbnail urls are versioned
+    # pechas the pedurma package reads, it doesn't take them as arguments
+    PEDURMA_PECHA_ID: str = "P000792"  # notes and pagination
+    PEDURMA_DERGE_PECHA_ID: str = "P000002"  # derge google texts, with google
+    PEDURMA_GOOGLE_PECHA_ID: str = "P000791"
+    PEDURMA_DERGE_GOOGLE_PECHA_IDS: List[str] = ["P000791", "P000793"]
+    WARMUP_PECHA_IDS: List[str] = []
+    WARMUP_RECENT_PECHAS: int = 0  # also warm up the N most recently edited
+    PROFILING_SAMPLE_RATE: int = 100  # stack samples per second, 0 disables
+    PROFILING_MAX_PROFILES: int = 100  # older profiles are deleted
     SENTRY_DSN: Optional[HttpUrl] = None
 
     @validator("SENTRY_DSN", pre=True)
@@ -54,10 +81,27 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    CELERY_BROKER_URL: str = "amqp://guest@queue//"
+    CELERY_RESULT_BACKEND: Optional[str] = None
+
+    @validator("CELERY_RESULT_BACKEND", pre=True)
+    def assemble_celery_result_backend(
+        cls, v: Optional[str], values: Dict[str, Any]
+    ) -> Any:
+        if isinstance(v, str):
+            return v
+        return f"db+{values.get('SQLALCHEMY_DATABASE_URI')}"
+
+    CELERY_RESULT_EXPIRES: int = 60 * 60 * 24  # seconds
+
+    PUBSUB_BACKEND: str = "amqp"  # amqp or memory
+    JOB_EVENTS_HEARTBEAT: int = 15  # seconds
+
     GITHUB_ACCESS_TOKEN_URL: str = "https://github.com/login/oauth/access_token"
     GITHUB_OAUTH_CLIENT_ID: str
     GITHUB_OAUTH_CLIENT_SECRET: str
     GITHUB_TOKEN: str
+    GITHUB_WEBHOOK_SECRET: Optional[str] = None  # push webhook, unset disables
 
     EMAIL_TEST_USER: EmailStr = "test@example.com"  # type: ignore
     FIRST_SUPERUSER_ID: int  # github user id
@@ -0,0 +1,205 @@
+import os
+import time
+from typing import Dict, Iterator
+
+from kombu import Connection
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+from app.core.config import settings
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Request latency per route",
+    ["method", "route"],
+)
+REQUESTS = Counter(
+    "http_requests_total",
+    "Requests per route and status",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being processed per route",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts_total", "Database pool checkouts")
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections checked out of the pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time waited for a connection from the database pool",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+
+GITHUB_API_CALLS = Counter(
+    "github_api_calls_total", "Calls made to the GitHub API", ["operation"]
+)
+PECHA_DOWNLOADS = Counter(
+    "pecha_downloads_total",
+    "download_pecha calls, `clone` when the pecha was not available locally",
+    ["kind"],
+)
+PECHA_REFRESHES = Counter(
+    "pecha_refreshes_total",
+    "Local clones refreshed on a GitHub push",
+    ["result"],
+)
+COALESCED_CALLS = Counter(
+    "coalesced_calls_total",
+    "Loads per outcome: `leader` computed it, `shared` reused a concurrent "
+    "one, `overflow` and `timeout` fell back to computing it again",
+    ["loader", "outcome"],
+)
+ADMISSION_ACTIVE = Gauge(
+    "admission_active_requests",
+    "Requests admitted per endpoint class",
+    ["endpoint_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued_requests",
+    "Requests waiting for admission per endpoint class",
+    ["endpoint_class"],
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds",
+    "Time waited for admission per endpoint class",
+    ["endpoint_class"],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0),
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests rejected per endpoint class, `queue_full` or `queue_timeout`",
+    ["endpoint_class", "reason"],
+)
+PAYLOAD_BYTES = Counter(
+    "response_payload_bytes_total",
+    "Bytes sent by the pecha content endpoints",
+    ["resource"],
+)
+
+PAYLOAD_RESOURCES = {
+    f"{settings.API_V1_STR}/pechas/{{pecha_id}}/base/{{base_name}}": "base",
+    f"{settings.API_V1_STR}/pechas/{{pecha_id}}/layers/{{base_name}}": "layer",
+    f"{settings.API_V1_STR}/pechas/{{pecha_id}}/layers/{{base_name}}/{{layer_name}}": "layer",
+    f"{settings.API_V1_STR}/pechas/{{pecha_id}}/{{base_name}}/editor": "editor",
+}
+
+
+def is_multiprocess() -> bool:
+    return bool(
+        os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+        or os.environ.get("prometheus_multiproc_dir")
+    )
+
+
+def get_route_path(request: Request) -> str:
+    """
+    Route template of the request, to keep label cardinality bounded.
+    """
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+def get_celery_queue_depths() -> Dict[str, int]:
+    from app.core.celery_app import celery_app
+
+    depths = {}
+    try:
+        with Connection(settings.CELERY_BROKER_URL, connect_timeout=2) as conn:
+            # fail fast, the default is to retry forever
+            conn.ensure_connection(max_retries=1)
+            channel = conn.default_channel
+            for queue in celery_app.conf.task_queues:
+                _, message_count, _ = channel.queue_declare(
+                    queue=queue.name, passive=True
+                )
+                depths[queue.name] = message_count
+    except Exception:
+        # broker down or queue not declared yet, the depth is not reported
+        pass
+    return depths
+
+
+class CeleryQueueCollector:
+    """
+    Depth of the Celery queues read from the broker on each scrape, by the
+    scraped process only, so that it goes down as the queues drain.
+    """
+
+    def describe(self) -> Iterator[GaugeMetricFamily]:
+        # registering must not connect to the broker
+        yield self.get_family()
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        depth = self.get_family()
+        for queue_name, message_count in get_celery_queue_depths().items():
+            depth.add_metric([queue_name], message_count)
+        yield depth
+
+    @staticmethod
+    def get_family() -> GaugeMetricFamily:
+        return GaugeMetricFamily(
+            "celery_queue_depth",
+            "Messages waiting in the Celery queue",
+            labels=["queue"],
+        )
+
+
+REGISTRY.register(CeleryQueueCollector())
+
+
+def generate_metrics() -> bytes:
+    if is_multiprocess():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(CeleryQueueCollector())
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        method = request.method
+        route = get_route_path(request)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method, route)
+        in_progress.inc()
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUESTS.labels(method, route, status).inc()
+            in_progress.dec()
+
+        resource = PAYLOAD_RESOURCES.get(route)
+        content_length = response.headers.get("content-length")
+        if resource and method == "GET" and content_length:
+            PAYLOAD_BYTES.labels(resource).inc(int(content_length))
+        return response
@@ -0,0 +1,155 @@
+import asyncio
+import functools
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+
+PROFILES_PATH = Path.home() / ".openpecha" / "profiles"
+PROFILE_SUFFIX = ".folded"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the attached threads at a fixed interval.
+
+    Stacks are kept in the collapsed format ("root;caller;callee count"),
+    which is read by speedscope and flamegraph.pl.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._thread_ids: Set[int] = set()
+        self._stopped = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._sampler = threading.Thread(target=self._run, daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    @contextmanager
+    def attach(self):
+        """
+        Sample the current thread while in the block.
+        """
+        thread_id = threading.get_ident()
+        self._thread_ids.add(thread_id)
+        try:
+            yield
+        finally:
+            self._thread_ids.discard(thread_id)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+        for thread_id in list(self._thread_ids):
+            frame = frames.get(thread_id)
+            if frame is not None:
+                self.stacks[get_stack(frame)] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+
+def get_frame_name(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename.rsplit("site-packages/", 1)[-1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def get_stack(frame) -> str:
+    names: List[str] = []
+    while frame is not None:
+        names.append(get_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_profiler: ContextVar[Optional[SamplingProfiler]] = ContextVar("profiler", default=None)
+
+
+@contextmanager
+def profile(interval: float):
+    """
+    Profile the current request, the endpoint attaches its own thread.
+    """
+    profiler = SamplingProfiler(interval)
+    token = _profiler.set(profiler)
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        _profiler.reset(token)
+
+
+@contextmanager
+def attach_current_thread():
+    profiler = _profiler.get()
+    if profiler is None:
+        yield
+        return
+    with profiler.attach():
+        yield
+
+
+def profiled_endpoint(endpoint: Callable) -> Callable:
+    # routes are copied, with their wrapped endpoint, on `include_router`
+    if getattr(endpoint, "__profiled__", False):
+        return endpoint
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            with attach_current_thread():
+                return await endpoint(*args, **kwargs)
+
+        async_wrapper.__profiled__ = True  # type: ignore
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with attach_current_thread():
+            return endpoint(*args, **kwargs)
+
+    wrapper.__profiled__ = True  # type: ignore
+    return wrapper
+
+
+def get_profile_fn(profile_id: str) -> Path:
+    return PROFILES_PATH / f"{profile_id}{PROFILE_SUFFIX}"
+
+
+def list_profiles() -> List[Path]:
+    if not PROFILES_PATH.is_dir():
+        return []
+    return sorted(PROFILES_PATH.glob(f"*{PROFILE_SUFFIX}"), reverse=True)
+
+
+def save_profile(profiler: SamplingProfiler, name: str, max_profiles: int) -> str:
+    """
+    Save the profile and delete the oldest ones over `max_profiles`.
+    """
+    profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{name}-{uuid.uuid4().hex[:8]}"
+    PROFILES_PATH.mkdir(parents=True, exist_ok=True)
+    get_profile_fn(profile_id).write_text(profiler.collapsed(), encoding="utf-8")
+    for old_profile_fn in list_profiles()[max_profiles:]:
+        old_profile_fn.unlink()
+    return profile_id
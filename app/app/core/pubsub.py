@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import socket
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Optional
+
+from kombu import Connection, Exchange
+from kombu import Queue as AMQPQueue
+from kombu.pools import producers
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# seconds between reconnections of the listener to the broker
+LISTENER_RETRY_DELAY = 5
+
+
+class Subscription:
+    async def get(self, timeout: float) -> Optional[Dict]:
+        """
+        Wait for the next message, returns None after `timeout` seconds.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class PubSub:
+    def publish(self, channel: str, message: Dict) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> Subscription:
+        """
+        Subscribe from a coroutine, messages are delivered on its event loop.
+        """
+        raise NotImplementedError
+
+
+class InMemorySubscription(Subscription):
+    def __init__(self, pubsub: "InMemoryPubSub", channel: str):
+        self.pubsub = pubsub
+        self.channel = channel
+        self.loop = asyncio.get_event_loop()
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    def put(self, message: Dict) -> None:
+        # publishers run on other threads
+        self.loop.call_soon_threadsafe(self.messages.put_nowait, message)
+
+    async def get(self, timeout: float) -> Optional[Dict]:
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.pubsub.unsubscribe(self)
+
+
+class InMemoryPubSub(PubSub):
+    """
+    Process local pub/sub, for tests and single process deployments.
+    """
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: Dict) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions[channel])
+        for subscription in subscriptions:
+            subscription.put(message)
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = InMemorySubscription(self, channel)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: InMemorySubscription) -> None:
+        with self._lock:
+            self._subscriptions[subscription.channel].discard(subscription)
+
+
+class AMQPPubSub(PubSub):
+    """
+    Fanout exchanges on the Celery broker, so that events published by the
+    workers reach every API process.
+
+    Each process consumes a channel once, on a listener thread with its own
+    broker connection, and hands the messages to its local subscriptions.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._local = InMemoryPubSub()
+        self._listeners: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_exchange(channel: str) -> Exchange:
+        return Exchange(f"pubsub.{channel}", type="fanout", durable=False)
+
+    def publish(self, channel: str, message: Dict) -> None:
+        exchange = self.get_exchange(channel)
+        with producers[Connection(self.url)].acquire(block=True) as producer:
+            producer.publish(
+                message, exchange=exchange, declare=[exchange], serializer="json"
+            )
+
+    def subscribe(self, channel: str) -> Subscription:
+        with self._lock:
+            if channel not in self._listeners:
+                listener = threading.Thread(
+                    target=self._listen,
+                    args=(channel,),
+                    name=f"pubsub-{channel}",
+                    daemon=True,
+                )
+                listener.start()
+                self._listeners[channel] = listener
+        return self._local.subscribe(channel)
+
+    def _listen(self, channel: str) -> None:
+        def on_message(body, message) -> None:
+            self._local.publish(channel, body)
+
+        while True:
+            try:
+                with Connection(self.url) as connection:
+                    # exclusive server named queue, dropped with the connection
+                    queue = AMQPQueue(
+                        "",
+                        exchange=self.get_exchange(channel),
+                        exclusive=True,
+                        auto_delete=True,
+                        durable=False,
+                    )
+                    with connection.Consumer(
+                        queue, callbacks=[on_message], accept=["json"], no_ack=True
+                    ):
+                        while True:
+                            try:
+                                connection.drain_events(timeout=1)
+                            except socket.timeout:
+                                pass
+            except Exception as e:
+                # events published meanwhile are lost, streams keep waiting
+                logger.warning(f"Lost the {channel} events of the broker: {e}")
+                time.sleep(LISTENER_RETRY_DELAY)
+
+
+@lru_cache()
+def get_pubsub() -> PubSub:
+    if settings.PUBSUB_BACKEND == "memory":
+        return InMemoryPubSub()
+    return AMQPPubSub(settings.CELERY_BROKER_URL)
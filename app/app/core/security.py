@@ -1,11 +1,15 @@
-from typing import Dict
+import hashlib
+import hmac
+from typing import Dict, Optional
 
 import requests
 
+from app.core import metrics
 from app.core.config import settings
 
 
 def get_github_access_token(code: str) -> Dict:
+    metrics.GITHUB_API_CALLS.labels("oauth_access_token").inc()
     response = requests.post(
         settings.GITHUB_ACCESS_TOKEN_URL,
         headers={"Accept": "application/json"},
@@ -16,3 +20,15 @@ def get_github_access_token(code: str) -> Dict:
         },
     )
     return response.json()
+
+
+def verify_github_signature(body: bytes, signature: Optional[str]) -> bool:
+    """
+    Check the `X-Hub-Signature-256` header of a GitHub webhook delivery.
+    """
+    if not settings.GITHUB_WEBHOOK_SECRET or not signature:
+        return False
+    digest = hmac.new(
+        settings.GITHUB_WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(f"sha256={digest}", signature)
@@ -0,0 +1,66 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.core import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs one call at a time per key, concurrent callers of the same key wait
+    for its result instead of computing it again.
+
+    Past `max_waiters` waiting callers, or after waiting `timeout` seconds,
+    callers compute the result on their own.
+    """
+
+    def __init__(self, name: str, max_waiters: int, timeout: float):
+        self.name = name
+        self.max_waiters = max_waiters
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                is_leader = True
+            elif call.waiters < self.max_waiters:
+                call.waiters += 1
+                is_leader = False
+            else:
+                call = None
+
+        if call is None:
+            metrics.COALESCED_CALLS.labels(self.name, "overflow").inc()
+            return fn()
+
+        if not is_leader:
+            if not call.done.wait(self.timeout):
+                metrics.COALESCED_CALLS.labels(self.name, "timeout").inc()
+                return fn()
+            metrics.COALESCED_CALLS.labels(self.name, "shared").inc()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.COALESCED_CALLS.labels(self.name, "leader").inc()
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
@@ -0,0 +1,162 @@
+import asyncio
+import functools
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+logger = logging.getLogger("app.timing")
+
+
+class RequestTimer:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.handler_returned_at: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, duration: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + duration
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def server_timing(self, total: float) -> str:
+        metrics = [
+            f"{name};dur={duration * 1000:.1f}"
+            for name, duration in self.phases.items()
+        ]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_request_timer: ContextVar[Optional[RequestTimer]] = ContextVar(
+    "request_timer", default=None
+)
+
+
+def get_request_timer() -> Optional[RequestTimer]:
+    return _request_timer.get()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Time a phase of the current request, as a context manager or a decorator.
+
+    Does nothing outside of a request.
+    """
+    timer = _request_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - start)
+
+
+def mark_handler_returned() -> None:
+    timer = _request_timer.get()
+    if timer is not None:
+        timer.handler_returned_at = time.perf_counter()
+
+
+def timed_endpoint(endpoint: Callable) -> Callable:
+    # routes are copied, with their wrapped endpoint, on `include_router`
+    if getattr(endpoint, "__timed__", False):
+        return endpoint
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            with span("handler"):
+                result = await endpoint(*args, **kwargs)
+            mark_handler_returned()
+            return result
+
+        async_wrapper.__timed__ = True  # type: ignore
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with span("handler"):
+            result = endpoint(*args, **kwargs)
+        mark_handler_returned()
+        return result
+
+    wrapper.__timed__ = True  # type: ignore
+    return wrapper
+
+
+class TimedRoute(APIRoute):
+    """
+    Route timing its endpoint as the `handler` phase.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, timed_endpoint(endpoint), **kwargs)
+
+
+class TimedRenderMixin:
+    """
+    Times the `encode` phase of a response, from the handler return to the
+    rendered body, so it covers response model validation too.
+    """
+
+    def render(self, content: Any) -> bytes:
+        timer = _request_timer.get()
+        if timer is None:
+            return super().render(content)  # type: ignore
+        start = timer.handler_returned_at or time.perf_counter()
+        body = super().render(content)  # type: ignore
+        timer.add("encode", time.perf_counter() - start)
+        return body
+
+
+class TimedJSONResponse(TimedRenderMixin, ORJSONResponse):
+    """
+    JSON response encoded with orjson, timing the `encode` phase.
+    """
+
+
+class TimingMiddleware(BaseHTTPMiddleware):
+    """
+    Adds a `Server-Timing` header and logs the phases of every request.
+    """
+
+    async def dispatch(
+        self, request: Request, call_next: RequestResponseEndpoint
+    ) -> Response:
+        timer = RequestTimer()
+        token = _request_timer.set(timer)
+        try:
+            response = await call_next(request)
+        finally:
+            _request_timer.reset(token)
+        total = timer.elapsed()
+        response.headers["Server-Timing"] = timer.server_timing(total)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status": response.status_code,
+                    "duration_ms": round(total * 1000, 1),
+                    "phases_ms": {
+                        name: round(duration * 1000, 1)
+                        for name, duration in timer.phases.items()
+                    },
+                }
+            )
+        )
+        return response
@@ -1,2 +1,5 @@
-from .crud_pecha import pecha
+from .crud_annotation import annotation
+from .crud_layer_revision import layer_revision
+from .crud_pecha import pecha, pecha_catalog
+from .crud_search import search_posting
 from .crud_user import user
@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models.annotation import Annotation
+
+
+class CRUDAnnotation:
+    def __init__(self):
+        self.model = Annotation
+
+    def get_multi_by_filters(
+        self,
+        db: Session,
+        *,
+        annotation_type: Optional[str] = None,
+        pecha_ids: Optional[List[str]] = None,
+        base_name: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> Tuple[int, List[Annotation]]:
+        query = db.query(self.model)
+        if annotation_type:
+            query = query.filter(self.model.annotation_type == annotation_type)
+        if pecha_ids:
+            query = query.filter(self.model.pecha_id.in_(pecha_ids))
+        if base_name:
+            query = query.filter(self.model.base_name == base_name)
+        total = query.count()
+        annotations = (
+            query.order_by(self.model.pecha_id, self.model.base_name, self.model.start)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return total, annotations
+
+    def get_pecha_ids(
+        self, db: Session, *, annotation_type: str, skip: int = 0, limit: int = 100
+    ) -> List[str]:
+        rows = (
+            db.query(self.model.pecha_id)
+            .filter(self.model.annotation_type == annotation_type)
+            .distinct()
+            .order_by(self.model.pecha_id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+        return [pecha_id for (pecha_id,) in rows]
+
+    def replace_layer(
+        self,
+        db: Session,
+        *,
+        pecha_id: str,
+        base_name: str,
+        annotation_type: str,
+        annotations: List[Dict],
+    ) -> None:
+        """
+        Replace the annotations of a layer in a single transaction.
+        """
+        db.query(self.model).filter(
+            self.model.pecha_id == pecha_id,
+            self.model.base_name == base_name,
+            self.model.annotation_type == annotation_type,
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(
+            self.model,
+            [
+                {
+                    **annotation,
+                    "pecha_id": pecha_id,
+                    "base_name": base_name,
+                    "annotation_type": annotation_type,
+                }
+                for annotation in annotations
+            ],
+        )
+        db.commit()
+
+
+annotation = CRUDAnnotation()
@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.layer_revision import LayerRevision
+
+
+class CRUDLayerRevision:
+    def __init__(self):
+        self.model = LayerRevision
+
+    def _filter(self, db: Session, pecha_id: str, base_name: str, annotation_type: str):
+        return db.query(self.model).filter(
+            self.model.pecha_id == pecha_id,
+            self.model.base_name == base_name,
+            self.model.annotation_type == annotation_type,
+        )
+
+    def get_latest(
+        self, db: Session, *, pecha_id: str, base_name: str, annotation_type: str
+    ) -> Optional[int]:
+        return (
+            self._filter(db, pecha_id, base_name, annotation_type)
+            .with_entities(func.max(self.model.revision))
+            .scalar()
+        )
+
+    def get_since(
+        self,
+        db: Session,
+        *,
+        pecha_id: str,
+        base_name: str,
+        annotation_type: str,
+        since: int,
+    ) -> List[LayerRevision]:
+        return (
+            self._filter(db, pecha_id, base_name, annotation_type)
+            .filter(self.model.revision > since)
+            .order_by(self.model.revision)
+            .all()
+        )
+
+    def create(
+        self,
+        db: Session,
+        *,
+        pecha_id: str,
+        base_name: str,
+        annotation_type: str,
+        revision: int,
+        changes: Dict,
+    ) -> LayerRevision:
+        """
+        Add the revision without committing, it fails on an existing one.
+        """
+        db_obj = self.model(
+            pecha_id=pecha_id,
+            base_name=base_name,
+            annotation_type=annotation_type,
+            revision=revision,
+            changes=changes,
+        )
+        db.add(db_obj)
+        db.flush()
+        return db_obj
+
+
+layer_revision = CRUDLayerRevision()
@@ -1,11 +1,13 @@
-from typing import List
+import re
+from typing import Dict, List, Optional
 
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.crud.base import CRUDBase
-from app.models.pecha import Pecha
-from app.schemas.pecha import PechaCreate, PechaUpdate
+from app.models.pecha import Pecha, PechaCatalog
+from app.schemas.pecha import PechaCreate, PechaSort, PechaUpdate
 
 
 class CRUDPecha(CRUDBase[Pecha, PechaCreate, PechaUpdate]):
@@ -30,5 +32,82 @@ class CRUDPecha(CRUDBase[Pecha, PechaCreate, PechaUpdate]):
             .all()
         )
 
+    def search(
+        self,
+        db: Session,
+        *,
+        q: Optional[str] = None,
+        owner_id: Optional[int] = None,
+        sort: PechaSort = PechaSort.title,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> List[Pecha]:
+        """
+        Pechas whose title contains `q`, case insensitive, which uses the
+        title trigram index on PostgreSQL.
+        """
+        query = db.query(self.model)
+        if q:
+            pattern = re.sub(r"([\\%_])", r"\\\1", q)
+            query = query.filter(Pecha.title.ilike(f"%{pattern}%", escape="\\"))
+        if owner_id is not None:
+            query = query.filter(Pecha.owner_id == owner_id)
+        column = Pecha.title if sort.value.lstrip("-") == "title" else Pecha.updated_at
+        order = column.desc().nullslast() if sort.value.startswith("-") else column
+        return query.order_by(order, Pecha.id).offset(skip).limit(limit).all()
+
+    def get_recently_edited(self, db: Session, *, limit: int = 10) -> List[Pecha]:
+        return (
+            db.query(self.model)
+            .order_by(Pecha.updated_at.desc().nullslast())
+            .limit(limit)
+            .all()
+        )
+
+    def mark_edited(self, db: Session, *, id: str) -> None:
+        db.query(self.model).filter(Pecha.id == id).update(
+            {Pecha.updated_at: func.now()}, synchronize_session=False
+        )
+        db.commit()
+
+    def set_img(self, db: Session, *, id: str, img: str) -> None:
+        # not an edit of the pecha, keeps updated_at
+        db.query(self.model).filter(Pecha.id == id).update(
+            {Pecha.img: img, Pecha.updated_at: Pecha.updated_at},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def get_multi_with_img_prefix(
+        self, db: Session, *, prefix: str, limit: Optional[int] = None
+    ) -> List[Pecha]:
+        return (
+            db.query(self.model)
+            .filter(Pecha.img.startswith(prefix, autoescape=True))
+            .order_by(Pecha.id)
+            .limit(limit)
+            .all()
+        )
+
+
+class CRUDPechaCatalog:
+    def __init__(self):
+        self.model = PechaCatalog
+
+    def get(self, db: Session, pecha_id: str) -> Optional[PechaCatalog]:
+        return db.query(self.model).get(pecha_id)
+
+    def upsert(self, db: Session, *, pecha_id: str, obj_in: Dict) -> PechaCatalog:
+        db_obj = self.get(db, pecha_id)
+        if db_obj is None:
+            db_obj = self.model(pecha_id=pecha_id)
+            db.add(db_obj)
+        for field, value in obj_in.items():
+            setattr(db_obj, field, value)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
 
 pecha = CRUDPecha(Pecha)
+pecha_catalog = CRUDPechaCatalog()
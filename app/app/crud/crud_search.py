@@ -0,0 +1,72 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Session
+
+from app.models.search import SearchPosting
+
+
+class CRUDSearchPosting:
+    def __init__(self):
+        self.model = SearchPosting
+
+    def get_by_ngrams(
+        self,
+        db: Session,
+        *,
+        ngrams: Iterable[str],
+        bases: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> List[SearchPosting]:
+        """
+        Postings of the n-grams, in the (pecha_id, base_name) `bases` only if
+        given.
+        """
+        query = db.query(self.model).filter(self.model.ngram.in_(list(ngrams)))
+        if bases is not None:
+            bases = list(bases)
+            if not bases:
+                return []
+            query = query.filter(
+                tuple_(self.model.pecha_id, self.model.base_name).in_(bases)
+            )
+        return query.all()
+
+    def get_bases(
+        self, db: Session, *, ngrams: Iterable[str], limit: int
+    ) -> List[Tuple[str, str, int]]:
+        """
+        (pecha_id, base_name, count) of the bases having all the n-grams, with
+        the count of the least frequent one, the highest counts first.
+        """
+        ngrams = set(ngrams)
+        count = func.min(self.model.count)
+        return (
+            db.query(self.model.pecha_id, self.model.base_name, count)
+            .filter(self.model.ngram.in_(ngrams))
+            .group_by(self.model.pecha_id, self.model.base_name)
+            .having(func.count(self.model.ngram) == len(ngrams))
+            .order_by(count.desc(), self.model.pecha_id, self.model.base_name)
+            .limit(limit)
+            .all()
+        )
+
+    def replace_base(
+        self, db: Session, *, pecha_id: str, base_name: str, postings: List[Dict]
+    ) -> None:
+        """
+        Replace the postings of a base in a single transaction.
+        """
+        db.query(self.model).filter(
+            self.model.pecha_id == pecha_id, self.model.base_name == base_name
+        ).delete(synchronize_session=False)
+        db.bulk_insert_mappings(
+            self.model,
+            [
+                {**posting, "pecha_id": pecha_id, "base_name": base_name}
+                for posting in postings
+            ],
+        )
+        db.commit()
+
+
+search_posting = CRUDSearchPosting()
@@ -1,5 +1,8 @@
 # Import all the models, so that Base has them before being
 # imported by alembic
 from app.db.base_class import Base
-from app.models.pecha import Pecha
+from app.models.annotation import Annotation
+from app.models.layer_revision import LayerRevision
+from app.models.pecha import Pecha, PechaCatalog
+from app.models.search import SearchPosting
 from app.models.user import User
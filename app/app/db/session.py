@@ -1,7 +1,36 @@
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
+from app.core import metrics
 from app.core.config import settings
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+
+class InstrumentedQueuePool(QueuePool):
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+
+engine = create_engine(
+    settings.SQLALCHEMY_DATABASE_URI,
+    pool_pre_ping=True,
+    poolclass=InstrumentedQueuePool,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@event.listens_for(engine, "checkout")
+def on_pool_checkout(dbapi_connection, connection_record, connection_proxy):
+    metrics.DB_POOL_CHECKOUTS.inc()
+    metrics.DB_POOL_CHECKED_OUT.inc()
+
+
+@event.listens_for(engine, "checkin")
+def on_pool_checkin(dbapi_connection, connection_record):
+    metrics.DB_POOL_CHECKED_OUT.dec()
@@ -1,16 +1,49 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from app.api.api_v1.api import api_router
+from app.core import metrics
 from app.core.config import settings
+from app.core.timing import TimedJSONResponse, TimingMiddleware
+from app.services import warmup
+from app.services.revisions import RevisionConflict
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     docs_url=f"{settings.API_V1_STR}/docs",
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     version=settings.API_V1_VERSION,
+    default_response_class=TimedJSONResponse,
 )
 
+
+@app.exception_handler(RevisionConflict)
+def revision_conflict_handler(request: Request, exc: RevisionConflict):
+    return TimedJSONResponse(
+        status_code=409,
+        content={"detail": "The layer is being written by others, try again"},
+    )
+
+
+if settings.REQUEST_TIMING_ENABLED:
+    app.add_middleware(TimingMiddleware)
+
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics():
+        return Response(metrics.generate_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+if settings.WARMUP_PECHA_IDS or settings.WARMUP_RECENT_PECHAS:
+
+    @app.on_event("startup")
+    def start_warmup():
+        warmup.start_warmup()
+
+
 # set all the CORS enable origins
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
@@ -1,2 +1,5 @@
-from .pecha import Pecha
+from .annotation import Annotation
+from .layer_revision import LayerRevision
+from .pecha import Pecha, PechaCatalog
+from .search import SearchPosting
 from .user import User
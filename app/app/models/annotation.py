@@ -0,0 +1,19 @@
+from sqlalchemy import JSON, Column, Index, Integer, String
+
+from app.db.base_class import Base
+
+
+class Annotation(Base):
+    """
+    Annotations of the pecha layers, indexed to be queried across pechas.
+    """
+
+    pecha_id = Column(String, primary_key=True)
+    base_name = Column(String, primary_key=True)
+    annotation_type = Column(String, primary_key=True)
+    id = Column(String, primary_key=True)
+    start = Column(Integer, nullable=False)
+    end = Column(Integer, nullable=False)
+    payload = Column(JSON, nullable=True)
+
+    __table_args__ = (Index("ix_annotation_type_pecha", "annotation_type", "pecha_id"),)
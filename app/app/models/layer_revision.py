@@ -0,0 +1,17 @@
+from sqlalchemy import JSON, Column, DateTime, Integer, String, func
+
+from app.db.base_class import Base
+
+
+class LayerRevision(Base):
+    """
+    Annotations changed by each revision of a layer written through the API.
+    """
+
+    pecha_id = Column(String, primary_key=True)
+    base_name = Column(String, primary_key=True)
+    annotation_type = Column(String, primary_key=True)
+    revision = Column(Integer, primary_key=True)
+    # {"upserted": {id: annotation}, "removed": [id]}
+    changes = Column(JSON, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
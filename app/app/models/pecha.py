@@ -1,6 +1,16 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import (
+    JSON,
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    func,
+)
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
@@ -14,5 +24,41 @@ class Pecha(Base):
     title = Column(String, index=True, nullable=True)
     img = Column(String, index=True, nullable=True)
     owner_id = Column(Integer, ForeignKey("user.id"))
+    updated_at = Column(
+        DateTime, server_default=func.now(), onupdate=func.now(), index=True
+    )
     owner = relationship("User", back_populates="pechas")
     collaborators = relationship("User", back_populates="pechas")
+    catalog = relationship(
+        "PechaCatalog",
+        primaryjoin="Pecha.id == foreign(PechaCatalog.pecha_id)",
+        uselist=False,
+        viewonly=True,
+        lazy="joined",
+    )
+
+    # substring search on titles, a plain index on other databases
+    __table_args__ = (
+        Index(
+            "ix_pecha_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+
+
+class PechaCatalog(Base):
+    """
+    Denormalized content metadata of a pecha, kept up to date on writes so
+    listings don't load OPF files.
+    """
+
+    pecha_id = Column(String, primary_key=True)
+    components = Column(JSON, nullable=False)  # layer names per base
+    components_version = Column(JSON, nullable=True)  # of the local layers dir
+    base_count = Column(Integer, nullable=False)
+    base_sizes = Column(JSON, nullable=False)  # bytes per base
+    layer_counts = Column(JSON, nullable=False)  # annotations per base and layer
+    last_commit = Column(String, nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,18 @@
+from sqlalchemy import JSON, Column, Index, Integer, String
+
+from app.db.base_class import Base
+
+
+class SearchPosting(Base):
+    """
+    Occurrences of a syllable n-gram in a base, as [syllable number, start,
+    end] positions.
+    """
+
+    ngram = Column(String, primary_key=True)
+    pecha_id = Column(String, primary_key=True)
+    base_name = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False)
+    positions = Column(JSON, nullable=False)
+
+    __table_args__ = (Index("ix_searchposting_base", "pecha_id", "base_name"),)
@@ -0,0 +1,19 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.search import Span
+
+
+class AnnotationMatch(BaseModel):
+    pecha_id: str
+    base_name: str
+    annotation_type: str
+    id: str
+    span: Span
+    payload: Optional[Dict[str, Any]]
+
+
+class AnnotationResults(BaseModel):
+    total: int
+    annotations: List[AnnotationMatch]
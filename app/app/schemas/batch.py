@@ -0,0 +1,33 @@
+from enum import Enum
+from typing import Any, List, Optional
+
+from openpecha.core.layer import LayersEnum
+from pydantic import BaseModel
+
+
+class BatchResource(str, Enum):
+    base = "base"
+    layer = "layer"
+    components = "components"
+    editor = "editor"
+
+
+class BatchItem(BaseModel):
+    resource: BatchResource
+    pecha_id: str
+    base_name: Optional[str] = None
+    layer_name: Optional[LayersEnum] = None
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+
+class BatchResult(BaseModel):
+    status: int
+    data: Any = None
+    detail: Optional[str] = None
+
+
+class BatchResults(BaseModel):
+    results: List[BatchResult]
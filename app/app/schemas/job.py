@@ -0,0 +1,19 @@
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+
+class Job(BaseModel):
+    job_id: str
+    state: str
+    result: Optional[Any] = None
+
+
+class JobEvent(BaseModel):
+    job_id: str
+    task: Optional[str] = None
+    user_id: Optional[int] = None
+    state: str
+    progress: Optional[float] = None  # 0 to 1
+    message: Optional[str] = None
+    timestamp: float
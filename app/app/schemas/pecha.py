@@ -1,4 +1,6 @@
-from typing import Collection, List, Optional
+from datetime import datetime
+from enum import Enum
+from typing import Collection, Dict, List, Optional
 
 from pydantic import AnyHttpUrl, BaseModel
 
@@ -42,6 +44,10 @@ class PedurmaNoteEdit(BaseModel):
     vol: int
 
 
+class PedurmaPaginationUpdate(BaseModel):
+    changed_pages: Dict[str, List[str]]
+
+
 class EditorContent(BaseModel):
     content: str
 
@@ -66,6 +72,25 @@ class PechaUpdate(PechaBase):
     title: str
 
 
+class PechaSort(str, Enum):
+    title = "title"
+    title_desc = "-title"
+    updated_at = "updated_at"
+    updated_at_desc = "-updated_at"
+
+
+class PechaCatalog(BaseModel):
+    components: Dict[str, List[str]]
+    base_count: int
+    base_sizes: Dict[str, int]
+    layer_counts: Dict[str, Dict[str, int]]
+    last_commit: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+
 class PechaInDBBase(PechaBase):
     id: str
     title: str
@@ -77,7 +102,7 @@ class PechaInDBBase(PechaBase):
 
 
 class Pecha(PechaInDBBase):
-    pass
+    catalog: Optional[PechaCatalog] = None
 
 
 class PechaInDB(PechaInDBBase):
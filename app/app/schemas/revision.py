@@ -0,0 +1,9 @@
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+
+
+class LayerChanges(BaseModel):
+    revision: str
+    upserted: Dict[str, Any]
+    removed: List[str]
@@ -0,0 +1,20 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class Span(BaseModel):
+    start: int
+    end: int
+
+
+class SearchHit(BaseModel):
+    pecha_id: str
+    base_name: str
+    span: Span
+    score: float
+
+
+class SearchResults(BaseModel):
+    total: int
+    hits: List[SearchHit]
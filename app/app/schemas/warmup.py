@@ -0,0 +1,13 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class WarmupStatus(BaseModel):
+    state: str = "idle"  # idle, running or done
+    total: int = 0
+    warmed: int = 0
+    failed: List[str] = []
+    current: Optional[str] = None
+    started_at: Optional[float] = None
+    duration: Optional[float] = None  # seconds
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class GithubRepository(BaseModel):
+    name: str
+
+
+class GithubPush(BaseModel):
+    ref: str
+    deleted: bool = False
+    repository: GithubRepository
@@ -0,0 +1,34 @@
+import logging
+import sys
+
+from app import crud
+from app.db.session import SessionLocal
+from app.services import annotations, catalog, search
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    """
+    Index the bases and layers, and update the catalog, of the given pechas
+    or of all the pechas.
+    """
+    db = SessionLocal()
+    pecha_ids = sys.argv[1:] or [
+        pecha.id for pecha in crud.pecha.get_multi(db, limit=None)
+    ]
+    for pecha_id in pecha_ids:
+        logger.info(f"Indexing {pecha_id}")
+        try:
+            search.index_pecha(db, pecha_id)
+            annotations.index_pecha(db, pecha_id)
+            catalog.update_catalog(db, pecha_id)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Could not index {pecha_id}: {e}")
+    logger.info(f"Indexed {len(pecha_ids)} pechas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+from typing import Dict, List
+
+from openpecha.core.layer import LayersEnum
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.timing import span
+from app.services.layers import CompactLayer
+
+PAYLOAD_TYPES = (str, int, float, bool)
+
+
+def get_annotation_rows(layer: CompactLayer) -> List[Dict]:
+    """
+    Index rows of the annotations of a layer, the payload keeps the scalar
+    fields besides the span.
+    """
+    rows = []
+    for index, annotation_id in enumerate(layer.ids):
+        if not layer.has_span(index):
+            continue
+        payload = {
+            name: value
+            for name, value in layer.payloads[index].items()
+            if name not in ("id", "span") and isinstance(value, PAYLOAD_TYPES)
+        }
+        rows.append(
+            {
+                "id": annotation_id,
+                "start": layer.starts[index],
+                "end": layer.ends[index],
+                "payload": payload or None,
+            }
+        )
+    return rows
+
+
+def index_layer(
+    db: Session, pecha_id: str, base_name: str, layer: CompactLayer
+) -> None:
+    with span("index"):
+        crud.annotation.replace_layer(
+            db,
+            pecha_id=pecha_id,
+            base_name=base_name,
+            annotation_type=layer.annotation_type.value,
+            annotations=get_annotation_rows(layer),
+        )
+
+
+def index_base_layers(db: Session, pecha_id: str, base_name: str) -> None:
+    from app.services.pechas import get_pecha, load_compact_layer, load_components
+
+    pecha = get_pecha(pecha_id)
+    for layer_name in load_components(pecha).get(base_name, []):
+        index_layer(
+            db, pecha_id, base_name, load_compact_layer(pecha, base_name, layer_name)
+        )
+
+
+def index_pecha(db: Session, pecha_id: str) -> None:
+    from app.services.pechas import get_pecha, load_components
+
+    for base_name in load_components(get_pecha(pecha_id)):
+        index_base_layers(db, pecha_id, base_name)
+
+
+def index_pecha_layer(
+    db: Session, pecha_id: str, base_name: str, layer_name: LayersEnum
+) -> None:
+    from app.services.pechas import get_pecha, load_compact_layer
+
+    layer = load_compact_layer(get_pecha(pecha_id), base_name, layer_name)
+    index_layer(db, pecha_id, base_name, layer)
@@ -0,0 +1,21 @@
+import logging
+from typing import Any, Callable
+
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+def run_index_task(fn: Callable[..., Any], db: Session, *args: Any) -> None:
+    """
+    Update an index or the catalog after a write, as a background task.
+
+    Failures are logged only: the write is done, and the index or catalog
+    is updated again on the next write or by search_index.
+    """
+    try:
+        fn(db, *args)
+    except Exception as e:
+        db.rollback()
+        target = "/".join(str(getattr(arg, "value", arg)) for arg in args)
+        logger.warning(f"Could not run {fn.__name__} for {target}: {e}")
@@ -0,0 +1,74 @@
+import logging
+from typing import Any, Dict, List
+
+from sqlalchemy.orm import Session
+
+from app.schemas.batch import BatchItem, BatchResource, BatchResult
+from app.services import pechas
+from app.services.catalog import get_components
+
+logger = logging.getLogger(__name__)
+
+
+class BatchItemError(Exception):
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def load_item(pecha, item: BatchItem) -> Any:
+    if not item.base_name:
+        raise BatchItemError(422, "base_name is required")
+    if item.resource == BatchResource.base:
+        return pechas.load_base(pecha, item.base_name)
+    if item.resource == BatchResource.layer:
+        if item.layer_name is None:
+            raise BatchItemError(422, "layer_name is required")
+        return pechas.load_layer(pecha, item.base_name, item.layer_name)
+    content = pechas.load_editor_content(pecha, item.base_name)
+    if content is None:
+        raise FileNotFoundError(item.base_name)
+    return {"content": content}
+
+
+def read_items(db: Session, items: List[BatchItem]) -> List[BatchResult]:
+    """
+    Resources of several pechas, each pecha is loaded once for all its items.
+
+    A failing item gets its own status and does not fail the others.
+    """
+    loaded: Dict[str, Any] = {}
+
+    def get_pecha(pecha_id: str):
+        if pecha_id not in loaded:
+            try:
+                loaded[pecha_id] = pechas.get_pecha(pecha_id)
+            except Exception as e:
+                loaded[pecha_id] = BatchItemError(404, f"Pecha {pecha_id} not found")
+                logger.warning(f"Could not load {pecha_id}: {e}")
+        if isinstance(loaded[pecha_id], BatchItemError):
+            raise loaded[pecha_id]
+        return loaded[pecha_id]
+
+    results = []
+    for item in items:
+        try:
+            if item.resource == BatchResource.components:
+                # on a catalog miss, the pecha is loaded for the other items too
+                data = get_components(
+                    db, item.pecha_id, lambda: get_pecha(item.pecha_id)
+                )
+            else:
+                data = load_item(get_pecha(item.pecha_id), item)
+        except BatchItemError as e:
+            results.append(BatchResult(status=e.status, detail=e.detail))
+        except FileNotFoundError:
+            results.append(BatchResult(status=404, detail="Not found"))
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"Could not read {item}: {e}")
+            results.append(BatchResult(status=500, detail="Internal error"))
+        else:
+            results.append(BatchResult(status=200, data=data))
+    return results
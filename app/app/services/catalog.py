@@ -0,0 +1,95 @@
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from openpecha import config
+from sqlalchemy.orm import Session
+
+from app import crud, models
+
+
+def get_last_commit(pecha) -> Optional[str]:
+    from git import Repo
+
+    try:
+        return Repo(str(pecha.opf_path.parent)).head.commit.hexsha
+    except Exception:
+        # not a git clone, or no commit yet
+        return None
+
+
+def get_local_components_version(pecha_id: str) -> Optional[List]:
+    """
+    Version of the components in the local clone of the pecha, as stored in
+    JSON, None when it's not cloned.
+    """
+    from app.services.pechas import get_components_version
+
+    layers_path = config.PECHAS_PATH / pecha_id / f"{pecha_id}.opf" / "layers"
+    if not layers_path.is_dir():
+        return None
+    return json.loads(json.dumps(get_components_version(layers_path)))
+
+
+def get_catalog_entry(pecha) -> Dict:
+    from app.services.pechas import (
+        get_components_version,
+        load_compact_layer,
+        load_components,
+    )
+
+    # read before the components, a concurrent change makes it stale
+    components_version = get_components_version(pecha.layers_path)
+    components = load_components(pecha)
+    base_fns = sorted(pecha.base_path.glob("*.txt"))
+    return {
+        "components": {
+            base_name: [layer_name.value for layer_name in layer_names]
+            for base_name, layer_names in components.items()
+        },
+        "components_version": components_version,
+        "base_count": len(base_fns),
+        "base_sizes": {base_fn.stem: base_fn.stat().st_size for base_fn in base_fns},
+        "layer_counts": {
+            base_name: {
+                layer_name.value: len(load_compact_layer(pecha, base_name, layer_name))
+                for layer_name in layer_names
+            }
+            for base_name, layer_names in components.items()
+        },
+        "last_commit": get_last_commit(pecha),
+    }
+
+
+def update_catalog(db: Session, pecha_id: str, pecha=None) -> models.PechaCatalog:
+    from app.services.pechas import get_pecha
+
+    pecha = pecha or get_pecha(pecha_id)
+    return crud.pecha_catalog.upsert(
+        db, pecha_id=pecha_id, obj_in=get_catalog_entry(pecha)
+    )
+
+
+def get_components(
+    db: Session, pecha_id: str, load_pecha: Optional[Callable[[], Any]] = None
+) -> Dict[str, List[str]]:
+    """
+    Components from the catalog, the pecha is loaded only when missing or
+    when the components of the local clone have changed since, by
+    `load_pecha` if given.
+
+    Writes update the catalog in the background, this keeps their
+    components fresh meanwhile.
+    """
+    catalog = crud.pecha_catalog.get(db, pecha_id)
+    version = get_local_components_version(pecha_id)
+    if catalog is None or (
+        version is not None and catalog.components_version != version
+    ):
+        catalog = update_catalog(db, pecha_id, load_pecha() if load_pecha else None)
+    return catalog.components
+
+
+def get_components_etag(components: Dict[str, List[str]]) -> str:
+    content = json.dumps(components, sort_keys=True).encode("utf-8")
+    return f'"{hashlib.sha1(content).hexdigest()}"'
@@ -0,0 +1,87 @@
+import time
+import uuid
+from typing import AsyncIterator, Callable, Optional
+
+from app.core.pubsub import PubSub, get_pubsub
+from app.schemas.job import JobEvent
+
+JOB_EVENTS_CHANNEL = "jobs"
+
+FINAL_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+
+
+def new_job_id(user_id: int) -> str:
+    """
+    Celery task id of a job queued by the user, who owns it from the start.
+    """
+    # celery's own ids are bare uuids, without a dot
+    return f"{user_id}.{uuid.uuid4()}"
+
+
+def get_job_owner_id(job_id: str) -> Optional[int]:
+    owner_id, separator, _ = job_id.partition(".")
+    if not separator or not owner_id.isdigit():
+        return None
+    return int(owner_id)
+
+
+def publish_job_event(
+    job_id: str,
+    state: str,
+    task: Optional[str] = None,
+    user_id: Optional[int] = None,
+    progress: Optional[float] = None,
+    message: Optional[str] = None,
+    pubsub: Optional[PubSub] = None,
+) -> JobEvent:
+    event = JobEvent(
+        job_id=job_id,
+        task=task,
+        user_id=user_id,
+        state=state,
+        progress=progress,
+        message=message,
+        timestamp=time.time(),
+    )
+    pubsub = pubsub or get_pubsub()
+    pubsub.publish(JOB_EVENTS_CHANNEL, event.dict())
+    return event
+
+
+def format_sse(event: JobEvent) -> str:
+    return f"id: {event.job_id}\nevent: {event.state}\ndata: {event.json()}\n\n"
+
+
+async def stream_job_events(
+    pubsub: PubSub,
+    match: Callable[[JobEvent], bool],
+    heartbeat: float,
+    initial_event: Optional[JobEvent] = None,
+    until_final: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Server-sent events of the jobs matching `match`, waited for on the event
+    loop so that open streams hold no thread.
+
+    A comment line is sent every `heartbeat` seconds without events so that
+    proxies keep the connection open and closed clients are noticed.
+    """
+    subscription = pubsub.subscribe(JOB_EVENTS_CHANNEL)
+    try:
+        if initial_event:
+            yield format_sse(initial_event)
+            if until_final and initial_event.state in FINAL_STATES:
+                return
+        while True:
+            message = await subscription.get(timeout=heartbeat)
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            event = JobEvent.parse_obj(message)
+            if not match(event):
+                continue
+            yield format_sse(event)
+            if until_final and event.state in FINAL_STATES:
+                return
+    finally:
+        subscription.close()
@@ -0,0 +1,219 @@
+import copy
+import sys
+from array import array
+from typing import Any, Dict, Hashable, List, Union
+
+from openpecha.core.layer import Layer, LayersEnum
+
+# span offsets, 64 bits as bases can be larger than 2 GB
+OFFSET_TYPECODE = "q"
+# payload values shared as is, the others are copied for each annotation
+IMMUTABLE_TYPES = (str, int, float, bool, type(None))
+
+
+class CompactLayer:
+    """
+    Layer kept in memory with the annotation spans in parallel arrays and
+    identical payloads shared, about a tenth of the size of a `Layer`.
+
+    The payload of an annotation is the annotation without its span, the
+    span key is kept with a None value so the key order survives
+    `to_layer`. Keys of the span besides start and end, like the
+    `fail_update` of Blupdate, are in `span_extras`, which is False for
+    annotations without span.
+    """
+
+    __slots__ = (
+        "id",
+        "annotation_type",
+        "revision",
+        "ids",
+        "starts",
+        "ends",
+        "payloads",
+        "span_extras",
+    )
+
+    def __init__(self, id: str, annotation_type: LayersEnum, revision: str):
+        self.id = id
+        self.annotation_type = annotation_type
+        self.revision = revision
+        self.ids: List[str] = []
+        self.starts = array(OFFSET_TYPECODE)
+        self.ends = array(OFFSET_TYPECODE)
+        self.payloads: List[Dict] = []
+        self.span_extras: List[Union[Dict, None, bool]] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_layer(cls, layer: Layer) -> "CompactLayer":
+        compact_layer = cls(layer.id, layer.annotation_type, layer.revision)
+        interned_payloads: Dict[Hashable, Dict] = {}
+        for annotation_id, annotation in layer.annotations.items():
+            if not isinstance(annotation, dict):
+                annotation = annotation.dict()
+            ann_span = annotation.get("span")
+            payload = {
+                sys.intern(name): intern_value(value)
+                for name, value in annotation.items()
+            }
+            if isinstance(ann_span, dict) and "start" in ann_span and "end" in ann_span:
+                payload["span"] = None
+                start, end = ann_span["start"], ann_span["end"]
+                span_extra = {
+                    name: value
+                    for name, value in ann_span.items()
+                    if name not in ("start", "end")
+                } or None
+            else:
+                # kept whole in the payload
+                start = end = -1
+                span_extra = False
+            compact_layer.ids.append(annotation_id)
+            compact_layer.starts.append(start)
+            compact_layer.ends.append(end)
+            compact_layer.payloads.append(intern_payload(interned_payloads, payload))
+            compact_layer.span_extras.append(span_extra)
+        return compact_layer
+
+    def has_span(self, index: int) -> bool:
+        return self.span_extras[index] is not False
+
+    def get_annotation(self, index: int) -> Dict:
+        """
+        New annotation dict, nested values included, which the caller can
+        modify.
+        """
+        annotation = {
+            name: copy_value(value) for name, value in self.payloads[index].items()
+        }
+        if self.has_span(index):
+            annotation["span"] = {
+                "start": self.starts[index],
+                "end": self.ends[index],
+                **{
+                    name: copy_value(value)
+                    for name, value in (self.span_extras[index] or {}).items()
+                },
+            }
+        return annotation
+
+    def to_layer(self) -> Layer:
+        """
+        `Layer` with new annotation dicts, which the caller can modify.
+        """
+        return Layer.construct(
+            id=self.id,
+            annotation_type=self.annotation_type,
+            revision=self.revision,
+            annotations={
+                annotation_id: self.get_annotation(index)
+                for index, annotation_id in enumerate(self.ids)
+            },
+        )
+
+    def set_span_extra(self, index: int, name: str, value: Any) -> None:
+        self.span_extras[index] = {**(self.span_extras[index] or {}), name: value}
+
+    def reanchor(self, updater) -> None:
+        """
+        Move the spans to the base of a `Blupdate`, as its `update_span`
+        does: when a coordinate can't be updated the span stays and its
+        `fail_update` is set.
+        """
+        import numpy as np
+
+        indices = np.array(
+            [index for index in range(len(self)) if self.has_span(index)],
+            dtype=np.int64,
+        )
+        if not len(indices):
+            return
+        old_starts = np.frombuffer(self.starts, dtype=np.int64)[indices]
+        old_ends = np.frombuffer(self.ends, dtype=np.int64)[indices]
+        coords = get_updated_coords(updater, np.concatenate([old_starts, old_ends]))
+        starts, ends = coords[: len(indices)], coords[len(indices) :]
+
+        failed_starts, failed_ends = starts == -1, ends == -1
+        failed = failed_starts | failed_ends
+        for index, failed_start, failed_end in zip(
+            indices[failed].tolist(),
+            failed_starts[failed].tolist(),
+            failed_ends[failed].tolist(),
+        ):
+            if failed_start and failed_end:
+                self.set_span_extra(index, "fail_update", "both")
+            elif failed_start:
+                self.set_span_extra(index, "fail_update", "start")
+            else:
+                self.set_span_extra(index, "fail_update", "end")
+
+        updated = ~failed
+        for offsets, new_offsets in ((self.starts, starts), (self.ends, ends)):
+            np.frombuffer(offsets, dtype=np.int64)[indices[updated]] = new_offsets[
+                updated
+            ]
+
+
+def get_updated_coords(updater, coords):
+    """
+    `Blupdate.get_updated_coord` of all the `coords` numpy array at once.
+
+    The common chunks of the diff are a sorted breakpoint table: the chunk
+    of a coordinate is the first one ending after it, found with
+    `searchsorted`. Coordinates inside a chunk are shifted by its offset,
+    the ones on its first character or between chunks are estimated and
+    looked up with diff-match-patch by Blupdate, once per distinct
+    coordinate.
+    """
+    import numpy as np
+
+    if not updater.cctv:
+        return np.full(len(coords), -1, dtype=np.int64)
+    chunk_starts, chunk_ends, offsets = (
+        np.array(column, dtype=np.int64) for column in zip(*updater.cctv)
+    )
+    chunks = np.searchsorted(chunk_ends, coords, side="right")
+    found = chunks < len(chunk_ends)
+    chunks = np.minimum(chunks, len(chunk_ends) - 1)
+    prev_offsets = np.where(chunks > 0, offsets[chunks - 1], 0)
+    # ceil((prev + offset) / 2) as in Blupdate.get_cctv_for_coord
+    estimates = np.where(
+        coords < chunk_starts[chunks],
+        -((-(prev_offsets + offsets[chunks])) // 2),
+        offsets[chunks],
+    )
+
+    updated = np.full(len(coords), -1, dtype=np.int64)
+    certain = found & (coords > chunk_starts[chunks])
+    updated[certain] = coords[certain] + offsets[chunks[certain]]
+    uncertain = found & ~certain
+    lookups = {}
+    for index in np.flatnonzero(uncertain).tolist():
+        key = (int(coords[index]), int(estimates[index]))
+        if key not in lookups:
+            lookups[key] = updater.get_updated_with_dmp(*key)
+        updated[index] = lookups[key]
+    return updated
+
+
+def copy_value(value: Any) -> Any:
+    return value if isinstance(value, IMMUTABLE_TYPES) else copy.deepcopy(value)
+
+
+def intern_value(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def intern_payload(interned_payloads: Dict[Hashable, Dict], payload: Dict) -> Dict:
+    """
+    The payload equal to `payload` already in the layer, if it's hashable.
+    """
+    try:
+        key = tuple(payload.items())
+        return interned_payloads.setdefault(key, payload)
+    except TypeError:
+        # nested values
+        return payload
@@ -1,26 +1,304 @@
+import fcntl
+import hashlib
 import tempfile
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 from fastapi import UploadFile
-from openpecha.blupdate import Blupdate, update_ann_layer
-from openpecha.catalog.manager import CatalogManager
-from openpecha.cli import download_pecha
-from openpecha.core.layer import Layer
-from openpecha.core.pecha import OpenPechaFS
-from openpecha.formatters.editor import EditorParser
-from openpecha.formatters.empty import EmptyEbook
-from openpecha.github_utils import create_release
-from openpecha.serializers import EditorSerializer, EpubSerializer
+from openpecha import config
+from openpecha.core.layer import Layer, LayersEnum
 
+from app.core import metrics
+from app.core.cache import DiskCache, LRUCache
 from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.core.timing import span
+from app.services.layers import CompactLayer
 from app.utils import save_upload_file_tmp
 
+# parsed bases, layers, components and editor content, keyed by
+# (pecha_id, kind, ...) and versioned by the stat of their files
+pecha_cache = LRUCache(settings.PECHA_CACHE_SIZE)
+# second level behind `pecha_cache`, shared by the workers of the host
+pecha_disk_cache = DiskCache(
+    settings.DISK_CACHE_PATH, settings.DISK_CACHE_SIZE_MB * 1024 * 1024
+)
+# concurrent misses of the same entry share a single load
+pecha_loads = SingleFlight(
+    "pecha", settings.COALESCE_MAX_WAITERS, settings.COALESCE_TIMEOUT
+)
+
+
+# openpecha serializers, formatters, cli and github_utils pull in PyGithub,
+# GitPython and rdflib, they are imported on first use to keep the workers
+# startup fast.
+def download_pecha(
+    pecha_id: str, branch: Optional[str] = None, needs_update: bool = False
+):
+    """
+    Clone of the pecha, on the default branch of openpecha's `download_pecha`
+    when `branch` is None.
+    """
+    from openpecha import cli
+
+    if branch is None:
+        return cli.download_pecha(pecha_id, needs_update=needs_update)
+    return cli.download_pecha(pecha_id, branch=branch, needs_update=needs_update)
+
+
+def create_release(repo_name: str, **kwargs) -> str:
+    from openpecha import github_utils
+
+    return github_utils.create_release(repo_name, **kwargs)
+
+
+@contextmanager
+def _flock(lock_fn: Path, operation: int):
+    with lock_fn.open("w") as lock_file:
+        fcntl.flock(lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def pecha_lock(pecha_id: str, *names: str):
+    """
+    Serialize the clone, checkout and refresh of a pecha across workers, or
+    the writes of one of its files given by `names`, like a base and a layer.
+
+    Writes hold the pecha lock shared, so they run concurrently on distinct
+    files but never during a refresh of the clone.
+    """
+    locks_path = config.PECHAS_PATH / ".locks"
+    locks_path.mkdir(parents=True, exist_ok=True)
+    if not names:
+        with _flock(locks_path / f"{pecha_id}.lock", fcntl.LOCK_EX):
+            yield
+        return
+    lock_name = ".".join((pecha_id, *names))
+    with _flock(locks_path / f"{pecha_id}.lock", fcntl.LOCK_SH):
+        with _flock(locks_path / f"{lock_name}.lock", fcntl.LOCK_EX):
+            yield
+
+
+def get_pecha_path(pecha_id: str, branch: Optional[str] = "review"):
+    def download():
+        with pecha_lock(pecha_id):
+            is_local = (config.PECHAS_PATH / pecha_id).is_dir()
+            pecha_path = download_pecha(pecha_id, branch=branch, needs_update=False)
+        metrics.PECHA_DOWNLOADS.labels("local" if is_local else "clone").inc()
+        return pecha_path
+
+    with span("download"):
+        return pecha_loads.do(("path", pecha_id, branch), download)
+
+
+def refresh_pecha(pecha_id: str, branch: str) -> bool:
+    """
+    Fetch and fast-forward `branch` of the local clone of a pecha, returns
+    False when the pecha is not cloned, it will be cloned up to date on
+    first use.
+
+    Other workers see the new files through the cache versions.
+    """
+    from git import Repo
+
+    pecha_path = config.PECHAS_PATH / pecha_id
+    if not pecha_path.is_dir():
+        return False
+    with pecha_lock(pecha_id):
+        repo = Repo(str(pecha_path))
+        if not repo.head.is_detached and repo.active_branch.name == branch:
+            repo.git.fetch("origin", branch)
+            repo.git.merge("--ff-only", "FETCH_HEAD")
+        else:
+            # fast-forwards the local branch, git refuses when it diverged
+            repo.git.fetch("origin", f"{branch}:{branch}")
+    invalidate_pecha_cache(pecha_id)
+    return True
+
 
 def get_pecha(pecha_id):
-    pecha_path = download_pecha(pecha_id, branch="review", needs_update=False)
-    pecha = OpenPechaFS(opf_path=pecha_path / f"{pecha_id}.opf")
+    from openpecha.core.pecha import OpenPechaFS
+
+    pecha_path = get_pecha_path(pecha_id)
+    # OpenPecha defaults are shared mutable dicts, which would leak bases
+    # and layers between instances
+    pecha = OpenPechaFS(
+        opf_path=pecha_path / f"{pecha_id}.opf",
+        base={},
+        layers=defaultdict(dict),
+        assets={},
+        components={},
+    )
     return pecha
 
 
+def get_files_version(*paths: Path) -> Tuple:
+    """
+    Version of the files from their mtime and size, None for missing files.
+    """
+    version = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            version.append(None)
+        else:
+            version.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def get_or_load(
+    key: Tuple, load: Callable[[], Any], version: Tuple, shared: bool = False
+) -> Any:
+    """
+    Value of `key` at `version` from the process cache, else from the disk
+    cache when `shared`, else loaded once for all the concurrent callers.
+    """
+
+    def load_once():
+        if shared:
+            return pecha_disk_cache.get_or_set(key, load, version, tag=key[0])
+        return load()
+
+    return pecha_cache.get_or_set(
+        key, lambda: pecha_loads.do((key, version), load_once), version
+    )
+
+
+def invalidate_pecha_cache(pecha_id: str) -> int:
+    pecha_disk_cache.invalidate(pecha_id)
+    return pecha_cache.invalidate(lambda key: key[0] == pecha_id)
+
+
+def get_pecha_id(pecha) -> str:
+    return pecha.opf_path.stem
+
+
+def get_components_version(layers_path: Path) -> Tuple:
+    """
+    Version of the components, from the layers dir and the dirs of its bases,
+    which change when a base or a layer file is added or removed.
+    """
+    vol_dirs = sorted(path for path in layers_path.glob("*") if path.is_dir())
+    return get_files_version(layers_path, *vol_dirs)
+
+
+def load_components(pecha) -> Dict[str, List[LayersEnum]]:
+    version = get_components_version(pecha.layers_path)
+    with span("load"):
+        return get_or_load(
+            (get_pecha_id(pecha), "components"), lambda: pecha.components, version
+        )
+
+
+def load_base(pecha, base_name: str) -> str:
+    version = get_files_version(pecha.base_path / f"{base_name}.txt")
+    with span("load"):
+        return get_or_load(
+            (get_pecha_id(pecha), "base", base_name),
+            lambda: pecha.get_base(base_name),
+            version,
+            shared=True,
+        )
+
+
+def load_compact_layer(pecha, base_name: str, layer_name: LayersEnum) -> CompactLayer:
+    layer_fn = pecha.layers_path / base_name / f"{layer_name.value}.yml"
+    with span("load"):
+        return get_or_load(
+            (get_pecha_id(pecha), "compact_layer", base_name, layer_name.value),
+            lambda: CompactLayer.from_layer(pecha.get_layer(base_name, layer_name)),
+            get_files_version(layer_fn),
+            shared=True,
+        )
+
+
+def load_layer(pecha, base_name: str, layer_name: LayersEnum) -> Layer:
+    return load_compact_layer(pecha, base_name, layer_name).to_layer()
+
+
+def get_local_opf_path(pecha_id: str, branch: str = "review") -> Optional[Path]:
+    """
+    OPF path of the local clone if `branch` is checked out, without running
+    git, None otherwise.
+    """
+    pecha_path = config.PECHAS_PATH / pecha_id
+    try:
+        head = (pecha_path / ".git" / "HEAD").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return None
+    if head.strip() != f"ref: refs/heads/{branch}":
+        return None
+    return pecha_path / f"{pecha_id}.opf"
+
+
+def get_content_etag(pecha_id: str, key: Tuple, paths: Iterable[Path]) -> str:
+    """
+    Strong ETag from the names and content of the files, hashed again only
+    when their version changes.
+    """
+    paths = list(paths)
+
+    def digest() -> str:
+        content_hash = hashlib.sha1()
+        for path in paths:
+            content_hash.update(path.name.encode("utf-8"))
+            if path.is_file():
+                content_hash.update(path.read_bytes())
+        return f'"{content_hash.hexdigest()}"'
+
+    return get_or_load((pecha_id, "etag", *key), digest, get_files_version(*paths))
+
+
+def get_base_etag(pecha_id: str, base_name: str) -> Optional[str]:
+    opf_path = get_local_opf_path(pecha_id)
+    if opf_path is None:
+        return None
+    return get_content_etag(
+        pecha_id, ("base", base_name), [opf_path / "base" / f"{base_name}.txt"]
+    )
+
+
+def get_layer_etag(pecha_id: str, base_name: str, layer_name: str) -> Optional[str]:
+    opf_path = get_local_opf_path(pecha_id)
+    if opf_path is None:
+        return None
+    return get_content_etag(
+        pecha_id,
+        ("layer", base_name, layer_name),
+        [opf_path / "layers" / base_name / f"{layer_name}.yml"],
+    )
+
+
+def get_editor_etag(pecha_id: str, base_name: str) -> Optional[str]:
+    opf_path = get_local_opf_path(pecha_id)
+    if opf_path is None:
+        return None
+    return get_content_etag(
+        pecha_id,
+        ("editor", base_name),
+        [
+            opf_path / "base" / f"{base_name}.txt",
+            *sorted((opf_path / "layers" / base_name).glob("*.yml")),
+        ],
+    )
+
+
+def get_editor_version(pecha, base_name: str) -> Tuple:
+    layers_path = pecha.layers_path / base_name
+    return get_files_version(
+        pecha.base_path / f"{base_name}.txt",
+        layers_path,
+        *sorted(layers_path.glob("*.yml")),
+    )
+
+
 async def create_opf_pecha(
     text_file: UploadFile,
     title: str,
@@ -32,6 +310,9 @@ async def create_opf_pecha(
     front_cover_image: UploadFile,
     publication_data_image: UploadFile,
 ):
+    from openpecha.catalog.manager import CatalogManager
+    from openpecha.formatters.empty import EmptyEbook
+
     front_cover_image_fn = save_upload_file_tmp(front_cover_image)
     publication_data_image_fn = save_upload_file_tmp(publication_data_image)
 
@@ -50,62 +331,149 @@ async def create_opf_pecha(
 
     catalog = CatalogManager(formatter=EmptyEbook(metadata=metadata, assets=assets))
     text = await text_file.read()
-    catalog.add_empty_item(text.decode("utf-8"))
-    catalog.update()
+    with span("create"):
+        catalog.add_empty_item(text.decode("utf-8"))
+    metrics.GITHUB_API_CALLS.labels("create_repo").inc()
+    with span("github"):
+        catalog.update()
     return catalog.formatter.pecha_path.name, front_cover_image_fn
 
 
 def get_old_base(pecha_id, base_id):
-    pecha_path = download_pecha(pecha_id, needs_update=False)
+    pecha_path = get_pecha_path(pecha_id, branch=None)
     if base_id[0] == "v":
         base_fn = pecha_path / f"{pecha_id}.opf" / "base" / f"{base_id}.txt"
         return base_fn.read_text(encoding="utf-8")
 
 
-def update_base_layer(pecha_id, base_name, new_base, layers):
+def update_base_layer(db, pecha_id, base_name, new_base, layers):
+    from openpecha.blupdate import Blupdate
+
+    from app.services import revisions
+
     pecha = get_pecha(pecha_id)
-    old_base = pecha.get_base(base_name)
+    with span("load"):
+        old_base = pecha.get_base(base_name)
     pecha.base[base_name] = new_base
-    pecha.save_base()
+    with span("save"), pecha_lock(pecha_id, base_name):
+        pecha.save_base()
 
-    updater = Blupdate(old_base, new_base)
-    for layer in layers:
-        update_ann_layer(layer, updater)
-        pecha.save_layer(
-            base_name, layer["annotation_type"].value, Layer.parse_obj(layer)
-        )
-    return layers
+    with span("blupdate"):
+        updater = Blupdate(old_base, new_base)
+        compact_layers = [CompactLayer.from_layer(layer) for layer in layers]
+        for compact_layer in compact_layers:
+            compact_layer.reanchor(updater)
+    with span("save"):
+        updated_layers = [
+            revisions.save_layer(
+                db,
+                pecha,
+                base_name,
+                compact_layer.annotation_type,
+                compact_layer.to_layer(),
+            )
+            for compact_layer in compact_layers
+        ]
+    invalidate_pecha_cache(pecha_id)
+    return updated_layers
 
 
 def create_export(pecha_id: str, branch):
-    pecha_path = download_pecha(pecha_id, branch=branch, needs_update=False)
+    from openpecha.serializers import EpubSerializer
+
+    pecha_path = get_pecha_path(pecha_id, branch=branch)
     serializer = EpubSerializer(opf_path=pecha_path / f"{pecha_path.name}.opf")
 
     with tempfile.TemporaryDirectory() as tmpdirname:
         toc_levels = {"1": "sabche"}
-        export_fn = serializer.serialize(toc_levels=toc_levels, output_path=tmpdirname)
-        download_url = create_release(
-            pecha_id,
-            prerelease=True if branch == "review" else False,
-            asset_paths=[export_fn],
-            token=settings.GITHUB_TOKEN,
-        )
+        with span("serialize"):
+            export_fn = serializer.serialize(
+                toc_levels=toc_levels, output_path=tmpdirname
+            )
+        metrics.GITHUB_API_CALLS.labels("create_release").inc()
+        with span("github"):
+            download_url = create_release(
+                pecha_id,
+                prerelease=True if branch == "review" else False,
+                asset_paths=[export_fn],
+                token=settings.GITHUB_TOKEN,
+            )
     return download_url
 
 
-def update_pecha_with_editor_content(pecha_id, base_name, editor_content):
-    parser = EditorParser()
-    parser.parse(base_name, editor_content)
+def update_pecha_with_editor_content(db, pecha_id, base_name, editor_content):
+    from openpecha.formatters.editor import EditorParser
+
+    from app.services import revisions
+
+    with span("parse"):
+        parser = EditorParser()
+        parser.parse(base_name, editor_content)
 
     pecha = get_pecha(pecha_id)
-    pecha.update_base(base_name, parser.base[base_name])
-    for layer_name, layer in parser.layers[base_name].items():
-        pecha.update_layer(base_name, layer_name, layer)
+    with span("save"):
+        pecha.update_base(base_name, parser.base[base_name])
+        for layer_name, layer in parser.layers[base_name].items():
+            # keeps the id of the saved layer, as OpenPechaFS.update_layer
+            old_layer = pecha.get_layer(base_name, layer_name)
+            revisions.save_layer(
+                db,
+                pecha,
+                base_name,
+                layer_name,
+                old_layer.copy(update={"annotations": layer.annotations}),
+            )
+    invalidate_pecha_cache(pecha_id)
 
 
 def create_editor_content_from_pecha(pecha_id, base_name):
-    pecha = get_pecha(pecha_id)
+    return load_editor_content(get_pecha(pecha_id), base_name)
+
+
+def load_editor_content(pecha, base_name: str) -> Optional[str]:
+    from openpecha.serializers import EditorSerializer
+
+    pecha_id = get_pecha_id(pecha)
+
+    def serialize():
+        with span("serialize"):
+            serializer = EditorSerializer(pecha.opf_path)
+            for serialized_base_name, result in serializer.serialize():
+                if serialized_base_name == base_name:
+                    return result
+
+    return get_or_load(
+        (pecha_id, "editor", base_name),
+        serialize,
+        get_editor_version(pecha, base_name),
+        shared=True,
+    )
+
+
+def load_editor_contents(pecha) -> None:
+    """
+    Cache the editor content of every base, the ones missing from the disk
+    cache are serialized in a single pass.
+    """
+    from openpecha.serializers import EditorSerializer
+
+    pecha_id = get_pecha_id(pecha)
+    missing_versions = {}
+    for base_fn in pecha.base_path.glob("*.txt"):
+        key = (pecha_id, "editor", base_fn.stem)
+        version = get_editor_version(pecha, base_fn.stem)
+        found, result = pecha_disk_cache.get(key, version)
+        if found:
+            pecha_cache.set(key, (version, result))
+        else:
+            missing_versions[base_fn.stem] = version
+    if not missing_versions:
+        return
+
     serializer = EditorSerializer(pecha.opf_path)
-    for serialized_base_name, result in serializer.serialize():
-        if serialized_base_name == base_name:
-            return result
+    for base_name, result in serializer.serialize():
+        if base_name in missing_versions:
+            key = (pecha_id, "editor", base_name)
+            version = missing_versions[base_name]
+            pecha_cache.set(key, (version, result))
+            pecha_disk_cache.set(key, result, version, tag=pecha_id)
@@ -0,0 +1,192 @@
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from openpecha import config
+
+from app.core.config import settings
+from app.services.pechas import (
+    get_files_version,
+    get_or_load,
+    get_pecha_path,
+    invalidate_pecha_cache,
+    pecha_lock,
+)
+
+PEDURMA_PECHA_ID = settings.PEDURMA_PECHA_ID
+
+
+def get_text_vols(pecha_id: str, text_id: str) -> List[str]:
+    """
+    Volumes of the text in the index of the local clone.
+    """
+    from pedurma.pagination_update import from_yaml, get_text_info
+
+    index_fn = config.PECHAS_PATH / pecha_id / f"{pecha_id}.opf" / "index.yml"
+
+    def load() -> List[str]:
+        if not index_fn.is_file():
+            return []
+        _, text_info = get_text_info(text_id, from_yaml(index_fn))
+        if not text_info:
+            return []
+        return [f"v{int(span['vol']):03}" for span in text_info["span"]]
+
+    return get_or_load(
+        (pecha_id, "text_vols", text_id), load, get_files_version(index_fn)
+    )
+
+
+def get_text_files_version(pecha_id: str, text_id: str) -> Tuple:
+    """
+    Version of the files pedurma reads for the text: the index, the meta and
+    the bases and layers of its volumes.
+    """
+    opf_path = config.PECHAS_PATH / pecha_id / f"{pecha_id}.opf"
+    paths = [opf_path / "index.yml", opf_path / "meta.yml"]
+    for vol in get_text_vols(pecha_id, text_id):
+        layers_path = opf_path / "layers" / vol
+        paths += [opf_path / "base" / f"{vol}.txt", layers_path]
+        paths += sorted(layers_path.glob("*.yml"))
+    return get_files_version(*paths)
+
+
+def get_text(pecha_id: str, text_id: str):
+    from pedurma.texts import get_derge_google_text_obj, get_text_obj
+
+    if pecha_id in settings.PEDURMA_DERGE_GOOGLE_PECHA_IDS:
+        return get_or_load(
+            (pecha_id, "text", text_id),
+            lambda: get_derge_google_text_obj(text_id),
+            get_text_files_version(settings.PEDURMA_DERGE_PECHA_ID, text_id)
+            + get_text_files_version(settings.PEDURMA_GOOGLE_PECHA_ID, text_id),
+            shared=True,
+        )
+    return get_or_load(
+        (pecha_id, "text", text_id),
+        lambda: get_text_obj(pecha_id, text_id),
+        get_text_files_version(pecha_id, text_id),
+        shared=True,
+    )
+
+
+def get_text_notes(text_id: str):
+    from pedurma import get_pedurma_text_edit_notes
+
+    return get_or_load(
+        (PEDURMA_PECHA_ID, "notes", text_id),
+        lambda: get_pedurma_text_edit_notes(text_id),
+        get_text_files_version(PEDURMA_PECHA_ID, text_id),
+        shared=True,
+    )
+
+
+def get_pagination_fn(pecha_path: Path, vol: int) -> Path:
+    return (
+        pecha_path
+        / f"{PEDURMA_PECHA_ID}.opf"
+        / "layers"
+        / f"v{vol:03}"
+        / "Pagination.yml"
+    )
+
+
+def has_valid_page_refs(note_edit) -> bool:
+    try:
+        int(note_edit.ref_start_page_no)
+        int(note_edit.ref_end_page_no)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def get_changed_note_edits(note_edits) -> Dict[int, List]:
+    """
+    Group note edits by volume, keeping only the last edit for each (vol, image_no).
+    """
+    changed = {}
+    for note_edit in note_edits:
+        changed[(int(note_edit.vol), note_edit.image_no)] = note_edit
+
+    vol_note_edits = {}
+    for (vol, _), note_edit in changed.items():
+        vol_note_edits.setdefault(vol, []).append(note_edit)
+    return vol_note_edits
+
+
+def reset_note_refs(durchen_pg_ref_uuid: str, paginations: Dict) -> Dict:
+    """
+    Clear the page refs previously pointing to the given durchen page.
+    """
+    if not durchen_pg_ref_uuid:
+        return paginations
+    for pagination in paginations.values():
+        if pagination.get("note_ref") == durchen_pg_ref_uuid:
+            pagination["note_ref"] = None
+    return paginations
+
+
+def update_vol_pagination(pagination_layer: Dict, note_edits) -> List[str]:
+    """
+    Re-apply only the given note edits on the pagination layer.
+
+    Returns page index of the pages whose note ref has changed.
+    """
+    from pedurma.pagination_update import add_note_pg_ref, get_page_uuid
+
+    paginations = pagination_layer["annotations"]
+    old_note_refs = {
+        uuid: pagination.get("note_ref") for uuid, pagination in paginations.items()
+    }
+    for note_edit in note_edits:
+        if not has_valid_page_refs(note_edit):
+            continue
+        durchen_pg_ref_uuid = get_page_uuid(note_edit.image_no, paginations)
+        reset_note_refs(durchen_pg_ref_uuid, paginations)
+        pagination_layer = add_note_pg_ref(note_edit, pagination_layer)
+        paginations = pagination_layer["annotations"]
+
+    return [
+        pagination["page_index"]
+        for uuid, pagination in paginations.items()
+        if pagination.get("note_ref") != old_note_refs.get(uuid)
+    ]
+
+
+def update_text_pagination(text_id: str, note_edits) -> Dict[str, List[str]]:
+    """
+    Update pagination layers of the text with changed note edits only.
+
+    Only the volumes having a changed note edit are loaded and only the
+    volumes whose pages actually changed are written back.
+    """
+    from pedurma.pagination_update import from_yaml, get_text_info, to_yaml
+
+    vol_note_edits = get_changed_note_edits(note_edits)
+    if not vol_note_edits:
+        return {}
+
+    pecha_path = get_pecha_path(PEDURMA_PECHA_ID, branch=None)
+    index = from_yaml(pecha_path / f"{PEDURMA_PECHA_ID}.opf" / "index.yml")
+    _, text_info = get_text_info(text_id, index)
+    if not text_info:
+        return {}
+
+    changed_pages = {}
+    for span in text_info["span"]:
+        vol = int(span["vol"])
+        if vol not in vol_note_edits:
+            continue
+        pagination_fn = get_pagination_fn(pecha_path, vol)
+        with pecha_lock(PEDURMA_PECHA_ID, f"v{vol:03}", "Pagination"):
+            pagination_layer = from_yaml(pagination_fn)
+            vol_changed_pages = update_vol_pagination(
+                pagination_layer, vol_note_edits[vol]
+            )
+            if vol_changed_pages:
+                pagination_fn.write_text(to_yaml(pagination_layer), encoding="utf-8")
+        if not vol_changed_pages:
+            continue
+        changed_pages[f"v{vol:03}"] = vol_changed_pages
+    if changed_pages:
+        invalidate_pecha_cache(PEDURMA_PECHA_ID)
+    return changed_pages
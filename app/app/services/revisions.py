@@ -0,0 +1,156 @@
+import json
+import logging
+from typing import Dict, Optional
+
+from openpecha.core.layer import Layer, LayersEnum
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import crud
+
+logger = logging.getLogger(__name__)
+
+# revisions tried when other writers log the same ones, a clone on another
+# host for instance
+MAX_REVISION_CONFLICTS = 5
+
+
+class RevisionConflict(Exception):
+    """
+    The next revisions of a layer were all logged by other writers.
+    """
+
+
+class RevisionGone(Exception):
+    """
+    The changes since a revision are not in the log, the layer has to be
+    read again.
+    """
+
+
+def format_revision(revision: int) -> str:
+    return f"{revision:05}"
+
+
+def get_annotations(layer: Optional[Layer]) -> Dict:
+    if layer is None:
+        return {}
+    return json.loads(layer.json())["annotations"]
+
+
+def diff_layers(old_layer: Optional[Layer], new_layer: Layer) -> Dict:
+    old_annotations = get_annotations(old_layer)
+    new_annotations = get_annotations(new_layer)
+    return {
+        "upserted": {
+            annotation_id: annotation
+            for annotation_id, annotation in new_annotations.items()
+            if old_annotations.get(annotation_id) != annotation
+        },
+        "removed": [
+            annotation_id
+            for annotation_id in old_annotations
+            if annotation_id not in new_annotations
+        ],
+    }
+
+
+def save_layer(
+    db: Session, pecha, base_name: str, layer_name: LayersEnum, layer: Layer
+) -> Layer:
+    """
+    Save `layer` at the next revision and log the annotations it changed.
+
+    Writers of the layer are serialized by a lock, and the log entry is
+    added before the layer is saved and committed after, so a revision is
+    never saved without its changes. A revision already logged by another
+    writer is a conflict, the next one is tried.
+
+    Layers changed outside of the API, by a git push for instance, have no
+    log entry for their revision, changes across them are gone.
+    """
+    from app.services.pechas import get_pecha_id, pecha_lock
+
+    pecha_id = get_pecha_id(pecha)
+    with pecha_lock(pecha_id, base_name, layer_name.value):
+        layer_dict = pecha.read_layers_file(base_name, layer_name.value)
+        old_layer = Layer.parse_obj(layer_dict) if layer_dict else None
+        changes = diff_layers(old_layer, layer)
+        latest = crud.layer_revision.get_latest(
+            db, pecha_id=pecha_id, base_name=base_name, annotation_type=layer_name.value
+        )
+        revision = max(int(old_layer.revision) if old_layer else 0, latest or 0)
+        for _ in range(MAX_REVISION_CONFLICTS):
+            revision += 1
+            try:
+                crud.layer_revision.create(
+                    db,
+                    pecha_id=pecha_id,
+                    base_name=base_name,
+                    annotation_type=layer_name.value,
+                    revision=revision,
+                    changes=changes,
+                )
+            except IntegrityError:
+                db.rollback()
+                logger.warning(
+                    f"{pecha_id}/{base_name}/{layer_name.value}@{revision} "
+                    "is already logged"
+                )
+            else:
+                break
+        else:
+            raise RevisionConflict(revision)
+
+        layer.revision = format_revision(revision)
+        try:
+            pecha.save_layer(base_name, layer_name, layer)
+        except Exception:
+            db.rollback()
+            raise
+        db.commit()
+    pecha.layers[base_name][layer_name] = layer
+    return layer
+
+
+def get_changes(
+    db: Session, pecha, base_name: str, layer_name: LayersEnum, since: int
+) -> Dict:
+    """
+    Annotations upserted and removed since the `since` revision of a layer.
+    """
+    from app.services.pechas import get_pecha_id, load_layer
+
+    revision = int(load_layer(pecha, base_name, layer_name).revision)
+    changes: Dict = {
+        "revision": format_revision(revision),
+        "upserted": {},
+        "removed": [],
+    }
+    if since == revision:
+        return changes
+    if since > revision:
+        raise RevisionGone(since)
+
+    layer_revisions = crud.layer_revision.get_since(
+        db,
+        pecha_id=get_pecha_id(pecha),
+        base_name=base_name,
+        annotation_type=layer_name.value,
+        since=since,
+    )
+    if [layer_revision.revision for layer_revision in layer_revisions] != list(
+        range(since + 1, revision + 1)
+    ):
+        raise RevisionGone(since)
+
+    removed = set()
+    for layer_revision in layer_revisions:
+        for annotation_id, annotation in layer_revision.changes["upserted"].items():
+            changes["upserted"][annotation_id] = annotation
+            removed.discard(annotation_id)
+        for annotation_id in layer_revision.changes["removed"]:
+            changes["upserted"].pop(annotation_id, None)
+            removed.add(annotation_id)
+    changes["removed"] = sorted(removed)
+    return changes
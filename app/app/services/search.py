@@ -0,0 +1,167 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.timing import span
+from app.schemas.search import SearchHit, Span
+
+# syllables are split on tsheg, shad and whitespace, n-grams never span a
+# shad so phrases stay within a clause
+SYLLABLE_RE = re.compile(r"[^\u0f0b\u0f0c\u0f0d-\u0f12\u0f14\s]+")
+PHRASE_BREAK_RE = re.compile(r"[\u0f0d-\u0f12\u0f14]")
+TSHEG = "\u0f0b"
+
+
+class Syllable(NamedTuple):
+    text: str
+    start: int
+    end: int
+    break_before: bool
+
+
+def tokenize(text: str) -> List[Syllable]:
+    syllables = []
+    prev_end = 0
+    for match in SYLLABLE_RE.finditer(text):
+        break_before = bool(PHRASE_BREAK_RE.search(text, prev_end, match.start()))
+        syllables.append(
+            Syllable(match.group(), match.start(), match.end(), break_before)
+        )
+        prev_end = match.end()
+    return syllables
+
+
+def get_postings(text: str) -> List[Dict]:
+    """
+    Postings of the syllables and syllable bigrams of a base.
+    """
+    syllables = tokenize(text)
+    positions = defaultdict(list)
+    for number, syllable in enumerate(syllables):
+        positions[syllable.text].append([number, syllable.start, syllable.end])
+        if number + 1 < len(syllables) and not syllables[number + 1].break_before:
+            next_syllable = syllables[number + 1]
+            positions[f"{syllable.text}{TSHEG}{next_syllable.text}"].append(
+                [number, syllable.start, next_syllable.end]
+            )
+    return [
+        {"ngram": ngram, "count": len(ngram_positions), "positions": ngram_positions}
+        for ngram, ngram_positions in positions.items()
+    ]
+
+
+def index_base(db: Session, pecha_id: str, base_name: str) -> None:
+    from app.services.pechas import get_pecha, load_base
+
+    text = load_base(get_pecha(pecha_id), base_name)
+    with span("index"):
+        postings = get_postings(text)
+        crud.search_posting.replace_base(
+            db, pecha_id=pecha_id, base_name=base_name, postings=postings
+        )
+
+
+def index_pecha(db: Session, pecha_id: str) -> None:
+    from app.services.pechas import get_pecha
+
+    pecha = get_pecha(pecha_id)
+    for base_fn in sorted(pecha.base_path.glob("*.txt")):
+        index_base(db, pecha_id, base_fn.stem)
+
+
+def get_query_ngrams(query: str) -> List[str]:
+    syllables = [syllable.text for syllable in tokenize(query)]
+    if len(syllables) == 1:
+        return syllables
+    return [
+        f"{syllable}{TSHEG}{next_syllable}"
+        for syllable, next_syllable in zip(syllables, syllables[1:])
+    ]
+
+
+def get_hits(db: Session, ngrams: List[str], bases: List[Tuple[str, str]]) -> List:
+    """
+    Occurrences of the phrase of `ngrams` in `bases`, as (-occurrences in
+    the base, pecha_id, base_name, start, end) sorted.
+    """
+    base_positions: Dict = defaultdict(dict)
+    for posting in crud.search_posting.get_by_ngrams(
+        db, ngrams=set(ngrams), bases=bases
+    ):
+        base_positions[(posting.pecha_id, posting.base_name)][
+            posting.ngram
+        ] = posting.positions
+
+    hits = []
+    for (pecha_id, base_name), positions in base_positions.items():
+        ends = [
+            {number: end for number, _, end in positions[ngram]} for ngram in ngrams
+        ]
+        spans = [
+            (start, ends[-1][number + len(ngrams) - 1])
+            for number, start, _ in positions[ngrams[0]]
+            if all(number + i in ends[i] for i in range(1, len(ngrams)))
+        ]
+        hits += [(-len(spans), pecha_id, base_name, start, end) for start, end in spans]
+    hits.sort()
+    return hits
+
+
+def search(db: Session, query: str, skip: int = 0, limit: int = 20) -> Dict:
+    """
+    Occurrences of the `query` phrase in the bases, the bases with the most
+    occurrences first.
+
+    A phrase of n syllables matches where its n - 1 bigrams follow each
+    other, the spans come from the postings so no base is loaded.
+
+    The bases having all the n-grams are found in SQL, ranked by the count
+    of their least frequent n-gram: the occurrences of a syllable, which
+    are paginated without loading the positions of the other bases, and a
+    bound of the occurrences of a phrase, whose positions are only loaded
+    for the SEARCH_MAX_BASES first bases.
+    """
+    ngrams = get_query_ngrams(query)
+    if not ngrams:
+        return {"total": 0, "hits": []}
+
+    bases = crud.search_posting.get_bases(
+        db, ngrams=ngrams, limit=settings.SEARCH_MAX_BASES
+    )
+    if len(ngrams) == 1:
+        total = sum(count for _, _, count in bases)
+        # number of the first occurrence of each base in the results
+        first = 0
+        page_bases, page_skip = [], 0
+        for pecha_id, base_name, count in bases:
+            if first >= skip + limit:
+                break
+            if first + count > skip:
+                if not page_bases:
+                    page_skip = skip - first
+                page_bases.append((pecha_id, base_name))
+            first += count
+        hits = get_hits(db, ngrams, page_bases)[page_skip : page_skip + limit]
+    else:
+        hits = get_hits(
+            db, ngrams, [(pecha_id, base_name) for pecha_id, base_name, _ in bases]
+        )
+        total = len(hits)
+        hits = hits[skip : skip + limit]
+
+    return {
+        "total": total,
+        "hits": [
+            SearchHit(
+                pecha_id=pecha_id,
+                base_name=base_name,
+                span=Span(start=start, end=end),
+                score=-rank,
+            )
+            for rank, pecha_id, base_name, start, end in hits
+        ],
+    }
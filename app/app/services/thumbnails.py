@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.core.config import settings
+from app.core.timing import span
+
+logger = logging.getLogger(__name__)
+
+# extension, Pillow format and media type of the thumbnails
+THUMBNAIL_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpg": ("JPEG", "image/jpeg"),
+}
+# `{digest}-{width}.{extension}`, the digest of the cover versions the urls
+THUMBNAIL_NAME_RE = re.compile(r"^[0-9a-f]{12}-[0-9]+\.(webp|jpg)$")
+GITHUB_IMG_PREFIX = "https://github.com/OpenPecha/"
+
+
+def get_thumbnails_path(pecha_id: str) -> Path:
+    return settings.THUMBNAILS_PATH / pecha_id
+
+
+def get_thumbnail_path(pecha_id: str, name: str) -> Optional[Path]:
+    """
+    Path of a thumbnail, None if there is no such thumbnail.
+    """
+    if not THUMBNAIL_NAME_RE.match(name) or "/" in pecha_id or pecha_id[:1] == ".":
+        return None
+    thumbnail_fn = get_thumbnails_path(pecha_id) / name
+    return thumbnail_fn if thumbnail_fn.is_file() else None
+
+
+def get_thumbnail_media_type(name: str) -> str:
+    return THUMBNAIL_FORMATS[name.rsplit(".", 1)[-1]][1]
+
+
+def get_thumbnail_url(pecha_id: str, name: str) -> str:
+    return (
+        f"{settings.SERVER_HOST.rstrip('/')}{settings.API_V1_STR}"
+        f"/pechas/{pecha_id}/thumbnails/{name}"
+    )
+
+
+def create_thumbnails(pecha_id: str, image_fn: Path) -> List[str]:
+    """
+    Thumbnails of the cover image at the `THUMBNAIL_WIDTHS`, in WebP and
+    JPEG, returns their names. Images are never upscaled.
+    """
+    from PIL import Image
+
+    digest = hashlib.sha1(image_fn.read_bytes()).hexdigest()[:12]
+    thumbnails_path = get_thumbnails_path(pecha_id)
+    thumbnails_path.mkdir(parents=True, exist_ok=True)
+    names = []
+    with span("thumbnail"), Image.open(image_fn) as image:
+        image = image.convert("RGB")
+        for width in settings.THUMBNAIL_WIDTHS:
+            width = min(width, image.width)
+            height = max(1, round(image.height * width / image.width))
+            thumbnail = image.resize((width, height), Image.LANCZOS)
+            for extension, (image_format, _) in THUMBNAIL_FORMATS.items():
+                name = f"{digest}-{width}.{extension}"
+                # written aside then renamed, the url may be served meanwhile
+                tmp_fn = thumbnails_path / f".{name}.tmp"
+                thumbnail.save(
+                    tmp_fn, image_format, quality=80, optimize=True, progressive=True
+                )
+                tmp_fn.replace(thumbnails_path / name)
+                names.append(name)
+    return names
+
+
+def get_img_url(pecha_id: str, names: List[str]) -> str:
+    """
+    Url of the JPEG thumbnail of the second width, the default `img`.
+    """
+    jpeg_names = [name for name in names if name.endswith(".jpg")]
+    return get_thumbnail_url(pecha_id, jpeg_names[min(1, len(jpeg_names) - 1)])
+
+
+def get_cover_image_path(pecha, img: str) -> Path:
+    """
+    Cover image of a pecha in its local clone, from its GitHub raw `img`.
+    """
+    return pecha.assets_path / "image" / Path(urlparse(img).path).name
+
+
+def backfill_thumbnails(db: Session, limit: Optional[int] = None) -> int:
+    """
+    Create the thumbnails of the pechas still having a GitHub `img`, as a
+    background task, returns the number of pechas updated.
+    """
+    from app.services.pechas import get_pecha
+
+    pecha_imgs = [
+        (pecha_obj.id, pecha_obj.img)
+        for pecha_obj in crud.pecha.get_multi_with_img_prefix(
+            db, prefix=GITHUB_IMG_PREFIX, limit=limit
+        )
+    ]
+    updated = 0
+    for pecha_id, img in pecha_imgs:
+        try:
+            image_fn = get_cover_image_path(get_pecha(pecha_id), img)
+            names = create_thumbnails(pecha_id, image_fn)
+            crud.pecha.set_img(db, id=pecha_id, img=get_img_url(pecha_id, names))
+            updated += 1
+        except Exception as e:
+            # keeps its GitHub img, the next backfill tries again
+            db.rollback()
+            logger.warning(f"Could not create the thumbnails of {pecha_id}: {e}")
+    logger.info(f"Created the thumbnails of {updated} pechas")
+    return updated
@@ -0,0 +1,92 @@
+import logging
+import threading
+import time
+from typing import List
+
+from app import crud
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.schemas.warmup import WarmupStatus
+from app.services import pechas
+
+logger = logging.getLogger(__name__)
+
+# per worker process, like the caches it fills
+status = WarmupStatus()
+_started = threading.Event()
+
+
+def get_warmup_pecha_ids() -> List[str]:
+    pecha_ids = list(settings.WARMUP_PECHA_IDS)
+    if settings.WARMUP_RECENT_PECHAS > 0:
+        db = SessionLocal()
+        try:
+            recent_pechas = crud.pecha.get_recently_edited(
+                db, limit=settings.WARMUP_RECENT_PECHAS
+            )
+        finally:
+            db.close()
+        pecha_ids += [pecha.id for pecha in recent_pechas]
+    return list(dict.fromkeys(pecha_ids))
+
+
+def warm_up_pecha(pecha_id: str) -> None:
+    """
+    Clone the pecha if needed and load its components, bases, layers and
+    editor contents into the caches.
+    """
+    pecha = pechas.get_pecha(pecha_id)
+    for base_name, layer_names in pechas.load_components(pecha).items():
+        if (pecha.base_path / f"{base_name}.txt").is_file():
+            pechas.load_base(pecha, base_name)
+        for layer_name in layer_names:
+            pechas.load_compact_layer(pecha, base_name, layer_name)
+    pechas.load_editor_contents(pecha)
+
+
+def run_warmup() -> WarmupStatus:
+    status.state = "running"
+    status.started_at = time.time()
+    start = time.perf_counter()
+    try:
+        pecha_ids = get_warmup_pecha_ids()
+    except Exception as e:
+        logger.warning(f"Could not get the pechas to warm up: {e}")
+        pecha_ids = []
+    status.total = len(pecha_ids)
+    logger.info(f"Warming up {status.total} pechas")
+
+    for pecha_id in pecha_ids:
+        status.current = pecha_id
+        pecha_start = time.perf_counter()
+        try:
+            warm_up_pecha(pecha_id)
+        except Exception as e:
+            # a missing or broken pecha must not stop the warmup
+            status.failed.append(pecha_id)
+            logger.warning(f"Could not warm up {pecha_id}: {e}")
+        else:
+            status.warmed += 1
+            logger.info(
+                f"Warmed up {pecha_id} ({status.warmed}/{status.total}) "
+                f"in {time.perf_counter() - pecha_start:.1f}s"
+            )
+
+    status.current = None
+    status.duration = time.perf_counter() - start
+    status.state = "done"
+    logger.info(
+        f"Warmup done in {status.duration:.1f}s: {status.warmed} warmed, "
+        f"{len(status.failed)} failed"
+    )
+    return status
+
+
+def start_warmup() -> None:
+    """
+    Run the warmup once, in the background so requests are served meanwhile.
+    """
+    if _started.is_set():
+        return
+    _started.set()
+    threading.Thread(target=run_warmup, name="warmup", daemon=True).start()
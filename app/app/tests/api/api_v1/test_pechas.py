@@ -0,0 +1,101 @@
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+from openpecha import config
+
+from app import worker
+from app.api import deps
+from app.core.config import settings
+from app.main import app
+from app.models.user import User
+from app.services import pechas
+
+
+@pytest.fixture
+def local_pecha(tmp_path, monkeypatch):
+    pecha_path = tmp_path / "P000001"
+    (pecha_path / ".git").mkdir(parents=True)
+    (pecha_path / ".git" / "HEAD").write_text("ref: refs/heads/review\n")
+    (pecha_path / "P000001.opf" / "base").mkdir(parents=True)
+    (pecha_path / "P000001.opf" / "layers" / "v001").mkdir(parents=True)
+    base_fn = pecha_path / "P000001.opf" / "base" / "v001.txt"
+    base_fn.write_text("ཀ་ཁ་", encoding="utf-8")
+    monkeypatch.setattr(config, "PECHAS_PATH", tmp_path)
+    monkeypatch.setattr(
+        pechas, "download_pecha", lambda pecha_id, branch, needs_update: pecha_path
+    )
+    pechas.invalidate_pecha_cache("P000001")
+    return base_fn
+
+
+def test_read_base_not_modified(client: TestClient, local_pecha) -> None:
+    url = f"{settings.API_V1_STR}/pechas/P000001/base/v001"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert "must-revalidate" in response.headers["Cache-Control"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+    local_pecha.write_text("ཀ་ཁ་ག་", encoding="utf-8")
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == "ཀ་ཁ་ག་"
+    assert response.headers["ETag"] != etag
+
+
+def test_read_layer_msgpack(client: TestClient, local_pecha) -> None:
+    layer_fn = local_pecha.parent.parent / "layers" / "v001" / "Citation.yml"
+    layer_fn.write_text(
+        "id: c1\n"
+        "annotation_type: Citation\n"
+        "revision: '00001'\n"
+        "annotations:\n"
+        "  a1: {span: {start: 0, end: 2}}\n",
+        encoding="utf-8",
+    )
+    url = f"{settings.API_V1_STR}/pechas/P000001/layers/v001/Citation"
+
+    json_response = client.get(url)
+    response = client.get(url, headers={"Accept": "application/msgpack"})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/msgpack"
+    assert response.headers["Vary"] == "Accept"
+    assert msgpack.unpackb(response.content) == json_response.json()
+    assert "encode;dur=" in response.headers["Server-Timing"]
+    assert response.headers["ETag"] != json_response.headers["ETag"]
+    response = client.get(
+        url,
+        headers={
+            "Accept": "application/msgpack",
+            "If-None-Match": response.headers["ETag"],
+        },
+    )
+    assert response.status_code == 304
+
+
+def test_export_is_queued_for_the_user(client: TestClient, monkeypatch) -> None:
+    queued = []
+
+    class Result:
+        id = None
+
+    def apply_async(kwargs, task_id):
+        queued.append(kwargs)
+        Result.id = task_id
+        return Result()
+
+    monkeypatch.setattr(worker.export_pecha, "apply_async", apply_async)
+    app.dependency_overrides[deps.get_current_user] = lambda: User(id=7)
+    try:
+        response = client.get(f"{settings.API_V1_STR}/pechas/P000001/export/review")
+    finally:
+        del app.dependency_overrides[deps.get_current_user]
+
+    assert response.status_code == 202
+    assert response.json()["job_id"].startswith("7.")
+    assert queued == [{"pecha_id": "P000001", "branch": "review", "user_id": 7}]
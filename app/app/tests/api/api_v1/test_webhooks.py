@@ -0,0 +1,74 @@
+import hashlib
+import hmac
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from git import Repo
+from openpecha import config
+
+from app.core.config import settings
+
+SECRET = "webhook-secret"
+
+
+@pytest.fixture
+def pecha_clone(tmp_path, monkeypatch):
+    origin_path = tmp_path / "origin" / "P000001"
+    origin = Repo.init(str(origin_path))
+    (origin_path / "base.txt").write_text("old", encoding="utf-8")
+    origin.index.add(["base.txt"])
+    origin.index.commit("init")
+    origin.git.branch("-M", "review")
+
+    pechas_path = tmp_path / "pechas"
+    Repo.clone_from(str(origin_path), str(pechas_path / "P000001"))
+    monkeypatch.setattr(config, "PECHAS_PATH", pechas_path)
+    monkeypatch.setattr(settings, "GITHUB_WEBHOOK_SECRET", SECRET)
+
+    (origin_path / "base.txt").write_text("new", encoding="utf-8")
+    origin.index.add(["base.txt"])
+    origin.index.commit("update")
+    return pechas_path / "P000001"
+
+
+def post_push(client: TestClient, payload: dict, secret: str = SECRET):
+    body = json.dumps(payload).encode("utf-8")
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return client.post(
+        f"{settings.API_V1_STR}/webhooks/github",
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": "push",
+            "X-Hub-Signature-256": f"sha256={digest}",
+        },
+    )
+
+
+def test_push_refreshes_local_clone(client: TestClient, pecha_clone) -> None:
+    payload = {"ref": "refs/heads/review", "repository": {"name": "P000001"}}
+
+    response = post_push(client, payload)
+
+    assert response.status_code == 202
+    assert response.json()["refresh"]
+    assert (pecha_clone / "base.txt").read_text(encoding="utf-8") == "new"
+
+
+def test_push_with_invalid_signature(client: TestClient, pecha_clone) -> None:
+    payload = {"ref": "refs/heads/review", "repository": {"name": "P000001"}}
+
+    response = post_push(client, payload, secret="wrong")
+
+    assert response.status_code == 401
+    assert (pecha_clone / "base.txt").read_text(encoding="utf-8") == "old"
+
+
+def test_push_with_malformed_payload(client: TestClient, pecha_clone) -> None:
+    payload = {"ref": "refs/heads/review", "repository": {}}
+
+    response = post_push(client, payload)
+
+    assert response.status_code == 400
+    assert (pecha_clone / "base.txt").read_text(encoding="utf-8") == "old"
@@ -1,12 +1,63 @@
-from typing import Generator
+from collections import defaultdict
+from typing import Callable, Dict, Generator, Optional
 
 import pytest
 from fastapi.testclient import TestClient
+from openpecha import config
+from openpecha.core.pecha import OpenPechaFS
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
 
+from app.db.base import Base
 from app.main import app
+from app.services import pechas
 
 
 @pytest.fixture(scope="module")
 def client() -> Generator:
     with TestClient(app) as client:
         yield client
+
+
+@pytest.fixture
+def db() -> Generator:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def make_pecha(tmp_path, monkeypatch) -> Callable[..., OpenPechaFS]:
+    """
+    Factory of OPF pechas in `tmp_path`, the pechas path, with the given base
+    texts and layer files by base name.
+    """
+    monkeypatch.setattr(config, "PECHAS_PATH", tmp_path)
+
+    def make_pecha(
+        pecha_id: str = "P000001",
+        bases: Optional[Dict[str, str]] = None,
+        layers: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> OpenPechaFS:
+        opf_path = tmp_path / pecha_id / f"{pecha_id}.opf"
+        (opf_path / "base").mkdir(parents=True)
+        (opf_path / "layers").mkdir()
+        for base_name, text in (bases or {}).items():
+            (opf_path / "base" / f"{base_name}.txt").write_text(text, encoding="utf-8")
+        for base_name, layer_files in (layers or {}).items():
+            (opf_path / "layers" / base_name).mkdir()
+            for layer_name, content in layer_files.items():
+                layer_fn = opf_path / "layers" / base_name / f"{layer_name}.yml"
+                layer_fn.write_text(content, encoding="utf-8")
+        pechas.invalidate_pecha_cache(pecha_id)
+        return OpenPechaFS(
+            opf_path=opf_path,
+            base={},
+            layers=defaultdict(dict),
+            assets={},
+            components={},
+        )
+
+    return make_pecha
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.core.admission import ConcurrencyLimiter, Rejected
+
+
+def test_limiter_queues_then_rejects():
+    async def run():
+        limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, queue_timeout=1)
+        await limiter.acquire()
+
+        queued = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected, match="queue_full"):
+            await limiter.acquire()
+
+        limiter.release()
+        await queued
+        assert limiter.active == 1
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_limiter_times_out_in_queue():
+    async def run():
+        limiter = ConcurrencyLimiter("test", limit=1, queue_size=1, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(Rejected, match="queue_timeout"):
+            await limiter.acquire()
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
@@ -0,0 +1,67 @@
+from app.core.cache import DiskCache, LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_lru_cache_reloads_changed_version():
+    cache = LRUCache(2)
+    loads = []
+
+    def load():
+        loads.append(1)
+        return len(loads)
+
+    assert cache.get_or_set("a", load, version=1) == 1
+    assert cache.get_or_set("a", load, version=1) == 1
+    assert cache.get_or_set("a", load, version=2) == 2
+    assert cache.invalidate(lambda key: key == "a") == 1
+    assert cache.get_or_set("a", load, version=2) == 3
+
+
+def test_disk_cache_is_versioned_and_bounded(tmp_path):
+    cache = DiskCache(tmp_path / "cache.sqlite3", max_bytes=1000)
+    cache.set(("P000001", "base", "v001"), "a" * 400, version=1, tag="P000001")
+
+    assert cache.get(("P000001", "base", "v001"), version=1) == (True, "a" * 400)
+    assert cache.get(("P000001", "base", "v001"), version=2) == (False, None)
+
+    cache.set(("P000002", "base", "v001"), "b" * 400, version=1, tag="P000002")
+    cache.set(("P000002", "base", "v002"), "c" * 400, version=1, tag="P000002")
+    assert not cache.get(("P000001", "base", "v001"), version=1)[0]
+
+    assert cache.invalidate("P000002") == 2
+    assert not cache.get(("P000002", "base", "v002"), version=1)[0]
+
+
+def test_disk_cache_touches_entries_once_per_interval(tmp_path):
+    cache = DiskCache(tmp_path / "cache.sqlite3", max_bytes=1000, touch_interval=60)
+    cache.set("a", "a" * 400)
+    cache.set("b", "b" * 400)
+
+    def accessed(key):
+        return (
+            cache._connect()
+            .execute("SELECT accessed FROM entries WHERE key = ?", (repr(key),))
+            .fetchone()[0]
+        )
+
+    last_accessed = accessed("a")
+    assert cache.get("a") == (True, "a" * 400)
+    assert accessed("a") == last_accessed
+
+    cache.touch_interval = 0
+    assert cache.get("a") == (True, "a" * 400)
+    assert accessed("a") > last_accessed
+    cache.set("c", "c" * 400)
+    assert not cache.get("b")[0]
+    assert cache.get("a")[0]
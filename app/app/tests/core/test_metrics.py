@@ -0,0 +1,11 @@
+from app.core import metrics
+
+
+def test_celery_queue_depth_is_read_on_each_scrape(monkeypatch):
+    depths = {"export-queue": 3}
+    monkeypatch.setattr(metrics, "get_celery_queue_depths", lambda: depths)
+
+    assert b'celery_queue_depth{queue="export-queue"} 3.0' in metrics.generate_metrics()
+
+    depths["export-queue"] = 0
+    assert b'celery_queue_depth{queue="export-queue"} 0.0' in metrics.generate_metrics()
@@ -0,0 +1,35 @@
+import time
+
+from app.core.profiling import SamplingProfiler, attach_current_thread, profile
+
+
+def busy_wait(duration):
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        pass
+
+
+def not_attached(duration):
+    busy_wait(duration)
+
+
+def test_profile_samples_attached_thread_only():
+    with profile(0.001) as profiler:
+        not_attached(0.02)
+        with attach_current_thread():
+            busy_wait(0.05)
+
+    assert profiler.samples > 0
+    assert all("busy_wait" in stack for stack in profiler.stacks)
+    assert not any("not_attached" in stack for stack in profiler.stacks)
+    assert all(
+        "test_profile_samples_attached_thread_only" in stack
+        for stack in profiler.stacks
+    )
+
+
+def test_collapsed_format():
+    profiler = SamplingProfiler(0.001)
+    profiler.stacks["main (a.py:1);run (b.py:2)"] += 3
+
+    assert profiler.collapsed() == "main (a.py:1);run (b.py:2) 3\n"
@@ -0,0 +1,46 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_load():
+    flight = SingleFlight("test", max_waiters=10, timeout=5)
+    started = threading.Event()
+    loads = []
+
+    def load():
+        loads.append(1)
+        started.set()
+        time.sleep(0.1)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(flight.do, "key", load)
+        started.wait()
+        followers = [executor.submit(flight.do, "key", load) for _ in range(4)]
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert results == ["result"] * 5
+    assert len(loads) == 1
+
+
+def test_waiters_over_the_cap_load_on_their_own():
+    flight = SingleFlight("test", max_waiters=0, timeout=5)
+    started = threading.Event()
+    loads = []
+
+    def load():
+        loads.append(1)
+        started.set()
+        time.sleep(0.05)
+        return len(loads)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", load)
+        started.wait()
+        follower = executor.submit(flight.do, "key", load)
+        leader.result(), follower.result()
+
+    assert len(loads) == 2
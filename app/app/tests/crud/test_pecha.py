@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from app import crud
+from app.models.pecha import Pecha
+from app.schemas.pecha import PechaSort
+
+
+@pytest.fixture
+def db(db):
+    db.add_all(
+        [
+            Pecha(
+                id="P000001",
+                title="Kangyur Derge",
+                owner_id=1,
+                updated_at=datetime(2021, 1, 3),
+            ),
+            Pecha(
+                id="P000002",
+                title="Tengyur Derge",
+                owner_id=2,
+                updated_at=datetime(2021, 1, 1),
+            ),
+            Pecha(
+                id="P000003",
+                title="100%_kangyur",
+                owner_id=1,
+                updated_at=datetime(2021, 1, 2),
+            ),
+        ]
+    )
+    db.commit()
+    return db
+
+
+def ids(pechas):
+    return [pecha.id for pecha in pechas]
+
+
+def test_search_title(db):
+    assert ids(crud.pecha.search(db, q="derge")) == ["P000001", "P000002"]
+    assert ids(crud.pecha.search(db, q="KANGYUR")) == ["P000003", "P000001"]
+    assert ids(crud.pecha.search(db, q="%_")) == ["P000003"]
+
+
+def test_search_owner_and_sort(db):
+    pechas = crud.pecha.search(db, owner_id=1, sort=PechaSort.updated_at_desc)
+
+    assert ids(pechas) == ["P000001", "P000003"]
+    assert ids(crud.pecha.search(db, sort=PechaSort.title_desc, limit=1)) == ["P000002"]
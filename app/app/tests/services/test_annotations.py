@@ -0,0 +1,43 @@
+from openpecha.core.layer import Layer, LayersEnum
+
+from app import crud
+from app.services.annotations import index_layer
+from app.services.layers import CompactLayer
+
+
+def get_layer(annotation_type, annotations):
+    return CompactLayer.from_layer(
+        Layer(annotation_type=annotation_type, annotations=annotations)
+    )
+
+
+def test_index_layer_replaces_its_annotations(db):
+    citations = {
+        "a1": {"span": {"start": 0, "end": 5}, "isverse": True},
+        "a2": {"span": {"start": 10, "end": 12}},
+    }
+    index_layer(db, "P000001", "v001", get_layer(LayersEnum.citation, citations))
+    index_layer(
+        db,
+        "P000002",
+        "v001",
+        get_layer(LayersEnum.sabche, {"s1": {"span": {"start": 3, "end": 8}}}),
+    )
+    index_layer(
+        db,
+        "P000001",
+        "v001",
+        get_layer(LayersEnum.citation, {"a1": citations["a1"]}),
+    )
+
+    total, annotations = crud.annotation.get_multi_by_filters(
+        db, annotation_type="Citation"
+    )
+    assert total == 1
+    assert (annotations[0].id, annotations[0].start, annotations[0].end) == (
+        "a1",
+        0,
+        5,
+    )
+    assert annotations[0].payload == {"isverse": True}
+    assert crud.annotation.get_pecha_ids(db, annotation_type="Sabche") == ["P000002"]
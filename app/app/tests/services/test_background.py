@@ -0,0 +1,16 @@
+from openpecha.core.layer import LayersEnum
+
+from app.models.pecha import Pecha
+from app.services.background import run_index_task
+
+
+def test_run_index_task_rolls_back_and_logs(db, caplog):
+    def index(db, pecha_id, layer_name):
+        db.add(Pecha(id=pecha_id, title="Kangyur"))
+        db.flush()
+        raise ValueError("layer not found")
+
+    run_index_task(index, db, "P000001", LayersEnum.citation)
+
+    assert db.query(Pecha).count() == 0
+    assert "Could not run index for P000001/Citation: layer not found" in caplog.text
@@ -0,0 +1,59 @@
+import pytest
+from openpecha.core.layer import LayersEnum
+
+from app.schemas.batch import BatchItem
+from app.services import pechas
+from app.services.batch import read_items
+
+
+@pytest.fixture
+def loaded(make_pecha, monkeypatch):
+    pecha = make_pecha(
+        bases={"v001": "ཀ་ཁ་ག་"},
+        layers={
+            "v001": {
+                "Citation": "id: c1\n"
+                "annotation_type: Citation\n"
+                "revision: '00001'\n"
+                "annotations:\n"
+                "  a1: {span: {start: 0, end: 2}}\n"
+            }
+        },
+    )
+    loaded = []
+
+    def get_pecha(pecha_id):
+        loaded.append(pecha_id)
+        if pecha_id != "P000001":
+            raise FileNotFoundError(pecha_id)
+        return pecha
+
+    monkeypatch.setattr(pechas, "get_pecha", get_pecha)
+    return loaded
+
+
+def test_read_items_loads_each_pecha_once(db, loaded):
+    results = read_items(
+        db,
+        [
+            BatchItem(resource="components", pecha_id="P000001"),
+            BatchItem(resource="base", pecha_id="P000001", base_name="v001"),
+            BatchItem(
+                resource="layer",
+                pecha_id="P000001",
+                base_name="v001",
+                layer_name=LayersEnum.citation,
+            ),
+            BatchItem(resource="base", pecha_id="P000001", base_name="v002"),
+            BatchItem(resource="layer", pecha_id="P000001", base_name="v001"),
+            BatchItem(resource="base", pecha_id="P000002", base_name="v001"),
+            BatchItem(resource="layer", pecha_id="P000002", base_name="v001"),
+        ],
+    )
+
+    assert [result.status for result in results] == [200, 200, 200, 404, 422, 404, 404]
+    assert results[0].data == {"v001": ["Citation"]}
+    assert results[1].data == "ཀ་ཁ་ག་"
+    assert list(results[2].data.annotations) == ["a1"]
+    # the missing catalog entry is built from the pecha loaded for the items
+    assert sorted(loaded) == ["P000001", "P000002"]
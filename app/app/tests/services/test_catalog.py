@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from app import crud
+from app.services import catalog
+
+
+@pytest.fixture
+def pecha(make_pecha, monkeypatch):
+    pecha = make_pecha(
+        bases={"v001": "ཀ་ཁ་ག་"},
+        layers={
+            "v001": {
+                "Citation": "id: c1\n"
+                "annotation_type: Citation\n"
+                "revision: '00001'\n"
+                "annotations:\n"
+                "  a1: {span: {start: 0, end: 2}}\n"
+                "  a2: {span: {start: 4, end: 6}}\n"
+            }
+        },
+    )
+    monkeypatch.setattr("app.services.pechas.get_pecha", lambda pecha_id: pecha)
+    return pecha
+
+
+def test_components_come_from_the_catalog(db, pecha, monkeypatch):
+    catalog.update_catalog(db, "P000001")
+    monkeypatch.setattr("app.services.pechas.get_pecha", None)
+
+    assert catalog.get_components(db, "P000001") == {"v001": ["Citation"]}
+    entry = crud.pecha_catalog.get(db, "P000001")
+    assert entry.base_count == 1
+    assert entry.layer_counts == {"v001": {"Citation": 2}}
+    assert entry.base_sizes == {"v001": len("ཀ་ཁ་ག་".encode("utf-8"))}
+
+
+def test_components_are_rebuilt_when_the_layers_change(db, pecha):
+    catalog.update_catalog(db, "P000001")
+    layer_fn = pecha.layers_path / "v001" / "Footnote.yml"
+    layer_fn.write_text(
+        "id: f1\nannotation_type: Footnote\nrevision: '00001'\nannotations: {}\n",
+        encoding="utf-8",
+    )
+    # the dir may change within the resolution of its mtime
+    stat = layer_fn.parent.stat()
+    os.utime(layer_fn.parent, (stat.st_atime, stat.st_mtime + 1))
+    # a pecha is loaded again by every request
+    pecha._components = {}
+
+    components = catalog.get_components(db, "P000001")
+
+    assert sorted(components["v001"]) == ["Citation", "Footnote"]
+    assert crud.pecha_catalog.get(db, "P000001").layer_counts["v001"]["Footnote"] == 0
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+from app.core.pubsub import InMemoryPubSub
+from app.schemas.job import JobEvent
+from app.services.jobs import (
+    get_job_owner_id,
+    new_job_id,
+    publish_job_event,
+    stream_job_events,
+)
+
+
+def test_stream_job_events_until_final_state():
+    async def run():
+        pubsub = InMemoryPubSub()
+        initial_event = JobEvent(job_id="job-1", state="PENDING", timestamp=0)
+        stream = stream_job_events(
+            pubsub,
+            lambda event: event.job_id == "job-1",
+            heartbeat=0.01,
+            initial_event=initial_event,
+            until_final=True,
+        )
+
+        assert "event: PENDING" in await stream.__anext__()
+        assert await stream.__anext__() == ": keep-alive\n\n"
+
+        publish_job_event("job-2", "STARTED", pubsub=pubsub)
+        publish_job_event("job-1", "PROGRESS", progress=0.5, pubsub=pubsub)
+        publish_job_event("job-1", "SUCCESS", progress=1.0, pubsub=pubsub)
+        return [event async for event in stream]
+
+    events = asyncio.run(run())
+
+    assert len(events) == 2
+    data = json.loads(events[0].splitlines()[2][len("data: ") :])
+    assert data["state"] == "PROGRESS"
+    assert data["progress"] == 0.5
+    assert "event: SUCCESS" in events[1]
+
+
+def test_task_events_carry_the_user_of_the_job(monkeypatch):
+    from app import worker
+    from app.services import jobs
+
+    async def run():
+        pubsub = InMemoryPubSub()
+        monkeypatch.setattr(jobs, "get_pubsub", lambda: pubsub)
+        subscription = pubsub.subscribe(jobs.JOB_EVENTS_CHANNEL)
+        worker.on_task_prerun(
+            task_id="job-1",
+            task=worker.export_pecha,
+            kwargs={"pecha_id": "P000001", "branch": "master", "user_id": 7},
+        )
+        return await subscription.get(timeout=1)
+
+    event = JobEvent.parse_obj(asyncio.run(run()))
+
+    assert event.job_id == "job-1"
+    assert event.state == "STARTED"
+    assert event.user_id == 7
+
+
+def test_job_owner_from_job_id():
+    assert get_job_owner_id(new_job_id(7)) == 7
+    assert get_job_owner_id("12345678-3b4d-4c5e-8f90-a1b2c3d4e5f6") is None
+    assert get_job_owner_id("unknown") is None
@@ -0,0 +1,97 @@
+import copy
+import random
+
+import pytest
+from openpecha.blupdate import Blupdate, update_ann_layer
+from openpecha.core.layer import Layer, LayersEnum
+
+from app.services.layers import CompactLayer
+
+
+def get_layer():
+    return Layer(
+        annotation_type=LayersEnum.pagination,
+        annotations={
+            "p1": {"span": {"start": 0, "end": 4}, "page_index": "1a"},
+            "p2": {"page_index": "1b", "span": {"start": 4, "end": 9}},
+            "p3": {"span": {"start": 9, "end": 12, "fail_update": "end"}},
+            "p4": {"reference": "no span"},
+        },
+    )
+
+
+def test_round_trip():
+    layer = get_layer()
+
+    assert CompactLayer.from_layer(layer).to_layer().dict() == layer.dict()
+    assert list(CompactLayer.from_layer(layer).to_layer().annotations["p2"]) == [
+        "page_index",
+        "span",
+    ]
+
+
+def test_identical_payloads_are_shared():
+    layer = Layer(
+        annotation_type=LayersEnum.citation,
+        annotations={
+            f"c{i}": {"span": {"start": i, "end": i + 1}, "isverse": True}
+            for i in range(3)
+        },
+    )
+
+    compact_layer = CompactLayer.from_layer(layer)
+
+    assert compact_layer.payloads[0] is compact_layer.payloads[2]
+
+
+def test_annotations_do_not_share_nested_values():
+    layer = Layer(
+        annotation_type=LayersEnum.citation,
+        annotations={"c1": {"span": {"start": 0, "end": 1}, "tags": ["verse"]}},
+    )
+    compact_layer = CompactLayer.from_layer(layer)
+
+    compact_layer.to_layer().annotations["c1"]["tags"].append("prose")
+
+    assert compact_layer.get_annotation(0)["tags"] == ["verse"]
+
+
+def test_reanchor_as_blupdate():
+    old_base, new_base = "ཀ་ཁ་ག་ང་ཅ་", "ཀ་ཁ་ཁ་ག་ང་ཅ་"
+    layer = get_layer()
+    # Blupdate fails on annotations without span
+    del layer.annotations["p4"]
+    expected = copy.deepcopy(layer.dict())
+    update_ann_layer(expected, Blupdate(old_base, new_base))
+
+    compact_layer = CompactLayer.from_layer(layer)
+    compact_layer.reanchor(Blupdate(old_base, new_base))
+
+    assert compact_layer.to_layer().dict() == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_reanchor_matches_update_ann_layer(seed):
+    rng = random.Random(seed)
+    syllables = ["ཀ", "ཁ", "ག", "ང", "ཅ", "ཆ", "ཇ", "ཉ"]
+    old_base = "".join(rng.choice(syllables) + "་" for _ in range(300))
+    new_base = old_base
+    for _ in range(rng.randint(1, 10)):
+        start = rng.randrange(len(new_base))
+        end = start + rng.randint(0, 12)
+        insert = "".join(rng.choice(syllables) for _ in range(rng.randint(0, 12)))
+        new_base = new_base[:start] + insert + new_base[end:]
+    annotations = {}
+    for i in range(200):
+        start = rng.randrange(len(old_base) + 5)
+        annotations[f"a{i}"] = {
+            "span": {"start": start, "end": start + rng.randint(0, 20)}
+        }
+    layer = Layer(annotation_type=LayersEnum.citation, annotations=annotations)
+    expected = copy.deepcopy(layer.dict())
+    update_ann_layer(expected, Blupdate(old_base, new_base))
+
+    compact_layer = CompactLayer.from_layer(layer)
+    compact_layer.reanchor(Blupdate(old_base, new_base))
+
+    assert compact_layer.to_layer().dict() == expected
@@ -0,0 +1,79 @@
+import yaml
+from openpecha import config
+
+from app.schemas.pecha import PedurmaNoteEdit
+from app.services.pedurma import (
+    get_changed_note_edits,
+    get_text_files_version,
+    update_vol_pagination,
+)
+
+
+def get_note_edit(image_no, ref_start_page_no, ref_end_page_no, vol=1):
+    return PedurmaNoteEdit(
+        image_link="",
+        image_no=image_no,
+        page_no=image_no,
+        ref_start_page_no=ref_start_page_no,
+        ref_end_page_no=ref_end_page_no,
+        vol=vol,
+    )
+
+
+def get_pagination_layer():
+    annotations = {}
+    for pg_num, page_index in enumerate(["1a", "1b", "2a", "2b", "3a", "3b"], 1):
+        annotations[f"uuid{pg_num}"] = {"page_index": page_index, "note_ref": None}
+    return {"annotations": annotations}
+
+
+def test_changed_note_edits_keyed_by_vol_and_image_no():
+    note_edits = [
+        get_note_edit(5, "1", "2"),
+        get_note_edit(5, "1", "3"),
+        get_note_edit(5, "1", "1", vol=2),
+    ]
+
+    vol_note_edits = get_changed_note_edits(note_edits)
+
+    assert list(vol_note_edits) == [1, 2]
+    assert vol_note_edits[1][0].ref_end_page_no == "3"
+
+
+def test_update_vol_pagination_reports_changed_pages():
+    pagination_layer = get_pagination_layer()
+
+    changed_pages = update_vol_pagination(
+        pagination_layer, [get_note_edit(6, "1", "2")]
+    )
+
+    assert changed_pages == ["1a", "1b"]
+    assert pagination_layer["annotations"]["uuid1"]["note_ref"] == "uuid6"
+
+    changed_pages = update_vol_pagination(
+        pagination_layer, [get_note_edit(6, "2", "3")]
+    )
+
+    assert changed_pages == ["1a", "2a"]
+    assert pagination_layer["annotations"]["uuid1"]["note_ref"] is None
+    assert pagination_layer["annotations"]["uuid3"]["note_ref"] == "uuid6"
+
+
+def test_text_files_version_covers_only_the_volumes_of_the_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PECHAS_PATH", tmp_path)
+    opf_path = tmp_path / "P000792" / "P000792.opf"
+    index = {"annotations": {"uuid1": {"work_id": "T1", "span": [{"vol": 1}]}}}
+    (opf_path / "layers" / "v001").mkdir(parents=True)
+    (opf_path / "layers" / "v002").mkdir(parents=True)
+    (opf_path / "index.yml").write_text(yaml.safe_dump(index), encoding="utf-8")
+    for vol in ("v001", "v002"):
+        (opf_path / "layers" / vol / "Pagination.yml").write_text("{}")
+
+    version = get_text_files_version("P000792", "T1")
+    (opf_path / "layers" / "v002" / "Pagination.yml").write_text("{annotations: {}}")
+
+    assert get_text_files_version("P000792", "T1") == version
+
+    (opf_path / "layers" / "v001" / "Pagination.yml").write_text("{annotations: {}}")
+
+    assert get_text_files_version("P000792", "T1") != version
@@ -0,0 +1,131 @@
+import fcntl
+import threading
+import time
+
+import pytest
+from openpecha import config
+from openpecha.core.layer import Layer, LayersEnum
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud
+from app.db.base import Base
+from app.services.revisions import RevisionGone, get_changes, save_layer
+
+
+@pytest.fixture
+def pecha(make_pecha):
+    return make_pecha(layers={"v001": {}})
+
+
+def citation_layer(annotations):
+    return Layer(
+        annotation_type=LayersEnum.citation,
+        annotations={
+            annotation_id: {"span": {"start": start, "end": end}}
+            for annotation_id, (start, end) in annotations.items()
+        },
+    )
+
+
+def test_changes_since_revision(db, pecha):
+    save_layer(db, pecha, "v001", LayersEnum.citation, citation_layer({"a1": (0, 2)}))
+    save_layer(
+        db,
+        pecha,
+        "v001",
+        LayersEnum.citation,
+        citation_layer({"a1": (0, 3), "a2": (4, 6)}),
+    )
+    layer = save_layer(
+        db, pecha, "v001", LayersEnum.citation, citation_layer({"a1": (0, 3)})
+    )
+
+    assert layer.revision == "00003"
+    changes = get_changes(db, pecha, "v001", LayersEnum.citation, since=1)
+    assert changes["revision"] == "00003"
+    assert changes["upserted"] == {"a1": {"span": {"start": 0, "end": 3}}}
+    assert changes["removed"] == ["a2"]
+    assert (
+        get_changes(db, pecha, "v001", LayersEnum.citation, since=3)["upserted"] == {}
+    )
+
+
+def test_changes_outside_the_log_are_gone(db, pecha):
+    layer = citation_layer({"a1": (0, 2)})
+    layer.revision = "00004"
+    pecha.save_layer("v001", LayersEnum.citation, layer)
+    save_layer(db, pecha, "v001", LayersEnum.citation, citation_layer({}))
+
+    assert get_changes(db, pecha, "v001", LayersEnum.citation, since=4)["removed"] == [
+        "a1"
+    ]
+    with pytest.raises(RevisionGone):
+        get_changes(db, pecha, "v001", LayersEnum.citation, since=3)
+
+
+def test_concurrent_saves_get_their_own_revision(tmp_path, pecha, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'revisions.sqlite3'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(bind=engine)
+    get_latest = crud.layer_revision.get_latest
+
+    def slow_get_latest(*args, **kwargs):
+        # both writers read the latest revision before either logs one
+        latest = get_latest(*args, **kwargs)
+        time.sleep(0.1)
+        return latest
+
+    monkeypatch.setattr(crud.layer_revision, "get_latest", slow_get_latest)
+    start = threading.Barrier(2)
+    revisions = []
+
+    def save(annotations):
+        db = SessionLocal()
+        start.wait()
+        layer = save_layer(
+            db, pecha, "v001", LayersEnum.citation, citation_layer(annotations)
+        )
+        revisions.append(layer.revision)
+        db.close()
+
+    threads = [
+        threading.Thread(target=save, args=({"a1": (0, 2)},)),
+        threading.Thread(target=save, args=({"a2": (4, 6)},)),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(revisions) == ["00001", "00002"]
+    db = SessionLocal()
+    changes = get_changes(db, pecha, "v001", LayersEnum.citation, since=0)
+    layer_dict = pecha.read_layers_file("v001", LayersEnum.citation.value)
+    assert changes["revision"] == layer_dict["revision"] == "00002"
+    assert changes["upserted"] == layer_dict["annotations"]
+    db.close()
+
+
+def test_saves_exclude_refreshes_of_the_pecha(db, pecha, monkeypatch):
+    get_latest = crud.layer_revision.get_latest
+    lock_fn = config.PECHAS_PATH / ".locks" / "P000001.lock"
+    locked = []
+
+    def get_latest_while_locked(*args, **kwargs):
+        with lock_fn.open("w") as lock_file:
+            # other writers share the pecha lock, a refresh can't take it
+            fcntl.flock(lock_file, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        locked.append(True)
+        return get_latest(*args, **kwargs)
+
+    monkeypatch.setattr(crud.layer_revision, "get_latest", get_latest_while_locked)
+    save_layer(db, pecha, "v001", LayersEnum.citation, citation_layer({"a1": (0, 2)}))
+
+    assert locked == [True]
@@ -0,0 +1,71 @@
+from app import crud
+from app.core.config import settings
+from app.services.search import get_postings, search, tokenize
+
+
+def index(db, pecha_id, base_name, text):
+    crud.search_posting.replace_base(
+        db, pecha_id=pecha_id, base_name=base_name, postings=get_postings(text)
+    )
+
+
+def test_tokenize_on_tsheg_and_shad():
+    syllables = tokenize("བཀྲ་ཤིས། བདེ་\nལེགས")
+
+    assert [syllable.text for syllable in syllables] == ["བཀྲ", "ཤིས", "བདེ", "ལེགས"]
+    assert [syllable.break_before for syllable in syllables] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_search_phrase(db):
+    index(db, "P000001", "v001", "བཀྲ་ཤིས་བདེ་ལེགས། བཀྲ་ཤིས་བདེ་\nལེགས།")
+    index(db, "P000002", "v001", "བཀྲ་ཤིས་བདེ་ལེགས། བཀྲ་ཤིས། བདེ་ལེགས།")
+
+    results = search(db, "བཀྲ་ཤིས་བདེ་ལེགས")
+
+    assert results["total"] == 3
+    assert [
+        (hit.pecha_id, hit.span.start, hit.span.end) for hit in results["hits"]
+    ] == [
+        ("P000001", 0, 16),
+        ("P000001", 18, 35),
+        ("P000002", 0, 16),
+    ]
+    assert results["hits"][0].score == 2
+
+
+def test_reindex_replaces_postings(db):
+    index(db, "P000001", "v001", "བཀྲ་ཤིས་བདེ་ལེགས།")
+    index(db, "P000001", "v001", "བདེ་ལེགས།")
+
+    assert search(db, "བཀྲ་ཤིས")["total"] == 0
+    assert search(db, "ལེགས")["total"] == 1
+
+
+def test_search_paginates_across_bases(db):
+    index(db, "P000001", "v001", "ཀ་ཁ་ཀ་ཁ་ཀ།")
+    index(db, "P000002", "v001", "ཀ་ཁ་ཀ།")
+    index(db, "P000003", "v001", "ཀ།")
+
+    results = search(db, "ཀ", skip=2, limit=2)
+
+    assert results["total"] == 6
+    assert [(hit.pecha_id, hit.span.start, hit.score) for hit in results["hits"]] == [
+        ("P000001", 8, 3),
+        ("P000002", 0, 2),
+    ]
+
+
+def test_search_ranks_the_bases_with_most_phrase_candidates(db, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_MAX_BASES", 1)
+    index(db, "P000001", "v001", "ཀ་ཁ་ཀ་ཁ།")
+    index(db, "P000002", "v001", "ཀ་ཁ།")
+
+    results = search(db, "ཀ་ཁ")
+
+    assert results["total"] == 2
+    assert {hit.pecha_id for hit in results["hits"]} == {"P000001"}
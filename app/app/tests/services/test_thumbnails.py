@@ -0,0 +1,68 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+from app.core.config import settings
+from app.models.pecha import Pecha
+from app.services import thumbnails
+
+
+@pytest.fixture
+def cover_fn(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "THUMBNAILS_PATH", tmp_path / "thumbnails")
+    monkeypatch.setattr(settings, "THUMBNAIL_WIDTHS", [160, 320, 640])
+    cover_fn = tmp_path / "cover.png"
+    Image.new("RGBA", (400, 600), (200, 30, 30, 255)).save(cover_fn)
+    return cover_fn
+
+
+def test_create_thumbnails(cover_fn):
+    names = thumbnails.create_thumbnails("P000001", cover_fn)
+
+    digest = names[0].split("-")[0]
+    assert names == [
+        f"{digest}-160.webp",
+        f"{digest}-160.jpg",
+        f"{digest}-320.webp",
+        f"{digest}-320.jpg",
+        f"{digest}-400.webp",
+        f"{digest}-400.jpg",
+    ]
+    with Image.open(thumbnails.get_thumbnail_path("P000001", names[3])) as image:
+        assert (image.format, image.size) == ("JPEG", (320, 480))
+    assert thumbnails.get_img_url("P000001", names).endswith(
+        f"/pechas/P000001/thumbnails/{digest}-320.jpg"
+    )
+
+
+def test_get_thumbnail_path_rejects_other_files(cover_fn):
+    names = thumbnails.create_thumbnails("P000001", cover_fn)
+
+    assert thumbnails.get_thumbnail_path("P000001", "000000000000-160.jpg") is None
+    assert thumbnails.get_thumbnail_path("..", names[0]) is None
+    assert thumbnails.get_thumbnail_path("P000001", "../cover.png") is None
+
+
+def test_backfill_thumbnails(db, cover_fn, monkeypatch):
+    updated_at = datetime(2021, 1, 1)
+    github_img = (
+        "https://github.com/OpenPecha/P000001/raw/master/P000001.opf"
+        "/assets/image/cover.png"
+    )
+    db.add(Pecha(id="P000001", title="Kangyur", img=github_img, updated_at=updated_at))
+    db.commit()
+    monkeypatch.setattr(
+        "app.services.pechas.get_pecha",
+        lambda pecha_id: SimpleNamespace(assets_path=cover_fn.parent / "assets"),
+    )
+    (cover_fn.parent / "assets" / "image").mkdir(parents=True)
+    cover_fn.rename(cover_fn.parent / "assets" / "image" / "cover.png")
+
+    assert thumbnails.backfill_thumbnails(db) == 1
+    pecha = db.query(Pecha).get("P000001")
+    db.refresh(pecha)
+    assert "/pechas/P000001/thumbnails/" in pecha.img
+    assert pecha.updated_at == updated_at
+    assert thumbnails.backfill_thumbnails(db) == 0
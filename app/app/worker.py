@@ -1,11 +1,90 @@
-from raven import Client
+import logging
+from typing import Dict, List, Optional
 
-from app.core.celery_app import celery_app
+from celery.signals import task_failure, task_prerun, task_success
+
+from app.core.celery_app import PRIORITY_LOW, celery_app
 from app.core.config import settings
+from app.schemas.pecha import PedurmaNoteEdit, PedurmaPaginationUpdate
+from app.services import pedurma
+from app.services.jobs import publish_job_event
+from app.services.pechas import create_export
+
+if settings.SENTRY_DSN:
+    from raven import Client
+
+    client_sentry = Client(settings.SENTRY_DSN)
+
+logger = logging.getLogger(__name__)
+
+
+def report_progress(task, progress: float, message: Optional[str] = None) -> None:
+    task.update_state(state="PROGRESS", meta={"progress": progress})
+    try:
+        publish_job_event(
+            task.request.id,
+            "PROGRESS",
+            task=task.name,
+            user_id=(task.request.kwargs or {}).get("user_id"),
+            progress=progress,
+            message=message,
+        )
+    except Exception as e:
+        # progress is best effort, never fail the job for it
+        logger.warning(f"Could not publish progress of {task.request.id}: {e}")
+
+
+@task_prerun.connect
+def on_task_prerun(task_id=None, task=None, kwargs=None, **_):
+    publish_job_event(
+        task_id,
+        "STARTED",
+        task=task.name,
+        user_id=(kwargs or {}).get("user_id"),
+        progress=0.0,
+    )
 
-client_sentry = Client(settings.SENTRY_DSN)
+
+@task_success.connect
+def on_task_success(sender=None, **_):
+    publish_job_event(
+        sender.request.id,
+        "SUCCESS",
+        task=sender.name,
+        user_id=(sender.request.kwargs or {}).get("user_id"),
+        progress=1.0,
+    )
+
+
+@task_failure.connect
+def on_task_failure(sender=None, task_id=None, exception=None, **_):
+    publish_job_event(
+        task_id,
+        "FAILURE",
+        task=sender.name,
+        user_id=(sender.request.kwargs or {}).get("user_id"),
+        message=str(exception),
+    )
 
 
 @celery_app.task(acks_late=True)
 def test_celery(word: str) -> str:
     return f"test task return {word}"
+
+
+@celery_app.task(bind=True, priority=PRIORITY_LOW)
+def export_pecha(
+    self, pecha_id: str, branch: str = "master", user_id: Optional[int] = None
+) -> str:
+    report_progress(self, 0.1, f"Exporting {pecha_id}")
+    return create_export(pecha_id, branch)
+
+
+@celery_app.task(bind=True)
+def pedurma_update_text_pagination(
+    self, text_id: str, notes: List[Dict], user_id: Optional[int] = None
+) -> Dict[str, Dict[str, List[str]]]:
+    note_edits = [PedurmaNoteEdit.parse_obj(note) for note in notes]
+    report_progress(self, 0.1, f"Updating pagination of {text_id}")
+    changed_pages = pedurma.update_text_pagination(text_id, note_edits)
+    return PedurmaPaginationUpdate(changed_pages=changed_pages).dict()
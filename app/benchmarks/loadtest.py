@@ -0,0 +1,373 @@
+"""
+Load test of the app served by gunicorn, offline, over synthetic pechas.
+
+    python -m benchmarks.loadtest --workers 1,2,4 --concurrency 1,4,16,32
+    python -m benchmarks.loadtest --env SOME_CACHE_SIZE=256 --output load.json
+
+For every worker count, a server is started with the repo gunicorn config
+and driven by closed-loop virtual users at every concurrency level. Each
+user repeatedly plays one of the scenarios, picked by weight, on a random
+pecha: editor sessions, listing, layer edits and exports.
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+from benchmarks import stubs
+from benchmarks.run import API_V1_STR, BASE_NAME, percentile
+from benchmarks.synthetic import PechaSpec, create_pecha
+
+APP_DIR = Path(__file__).resolve().parents[1]
+GUNICORN_CONF = APP_DIR / "gunicorn_conf.py"
+
+DEFAULT_MIX = "editor=3,listing=3,layer=3,export=1"
+
+
+@dataclass
+class Sample:
+    operation: str
+    duration: float
+    ok: bool
+
+
+@dataclass
+class VirtualUser:
+    base_url: str
+    pecha_ids: List[str]
+    layer_name: str
+    rng: random.Random
+    session: requests.Session = field(default_factory=requests.Session)
+    samples: List[Sample] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.session.headers["token"] = stubs.BENCH_TOKEN
+
+    def request(self, operation: str, method: str, path: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        self.samples.append(Sample(operation, time.perf_counter() - start, ok))
+        return response if ok else None
+
+    def editor_session(self, pecha_id: str) -> None:
+        path = f"{API_V1_STR}/pechas/{pecha_id}/{BASE_NAME}/editor"
+        response = self.request("editor_get", "GET", path)
+        if response is not None:
+            content = response.json()["content"]
+            self.request("editor_put", "PUT", path, json={"content": content})
+
+    def listing(self, pecha_id: str) -> None:
+        self.request("list_pechas", "GET", f"{API_V1_STR}/pechas")
+        self.request(
+            "read_components", "GET", f"{API_V1_STR}/pechas/{pecha_id}/components"
+        )
+
+    def layer_edit(self, pecha_id: str) -> None:
+        path = f"{API_V1_STR}/pechas/{pecha_id}/layers/{BASE_NAME}/{self.layer_name}"
+        response = self.request("read_layer", "GET", path)
+        if response is not None:
+            self.request("update_layer", "PUT", path, json=response.json())
+
+    def export(self, pecha_id: str) -> None:
+        self.request("export", "GET", f"{API_V1_STR}/pechas/{pecha_id}/export/main")
+
+    def run(self, scenarios: List[Tuple[Callable, int]], deadline: float) -> None:
+        actions = [scenario for scenario, _ in scenarios]
+        weights = [weight for _, weight in scenarios]
+        while time.perf_counter() < deadline:
+            action = self.rng.choices(actions, weights)[0]
+            action(self, self.rng.choice(self.pecha_ids))
+
+
+SCENARIOS = {
+    "editor": VirtualUser.editor_session,
+    "listing": VirtualUser.listing,
+    "layer": VirtualUser.layer_edit,
+    "export": VirtualUser.export,
+}
+
+
+def parse_mix(mix: str) -> List[Tuple[Callable, int]]:
+    scenarios = []
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        scenarios.append((SCENARIOS[name.strip()], int(weight or 1)))
+    return scenarios
+
+
+def summarize(samples: List[Sample], elapsed: float) -> Dict:
+    durations = [sample.duration for sample in samples]
+    if not durations:
+        return {"requests": 0, "errors": 0}
+    return {
+        "requests": len(samples),
+        "errors": sum(not sample.ok for sample in samples),
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(durations, 50) * 1000, 2),
+        "p95_ms": round(percentile(durations, 95) * 1000, 2),
+        "p99_ms": round(percentile(durations, 99) * 1000, 2),
+    }
+
+
+def run_level(
+    base_url: str,
+    pecha_ids: List[str],
+    layer_name: str,
+    scenarios: List[Tuple[Callable, int]],
+    concurrency: int,
+    duration: float,
+    seed: int,
+) -> Dict:
+    users = [
+        VirtualUser(base_url, pecha_ids, layer_name, random.Random(seed + idx))
+        for idx in range(concurrency)
+    ]
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [
+        threading.Thread(target=user.run, args=(scenarios, deadline)) for user in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = [sample for user in users for sample in user.samples]
+    operations = {}
+    for sample in samples:
+        operations.setdefault(sample.operation, []).append(sample)
+    return {
+        "concurrency": concurrency,
+        **summarize(samples, elapsed),
+        "operations": {
+            operation: summarize(op_samples, elapsed)
+            for operation, op_samples in sorted(operations.items())
+        },
+    }
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def seed_db(database_url: str, pecha_ids: List[str]) -> None:
+    from app import models
+
+    SessionLocal = stubs.get_test_sessionmaker(database_url)
+    db = SessionLocal()
+    try:
+        db.add(
+            models.User(
+                id=stubs.BENCH_USER_ID,
+                username="benchmark",
+                email="benchmark@example.com",
+            )
+        )
+        for pecha_id in pecha_ids:
+            db.add(
+                models.Pecha(
+                    id=pecha_id,
+                    title=f"Synthetic {pecha_id}",
+                    owner_id=stubs.BENCH_USER_ID,
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+
+def start_server(
+    workers: int,
+    port: int,
+    pechas_path: Path,
+    database_url: str,
+    env: Dict[str, str],
+    log_file,
+) -> subprocess.Popen:
+    server_env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "BIND": f"127.0.0.1:{port}",
+        "ACCESS_LOG": "",
+        "LOG_LEVEL": "warning",
+        "LOADTEST_PECHAS_PATH": str(pechas_path),
+        "LOADTEST_DATABASE_URL": database_url,
+        **env,
+    }
+    metrics_dir = pechas_path.parent / "prometheus_multiproc"
+    metrics_dir.mkdir(exist_ok=True)
+    server_env.setdefault("PROMETHEUS_MULTIPROC_DIR", str(metrics_dir))
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "gunicorn",
+            "-c",
+            str(GUNICORN_CONF),
+            "-k",
+            "uvicorn.workers.UvicornWorker",
+            "benchmarks.loadtest_app:app",
+        ],
+        cwd=APP_DIR,
+        env=server_env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def wait_for_server(base_url: str, server: subprocess.Popen, timeout: float = 60):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            requests.get(f"{base_url}{API_V1_STR}/openapi.json", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"server not ready after {timeout}s")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def format_level(workers: int, level: Dict) -> str:
+    if not level["requests"]:
+        return f"{workers:>7} {level['concurrency']:>11}  no requests"
+    return (
+        f"{workers:>7} {level['concurrency']:>11} {level['throughput_rps']:>9.1f} "
+        f"{level['p50_ms']:>9.1f} {level['p95_ms']:>9.1f} {level['p99_ms']:>9.1f} "
+        f"{level['errors']:>7}"
+    )
+
+
+def parse_ints(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pechas", type=int, default=4)
+    parser.add_argument("--volume-size", type=int, default=100_000)
+    parser.add_argument("--annotations", type=int, default=1_000)
+    parser.add_argument("--workers", type=parse_ints, default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=parse_ints, default=[1, 2, 4, 8, 16])
+    parser.add_argument(
+        "--duration", type=float, default=20, help="seconds per concurrency level"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument(
+        "--env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="setting passed to the server, e.g. a cache size",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--server-log",
+        type=Path,
+        default=Path(os.devnull),
+        help="where the server output and tracebacks go",
+    )
+    parser.add_argument("--output", type=Path, help="write the curves as json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    scenarios = parse_mix(args.mix)
+    env = dict(item.split("=", 1) for item in args.env)
+    specs = [
+        PechaSpec(
+            pecha_id=f"P{idx:06}",
+            volume_size=args.volume_size,
+            annotations_per_layer=args.annotations,
+            seed=args.seed + idx,
+        )
+        for idx in range(1, args.pechas + 1)
+    ]
+    pecha_ids = [spec.pecha_id for spec in specs]
+    layer_name = specs[0].layers[0]
+
+    curves = {}
+    print(
+        f"{'workers':>7} {'concurrency':>11} {'req/s':>9} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    )
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory(prefix="loadtest-") as tmpdir:
+            pechas_path = Path(tmpdir) / "pechas"
+            for spec in specs:
+                create_pecha(pechas_path, spec)
+            database_url = f"sqlite:///{tmpdir}/loadtest.db"
+            seed_db(database_url, pecha_ids)
+
+            port = get_free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            with args.server_log.open("a") as log_file:
+                server = start_server(
+                    workers, port, pechas_path, database_url, env, log_file
+                )
+            try:
+                wait_for_server(base_url, server)
+                curves[workers] = []
+                for concurrency in args.concurrency:
+                    level = run_level(
+                        base_url,
+                        pecha_ids,
+                        layer_name,
+                        scenarios,
+                        concurrency,
+                        args.duration,
+                        args.seed,
+                    )
+                    curves[workers].append(level)
+                    print(format_level(workers, level), flush=True)
+            finally:
+                stop_server(server)
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "spec": asdict(specs[0]),
+                    "pechas": args.pechas,
+                    "mix": args.mix,
+                    "duration": args.duration,
+                    "env": env,
+                    "curves": curves,
+                },
+                indent=2,
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""
+ASGI app served by the load test workers, with the offline stubs applied.
+
+    LOADTEST_PECHAS_PATH=... LOADTEST_DATABASE_URL=sqlite:///... \\
+        gunicorn -k uvicorn.workers.UvicornWorker benchmarks.loadtest_app:app
+"""
+
+import os
+from contextlib import ExitStack
+from pathlib import Path
+
+from benchmarks.stubs import get_test_sessionmaker, offline_app
+
+_stubs = ExitStack()
+
+app = _stubs.enter_context(
+    offline_app(
+        Path(os.environ["LOADTEST_PECHAS_PATH"]),
+        get_test_sessionmaker(os.environ["LOADTEST_DATABASE_URL"]),
+    )
+)
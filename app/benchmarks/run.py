@@ -0,0 +1,357 @@
+"""
+Offline benchmarks of the pecha and pedurma endpoints over synthetic pechas.
+
+    python -m benchmarks.run --volume-size 500000 --output bench.json
+    python -m benchmarks.run --baseline bench.json
+
+Every case runs in a fresh process, so that its peak RSS is its own.
+"""
+
+import argparse
+import json
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import yaml
+
+from benchmarks import stubs
+from benchmarks.synthetic import PechaSpec, create_pecha, create_pedurma_pecha
+
+API_V1_STR = "/api/v1"
+BASE_NAME = "v001"
+PEDURMA_PECHA_ID = "P000792"
+PEDURMA_TEXT_ID = "T-1"
+
+# compared to the baseline, the direction says which way is worse
+METRICS = {"p50_ms": 1, "p99_ms": 1, "throughput_rps": -1, "peak_rss_mb": 1}
+
+
+@dataclass
+class BenchConfig:
+    spec: PechaSpec
+    pedurma_pages: int = 1000
+    pedurma_notes: int = 50
+    iterations: int = 20
+    warmup: int = 2
+
+
+@dataclass
+class CaseContext:
+    client: object
+    pechas_path: Path
+    pristine_path: Path
+    config: BenchConfig
+
+    @property
+    def pecha_id(self) -> str:
+        return self.config.spec.pecha_id
+
+    @property
+    def opf_path(self) -> Path:
+        return self.pechas_path / self.pecha_id / f"{self.pecha_id}.opf"
+
+    def restore(self, pecha_id: str, *parts: str) -> Callable[[], None]:
+        """
+        Reset, between iterations, the given paths of the pecha written by a case.
+        """
+
+        def reset():
+            for part in parts:
+                src = self.pristine_path / pecha_id / f"{pecha_id}.opf" / part
+                dst = self.pechas_path / pecha_id / f"{pecha_id}.opf" / part
+                if src.is_dir():
+                    shutil.rmtree(dst, ignore_errors=True)
+                    shutil.copytree(src, dst)
+                else:
+                    shutil.copyfile(src, dst)
+
+        return reset
+
+
+Request = Callable[[], object]
+Reset = Optional[Callable[[], None]]
+
+
+def case_read_components(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pechas/{ctx.pecha_id}/components"
+    return lambda: ctx.client.get(url), None
+
+
+def case_read_base(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pechas/{ctx.pecha_id}/base/{BASE_NAME}"
+    return lambda: ctx.client.get(url), None
+
+
+def case_read_layer(ctx: CaseContext) -> Tuple[Request, Reset]:
+    layer_name = ctx.config.spec.layers[0]
+    url = f"{API_V1_STR}/pechas/{ctx.pecha_id}/layers/{BASE_NAME}/{layer_name}"
+    return lambda: ctx.client.get(url), None
+
+
+def case_editor_get(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pechas/{ctx.pecha_id}/{BASE_NAME}/editor"
+    headers = {"token": stubs.BENCH_TOKEN}
+    return lambda: ctx.client.get(url, headers=headers), None
+
+
+def case_editor_put(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pechas/{ctx.pecha_id}/{BASE_NAME}/editor"
+    headers = {"token": stubs.BENCH_TOKEN}
+    content = ctx.client.get(url, headers=headers).json()["content"]
+    reset = ctx.restore(ctx.pecha_id, "base", "layers")
+    return (
+        lambda: ctx.client.put(url, json={"content": content}, headers=headers),
+        reset,
+    )
+
+
+def case_update_base_layer(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pechas/{ctx.pecha_id}/base/{BASE_NAME}"
+    headers = {"token": stubs.BENCH_TOKEN}
+    old_base = (ctx.opf_path / "base" / f"{BASE_NAME}.txt").read_text(encoding="utf-8")
+    middle = len(old_base) // 2
+    new_base = old_base[:middle] + "བཀྲ་ཤིས་" + old_base[middle:]
+    layers = [
+        yaml.safe_load(layer_fn.read_text(encoding="utf-8"))
+        for layer_fn in sorted((ctx.opf_path / "layers" / BASE_NAME).glob("*.yml"))
+    ]
+    body = {"updated_base": {"content": new_base}, "layers": layers}
+    reset = ctx.restore(ctx.pecha_id, "base", "layers")
+    return lambda: ctx.client.put(url, json=body, headers=headers), reset
+
+
+def get_pedurma_note_edits(pages: int, n_notes: int) -> List[Dict]:
+    """
+    Durchen pages at the end of the volume, each referring to a range of
+    the body pages.
+    """
+    n_notes = min(n_notes, pages // 2)
+    refs_per_note = max((pages - n_notes) // max(n_notes, 1), 1)
+    note_edits = []
+    for note_idx in range(n_notes):
+        image_no = pages - n_notes + note_idx + 1
+        ref_start_page_no = note_idx * refs_per_note + 1
+        note_edits.append(
+            {
+                "image_link": "",
+                "image_no": image_no,
+                "page_no": image_no,
+                "ref_start_page_no": str(ref_start_page_no),
+                "ref_end_page_no": str(ref_start_page_no + refs_per_note - 1),
+                "vol": 1,
+            }
+        )
+    return note_edits
+
+
+def case_pedurma_text_get(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pedurma/{PEDURMA_PECHA_ID}/texts/{PEDURMA_TEXT_ID}"
+    return lambda: ctx.client.get(url), None
+
+
+def case_pedurma_notes_get(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pedurma/{PEDURMA_TEXT_ID}/notes"
+    return lambda: ctx.client.get(url), None
+
+
+def case_pedurma_notes_update(ctx: CaseContext) -> Tuple[Request, Reset]:
+    url = f"{API_V1_STR}/pedurma/{PEDURMA_TEXT_ID}/notes"
+    notes = get_pedurma_note_edits(ctx.config.pedurma_pages, ctx.config.pedurma_notes)
+    headers = {"token": stubs.BENCH_TOKEN}
+    reset = ctx.restore(PEDURMA_PECHA_ID, "layers")
+    return lambda: ctx.client.post(url, json=notes, headers=headers), reset
+
+
+CASES = {
+    "read_components": case_read_components,
+    "read_base": case_read_base,
+    "read_layer": case_read_layer,
+    "editor_get": case_editor_get,
+    "editor_put": case_editor_put,
+    "update_base_layer": case_update_base_layer,
+    # the pedurma preview needs a diff binary downloaded from GitHub, and
+    # saving a text only echoes its id
+    "pedurma_text_get": case_pedurma_text_get,
+    "pedurma_notes_get": case_pedurma_notes_get,
+    "pedurma_notes_update": case_pedurma_notes_update,
+}
+
+
+def percentile(durations: List[float], pct: float) -> float:
+    ordered = sorted(durations)
+    idx = min(int(round(pct / 100 * len(ordered) + 0.5)) - 1, len(ordered) - 1)
+    return ordered[max(idx, 0)]
+
+
+def get_peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name: str, pristine_path: str, config: BenchConfig) -> Dict:
+    from fastapi.testclient import TestClient
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmpdir:
+        pechas_path = Path(tmpdir)
+        shutil.copytree(pristine_path, pechas_path, dirs_exist_ok=True)
+        with stubs.offline_app(pechas_path) as app, TestClient(app) as client:
+            ctx = CaseContext(client, pechas_path, Path(pristine_path), config)
+            request, reset = CASES[name](ctx)
+            durations = []
+            for iteration in range(config.warmup + config.iterations):
+                if reset:
+                    reset()
+                start = time.perf_counter()
+                response = request()
+                duration = time.perf_counter() - start
+                if response.status_code >= 400:
+                    raise RuntimeError(
+                        f"{name}: {response.status_code} {response.text[:200]}"
+                    )
+                if iteration >= config.warmup:
+                    durations.append(duration)
+
+    return {
+        "iterations": len(durations),
+        "p50_ms": round(percentile(durations, 50) * 1000, 2),
+        "p99_ms": round(percentile(durations, 99) * 1000, 2),
+        "throughput_rps": round(len(durations) / sum(durations), 2),
+        "peak_rss_mb": round(get_peak_rss_mb(), 1),
+        "response_bytes": len(response.content),
+    }
+
+
+def create_pechas(root: Path, config: BenchConfig) -> None:
+    create_pecha(root, config.spec)
+    create_pedurma_pecha(
+        root,
+        PEDURMA_PECHA_ID,
+        PEDURMA_TEXT_ID,
+        config.pedurma_pages,
+        config.pedurma_notes,
+    )
+
+
+def run(config: BenchConfig, case_names: List[str]) -> Dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench-pechas-") as tmpdir:
+        create_pechas(Path(tmpdir), config)
+        for name in case_names:
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=get_context("spawn")
+            ) as executor:
+                results[name] = executor.submit(run_case, name, tmpdir, config).result()
+            print(format_result(name, results[name]), flush=True)
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "spec": asdict(config.spec),
+        "pedurma_pages": config.pedurma_pages,
+        "pedurma_notes": config.pedurma_notes,
+        "results": results,
+    }
+
+
+def format_result(name: str, result: Dict) -> str:
+    return (
+        f"{name:<22} p50 {result['p50_ms']:>9.2f} ms  p99 {result['p99_ms']:>9.2f} ms  "
+        f"{result['throughput_rps']:>8.2f} req/s  rss {result['peak_rss_mb']:>7.1f} MB"
+    )
+
+
+def compare(
+    current: Dict, baseline: Dict, threshold: float, metrics: Dict[str, int] = METRICS
+) -> List[str]:
+    """
+    Metrics worse than the baseline by more than `threshold` (a fraction).
+    """
+    if current.get("spec") != baseline.get("spec"):
+        print("warning: baseline was recorded with a different pecha spec")
+    regressions = []
+    for name, result in current["results"].items():
+        baseline_result = baseline.get("results", {}).get(name)
+        if not baseline_result:
+            continue
+        for metric, direction in metrics.items():
+            old, new = baseline_result[metric], result[metric]
+            if not old:
+                continue
+            change = (new - old) / old * direction
+            if change > threshold:
+                regressions.append(
+                    f"{name}.{metric}: {old} -> {new} ({change * 100:+.1f}% worse)"
+                )
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--volumes", type=int, default=1)
+    parser.add_argument("--volume-size", type=int, default=100_000)
+    parser.add_argument("--annotations", type=int, default=1_000)
+    parser.add_argument("--pedurma-pages", type=int, default=1000)
+    parser.add_argument("--pedurma-notes", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument(
+        "--cases", default=",".join(CASES), help="comma separated case names"
+    )
+    parser.add_argument("--output", type=Path, help="write results as json")
+    parser.add_argument("--baseline", type=Path, help="compare to a previous run")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown compared to the baseline, as a fraction",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    case_names = [name.strip() for name in args.cases.split(",") if name.strip()]
+    unknown = set(case_names) - set(CASES)
+    if unknown:
+        print(f"unknown cases: {', '.join(sorted(unknown))}")
+        return 2
+
+    config = BenchConfig(
+        spec=PechaSpec(
+            volumes=args.volumes,
+            volume_size=args.volume_size,
+            annotations_per_layer=args.annotations,
+        ),
+        pedurma_pages=args.pedurma_pages,
+        pedurma_notes=args.pedurma_notes,
+        iterations=args.iterations,
+        warmup=args.warmup,
+    )
+    current = run(config, case_names)
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    if args.baseline:
+        regressions = compare(
+            current, json.loads(args.baseline.read_text()), args.threshold
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Cold start of the API and Celery workers: import time and resident memory.
+
+    python -m benchmarks.startup --output startup.json
+    python -m benchmarks.startup --baseline startup.json
+
+Every measure imports the worker module in a fresh interpreter, like a
+gunicorn or Celery worker boot. The slowest top level packages are listed
+from `python -X importtime`.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.run import compare
+
+APP_DIR = Path(__file__).resolve().parents[1]
+
+TARGETS = {"api": "app.main", "worker": "app.worker"}
+
+METRICS = {"import_ms": 1, "rss_mb": 1}
+
+MEASURE = """
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+import_ms = (time.perf_counter() - start) * 1000
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+print(json.dumps({"import_ms": import_ms, "rss_mb": rss_mb}))
+"""
+
+
+def measure(module: str) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, module],
+        cwd=APP_DIR,
+        env=os.environ,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def get_slowest_packages(module: str, top: int) -> Dict[str, float]:
+    """
+    Self import time, in ms, summed by top level package.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        env=os.environ,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    packages: Counter = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+    return {name: round(ms, 1) for name, ms in packages.most_common(top)}
+
+
+def run(targets: List[str], repeat: int, top: int) -> Dict:
+    results = {}
+    for target in targets:
+        module = TARGETS[target]
+        measures = [measure(module) for _ in range(repeat)]
+        results[target] = {
+            "module": module,
+            "import_ms": round(statistics.median(m["import_ms"] for m in measures), 1),
+            "rss_mb": round(max(m["rss_mb"] for m in measures), 1),
+            "slowest_packages": get_slowest_packages(module, top),
+        }
+        print(
+            f"{target:<8} {module:<12} import {results[target]['import_ms']:>8.1f} ms"
+            f"  rss {results[target]['rss_mb']:>7.1f} MB",
+            flush=True,
+        )
+        for name, ms in results[target]["slowest_packages"].items():
+            print(f"{'':<8} {name:<24} {ms:>8.1f} ms")
+    return {"python": sys.version.split()[0], "results": results}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--targets", default=",".join(TARGETS), help="comma separated, api or worker"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest packages shown")
+    parser.add_argument("--output", type=Path, help="write results as json")
+    parser.add_argument("--baseline", type=Path, help="compare to a previous run")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    targets = [target.strip() for target in args.targets.split(",") if target]
+    current = run(targets, args.repeat, args.top)
+
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+
+    if args.baseline:
+        regressions = compare(
+            current, json.loads(args.baseline.read_text()), args.threshold, METRICS
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Stubs keeping the benchmarks offline: pechas are read from a local store
+instead of being cloned, GitHub and the EPUB export are faked, queued jobs
+run in the request and the database is an in-memory SQLite.
+"""
+
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+BENCH_USER_ID = 1
+BENCH_TOKEN = "benchmark-token"
+
+
+class FakeGithub:
+    def __init__(self, token=None, *args, **kwargs):
+        self.token = token
+
+    def get_user(self, *args, **kwargs):
+        return SimpleNamespace(
+            id=BENCH_USER_ID, login="benchmark", email="benchmark@example.com"
+        )
+
+
+def get_local_download_pecha(pechas_path: Path):
+    def download_pecha(pecha_id, *args, **kwargs):
+        return Path(pechas_path) / pecha_id
+
+    return download_pecha
+
+
+def get_github_access_token(code: str):
+    return {"access_token": BENCH_TOKEN, "token_type": "bearer", "scope": "repo"}
+
+
+class FakeEpubSerializer:
+    """
+    Reads the bases like the real serializer but skips the pandoc conversion.
+    """
+
+    def __init__(self, opf_path, *args, **kwargs):
+        self.opf_path = Path(opf_path)
+
+    def serialize(self, toc_levels=None, output_path=None):
+        export_fn = Path(output_path) / f"{self.opf_path.stem}.epub"
+        with export_fn.open("w", encoding="utf-8") as f:
+            for base_fn in sorted((self.opf_path / "base").glob("*.txt")):
+                f.write(base_fn.read_text(encoding="utf-8"))
+        return export_fn
+
+
+def create_release(repo_name, *args, **kwargs):
+    return f"https://github.com/OpenPecha/{repo_name}/releases/download/v0.1/{repo_name}.epub"
+
+
+def run_task_inline(task, args=None, kwargs=None, **options):
+    """
+    `Task.apply_async` running the job body in the request, so that its
+    time is measured, without a broker or job events.
+    """
+    task.run(*(args or ()), **(kwargs or {}))
+    return SimpleNamespace(id="benchmark-job")
+
+
+def get_test_sessionmaker(url: str = "sqlite://"):
+    """
+    In-memory SQLite by default, a file url lets several processes share it.
+    """
+    from app.db.base import Base
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **({"poolclass": StaticPool} if url == "sqlite://" else {}),
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_test_db_override(TestingSessionLocal=None):
+    TestingSessionLocal = TestingSessionLocal or get_test_sessionmaker()
+
+    def get_db():
+        db = TestingSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    return get_db
+
+
+@contextmanager
+def offline_app(pechas_path: Path, TestingSessionLocal=None):
+    """
+    The FastAPI app with `download_pecha`, GitHub, the EPUB export, the job
+    queue and the database stubbed.
+    """
+    from openpecha import config
+
+    from app.api import deps
+    from app.main import app
+
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch.object(config, "PECHAS_PATH", Path(pechas_path)))
+        stack.enter_context(
+            mock.patch(
+                "app.services.pechas.download_pecha",
+                get_local_download_pecha(pechas_path),
+            )
+        )
+        for module in ("pedurma.texts", "pedurma.notes"):
+            stack.enter_context(
+                mock.patch(
+                    f"{module}.download_pecha", get_local_download_pecha(pechas_path)
+                )
+            )
+        stack.enter_context(
+            mock.patch("app.services.pechas.create_release", create_release)
+        )
+        stack.enter_context(
+            mock.patch("openpecha.serializers.EpubSerializer", FakeEpubSerializer)
+        )
+        stack.enter_context(
+            mock.patch("celery.app.task.Task.apply_async", run_task_inline)
+        )
+        stack.enter_context(
+            mock.patch("app.worker.report_progress", lambda *args, **kwargs: None)
+        )
+        stack.enter_context(mock.patch("github.Github", FakeGithub))
+        stack.enter_context(
+            mock.patch(
+                "app.core.security.get_github_access_token", get_github_access_token
+            )
+        )
+        app.dependency_overrides[deps.get_db] = get_test_db_override(
+            TestingSessionLocal
+        )
+        try:
+            yield app
+        finally:
+            app.dependency_overrides.pop(deps.get_db, None)
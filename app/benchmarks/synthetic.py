@@ -0,0 +1,220 @@
+"""
+Synthetic OPF pechas for the benchmarks.
+
+The pechas are generated with a fixed seed so that runs are comparable.
+"""
+
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+import yaml
+
+DEFAULT_LAYERS = ["Citation", "Sabche", "Tsawa", "Yigchung"]
+
+SYLLABLES = [
+    "བཀྲ",
+    "ཤིས",
+    "བདེ",
+    "ལེགས",
+    "སངས",
+    "རྒྱས",
+    "ཆོས",
+    "དགེ",
+    "འདུན",
+    "བླ",
+    "མ",
+    "རིན",
+    "པོ",
+    "ཆེ",
+    "ཡི",
+    "གེ",
+    "སྒྲ",
+    "དོན",
+    "ཚིག",
+    "བསྟན",
+]
+
+LINE_LEN = 80
+PEDURMA_PAGE_LEN = 1000
+
+
+@dataclass
+class PechaSpec:
+    pecha_id: str = "P000001"
+    volumes: int = 1
+    volume_size: int = 100_000  # chars per volume
+    annotations_per_layer: int = 1_000
+    layers: List[str] = field(default_factory=lambda: list(DEFAULT_LAYERS))
+    seed: int = 42
+
+
+def dump_yaml(data: Dict, fn: Path) -> None:
+    fn.parent.mkdir(parents=True, exist_ok=True)
+    fn.write_text(
+        yaml.safe_dump(data, sort_keys=False, allow_unicode=True), encoding="utf-8"
+    )
+
+
+def get_line(rng: random.Random) -> str:
+    line = ""
+    while len(line) < LINE_LEN - 1:
+        line += rng.choice(SYLLABLES) + "་"
+    return line[: LINE_LEN - 1] + "།"
+
+
+def get_base(size: int, rng: random.Random) -> str:
+    """
+    Lines of exactly `LINE_LEN` chars, separated by newlines.
+    """
+    n_lines = max(size // (LINE_LEN + 1), 1)
+    return "\n".join(get_line(rng) for _ in range(n_lines))
+
+
+def get_layer(
+    layer_name: str, layer_idx: int, spec: PechaSpec, base_len: int, rng: random.Random
+) -> Dict:
+    """
+    Annotations of all layers are interleaved, never overlap each other
+    and never cross a line.
+    """
+    n_slots = spec.annotations_per_layer * len(spec.layers)
+    slot_len = max(base_len // max(n_slots, 1), 1)
+    annotations = {}
+    for ann_idx in range(spec.annotations_per_layer):
+        slot_start = (ann_idx * len(spec.layers) + layer_idx) * slot_len
+        line_start = slot_start - slot_start % (LINE_LEN + 1)
+        line_end = line_start + LINE_LEN - 1
+        start = min(slot_start, line_end - 1)
+        end = min(start + max(min(slot_len // 2, 20), 1), line_end)
+        if start >= base_len or end >= base_len:
+            break
+        ann_id = f"{layer_name.lower()}{ann_idx:08x}{rng.randrange(16 ** 8):08x}"
+        annotations[ann_id] = {"span": {"start": start, "end": end}}
+    return {
+        "id": f"{layer_name.lower()}-{spec.pecha_id}",
+        "annotation_type": layer_name,
+        "revision": "00001",
+        "annotations": annotations,
+    }
+
+
+def create_pecha(root: Path, spec: PechaSpec) -> Path:
+    """
+    Writes the pecha as `root/<pecha_id>/<pecha_id>.opf`, like download_pecha.
+    """
+    rng = random.Random(spec.seed)
+    opf_path = Path(root) / spec.pecha_id / f"{spec.pecha_id}.opf"
+    dump_yaml(
+        {
+            "id": spec.pecha_id,
+            "initial_creation_type": "input",
+            "source_metadata": {"title": f"Synthetic {spec.pecha_id}"},
+        },
+        opf_path / "meta.yml",
+    )
+    for vol in range(1, spec.volumes + 1):
+        base_name = f"v{vol:03}"
+        base = get_base(spec.volume_size, rng)
+        base_fn = opf_path / "base" / f"{base_name}.txt"
+        base_fn.parent.mkdir(parents=True, exist_ok=True)
+        base_fn.write_text(base, encoding="utf-8")
+        for layer_idx, layer_name in enumerate(spec.layers):
+            layer = get_layer(layer_name, layer_idx, spec, len(base), rng)
+            dump_yaml(layer, opf_path / "layers" / base_name / f"{layer_name}.yml")
+    return opf_path.parent
+
+
+def get_page_index(pg_num: int) -> str:
+    return f"{(pg_num + 1) // 2}{'a' if pg_num % 2 else 'b'}"
+
+
+def get_pedurma_page(pg_num: int, rng: random.Random, durchen_ref: int = 0) -> str:
+    """
+    Page of `PEDURMA_PAGE_LEN` chars ending with a newline, durchen pages
+    start with the pedurma page number and the body page they refer to.
+    """
+    page = f"<p1-{pg_num}><r{durchen_ref}>" if durchen_ref else ""
+    while len(page) < PEDURMA_PAGE_LEN - 1:
+        page += get_line(rng)
+    return page[: PEDURMA_PAGE_LEN - 1] + "\n"
+
+
+def create_pedurma_pecha(
+    root: Path, pecha_id: str, text_id: str, pages: int, notes: int = 50
+) -> Path:
+    """
+    Pedurma pecha with a single text over one volume, the `notes` last pages
+    being its durchen, with the index, meta, base and the pagination and
+    durchen layers read by the pedurma endpoints.
+    """
+    rng = random.Random(42)
+    opf_path = Path(root) / pecha_id / f"{pecha_id}.opf"
+    notes = min(notes, pages // 2)
+    refs_per_note = max((pages - notes) // max(notes, 1), 1)
+    page_texts = []
+    for pg_num in range(1, pages + 1):
+        # the durchen pages refer to the body pages like the note edits do
+        note_idx = pg_num - (pages - notes) - 1
+        durchen_ref = note_idx * refs_per_note + 1 if note_idx >= 0 else 0
+        page_texts.append(get_pedurma_page(pg_num, rng, durchen_ref))
+    base = "".join(page_texts)
+    base_fn = opf_path / "base" / "v001.txt"
+    base_fn.parent.mkdir(parents=True, exist_ok=True)
+    base_fn.write_text(base, encoding="utf-8")
+    dump_yaml(
+        {"id": pecha_id, "work_id": text_id, "img_grp_offset": 0, "pref": "I1PD"},
+        opf_path / "meta.yml",
+    )
+    dump_yaml(
+        {
+            "id": f"index-{pecha_id}",
+            "annotation_type": "index",
+            "revision": "00001",
+            "annotations": {
+                "text1": {
+                    "work_id": text_id,
+                    "parts": [],
+                    "span": [{"vol": 1, "start": 0, "end": len(base) - 1}],
+                }
+            },
+        },
+        opf_path / "index.yml",
+    )
+    paginations = {}
+    for pg_num in range(1, pages + 1):
+        paginations[f"page{pg_num:06}"] = {
+            "page_index": get_page_index(pg_num),
+            "span": {
+                "start": (pg_num - 1) * PEDURMA_PAGE_LEN,
+                "end": pg_num * PEDURMA_PAGE_LEN - 1,
+            },
+            "note_ref": None,
+        }
+    dump_yaml(
+        {
+            "id": f"pagination-{pecha_id}",
+            "annotation_type": "Pagination",
+            "revision": "00001",
+            "annotations": paginations,
+        },
+        opf_path / "layers" / "v001" / "Pagination.yml",
+    )
+    dump_yaml(
+        {
+            "id": f"durchen-{pecha_id}",
+            "annotation_type": "Durchen",
+            "revision": "00001",
+            "annotations": {
+                "durchen1": {
+                    "span": {
+                        "start": (pages - notes) * PEDURMA_PAGE_LEN,
+                        "end": len(base) - 2,
+                    }
+                }
+            },
+        },
+        opf_path / "layers" / "v001" / "Durchen.yml",
+    )
+    return opf_path.parent
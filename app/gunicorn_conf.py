@@ -0,0 +1,33 @@
+# Gunicorn config picked up by the uvicorn-gunicorn image from /app/gunicorn_conf.py.
+# Same defaults as the image config, plus cleanup of the prometheus
+# multiprocess metrics of dead workers.
+import multiprocessing
+import os
+
+from prometheus_client import multiprocess
+
+workers_per_core = float(os.getenv("WORKERS_PER_CORE", "1"))
+max_workers = os.getenv("MAX_WORKERS")
+web_concurrency = os.getenv("WEB_CONCURRENCY")
+
+if web_concurrency:
+    workers = int(web_concurrency)
+    assert workers > 0
+else:
+    workers = max(int(workers_per_core * multiprocessing.cpu_count()), 2)
+    if max_workers:
+        workers = min(workers, int(max_workers))
+
+bind = os.getenv("BIND") or f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '80')}"
+loglevel = os.getenv("LOG_LEVEL", "info")
+accesslog = os.getenv("ACCESS_LOG", "-") or None
+errorlog = os.getenv("ERROR_LOG", "-") or None
+worker_tmp_dir = "/dev/shm"
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+timeout = int(os.getenv("TIMEOUT", "120"))
+keepalive = int(os.getenv("KEEP_ALIVE", "5"))
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
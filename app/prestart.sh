@@ -1,5 +1,12 @@
 #! /usr/bin/env bash
 
+# Drop prometheus metrics of the previous run, the directory must exist
+# before any python step imports app.core.metrics
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+    rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+    mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Let the DB start
 python /app/app/backend_pre_start.py
 
@@ -3,5 +3,17 @@ set -e
 
 python /app/app/celeryworker_pre_start.py
 
-celery worker -A app.worker -l info -Q main-queue -c 1
+# One worker per queue, eg. CELERY_QUEUE=export-queue
+QUEUE=${CELERY_QUEUE:-main-queue}
 
+case "$QUEUE" in
+    export-queue) DEFAULT_CONCURRENCY=2 ;;
+    git-queue) DEFAULT_CONCURRENCY=4 ;;
+    pedurma-queue) DEFAULT_CONCURRENCY=2 ;;
+    import-queue) DEFAULT_CONCURRENCY=1 ;;
+    *) DEFAULT_CONCURRENCY=1 ;;
+esac
+
+CONCURRENCY=${CELERY_CONCURRENCY:-$DEFAULT_CONCURRENCY}
+
+celery worker -A app.worker -l info -Q "$QUEUE" -c "$CONCURRENCY" -n "$QUEUE@%h" -O fair